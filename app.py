@@ -1,31 +1,81 @@
-from flask import Flask, request, render_template
+from flask import (
+    Flask,
+    request,
+    render_template,
+    stream_template,
+    redirect,
+    url_for,
+    jsonify,
+)
 import requests
-from bs4 import BeautifulSoup
-import difflib
 import os
 import re
+import time
+import hashlib
+from concurrent.futures import Future, ThreadPoolExecutor
 import nh3
-from database import init_db, store_comparison, get_recent_comparisons, get_comparison
+from database import (
+    init_db,
+    store_comparison,
+    get_recent_comparisons,
+    get_comparison,
+    get_comparison_status,
+    find_fresh_comparison,
+    get_comparison_fields,
+    get_comparison_list_slice,
+)
+from comparison_jobs import ComparisonEventStream, ComparisonJobQueue, JobQueueFull
 from crawler import WebCrawler
+from crawl_state import get_crawl_state_store
+from url_canonicalizer import get_url_canonicalizer
 from urllib.parse import urlparse  # Make sure urlparse is imported
 from http_session_manager import (
     fetch_with_session,
     close_all_sessions,
     UnsafeURLError,
 )
+from stylesheet_fetcher import fetch_stylesheets
+from dom_extractor import extract_page
+from text_diff import compare_lines
+from header_diff import diff_headers, summarize_headers
 
 
 app = Flask(__name__)
 
+# Seconds a stored comparison may be reused for when neither page changed
+# since. 0 disables result reuse.
+RESULT_CACHE_TTL = int(os.environ.get("COMPARE_WEB_RESULT_TTL", "3600"))
+
+# Shared executors for the comparison pipeline. Sides and stages use separate
+# pools: a side task blocks on its stage futures, so sharing one pool could
+# deadlock once every worker is a waiting side task.
+_side_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="compare-side")
+_stage_executor = ThreadPoolExecutor(
+    max_workers=16, thread_name_prefix="compare-stage"
+)
+
 # Initialize the database when the app starts
 init_db()
 
 
 @app.template_filter("url_to_path")
 def url_to_path(url):
-    # Parse the URL to extract the path
-    path = requests.compat.urlparse(url).path
+    # Canonical path and query (see url_canonicalizer), so links that differ
+    # only in fragment, query order, tracking parameters or trailing slash
+    # compare equal across the two sites
+    path, sep, query = get_url_canonicalizer().path_key(url).partition("?")
     # Remove the ".html" extension if present
+    if path.endswith(".html"):
+        path = path[:-5]
+    elif path.endswith("/"):
+        path = path[:-1]
+    return path + sep + query
+
+
+def _legacy_url_to_path(url):
+    # The url_to_path of comparisons stored before it kept the query and
+    # canonicalized the path
+    path = urlparse(url).path
     if path.endswith(".html"):
         path = path[:-5]
     elif path.endswith("/"):
@@ -33,6 +83,19 @@ def url_to_path(url):
     return path
 
 
+@app.template_filter("link_presence")
+def link_presence(link, links_comparison):
+    """
+    "both" or "one": whether link's url_to_path key is on both sides of
+    links_comparison, falling back to the path-only key older stored
+    comparisons use. None if link is in neither.
+    """
+    presence = links_comparison.get(url_to_path(link))
+    if presence is None:
+        presence = links_comparison.get(_legacy_url_to_path(link))
+    return presence
+
+
 @app.template_filter("url_path")
 def extract_url_path(url):
     """Jinja filter to extract the path, query, and fragment from a URL."""
@@ -63,7 +126,17 @@ def crawl():
         if home_url:
             crawler = None
             try:
-                crawler = WebCrawler(home_url)
+                crawl_state = get_crawl_state_store()
+                crawler = WebCrawler(
+                    home_url,
+                    force_refresh=bool(request.form.get("refresh")),
+                    state_store=crawl_state,
+                )
+                if request.form.get("restart"):
+                    crawler.discard_unfinished()
+                else:
+                    # Pick up an interrupted crawl of this URL where it stopped
+                    crawler.resume()
                 results = crawler.crawl(max_pages=5000)
             except ValueError as ve:
                 # Covers invalid and disallowed (UnsafeURLError) home URLs.
@@ -78,17 +151,6 @@ def crawl():
     return render_template("crawl.html", results=results, error=error)
 
 
-def fetch_images(soup, base_url):
-    image_links = []
-    for img in soup.find_all("img"):
-        src = img.get("src")
-        if src:
-            if not src.startswith("http"):
-                src = requests.compat.urljoin(base_url, src)
-            image_links.append(src)
-    return image_links
-
-
 def sanitize_html(html):
     """
     Sanitize remote HTML before it is rendered with |safe. Strips scripts,
@@ -108,71 +170,78 @@ def sanitize_css(css):
     return re.sub(r"</\s*style", "<\\/style", css, flags=re.IGNORECASE)
 
 
-def fetch_and_parse(url):
+def fetch_and_parse(url, backend=None, response=None):
+    """
+    Fetch url and extract everything the comparison needs in one pass.
+    backend selects the parser (see dom_extractor.PARSER_BACKENDS) and
+    defaults to the COMPARE_WEB_PARSER setting. An already fetched response
+    for url can be passed in to skip the request.
+    Returns (response, PageExtract), or an error message string.
+    """
     try:
-        response = fetch_with_session(url, method="GET")
-        return BeautifulSoup(response.text, "html.parser")
+        if response is None:
+            response = fetch_with_session(url, method="GET")
+        return response, extract_page(response.text, url, backend)
     except UnsafeURLError as e:
         return f"URL not allowed: {e}"
     except requests.RequestException as e:
         return f"Error fetching the URL: {e}"
 
 
-def fetch_css(soup, base_url):
-    css_links = []
-    broken_links = []
-    for link in soup.find_all("link", rel="stylesheet"):
-        href = link.get("href")
-        if href:
-            if not href.startswith("http"):
-                href = requests.compat.urljoin(base_url, href)
-            try:
-                css_response = fetch_with_session(href, method="GET")
-                css_links.append(sanitize_css(css_response.text))
-            except (requests.RequestException, UnsafeURLError):
-                broken_links.append(href)
-    return css_links, broken_links
+def page_validators(response):
+    """Validators for detecting whether a page changed since this response."""
+    return {
+        "etag": response.headers.get("ETag"),
+        "last_modified": response.headers.get("Last-Modified"),
+        "body_hash": hashlib.sha256(response.content).hexdigest(),
+    }
+
+
+def check_unchanged(url, validators):
+    """
+    Conditionally re-fetch url against stored validators.
+    Returns (unchanged, response). response is the fresh 200 response when
+    there is one, so the pipeline can reuse it instead of fetching again.
+    """
+    headers = {}
+    if validators.get("etag"):
+        headers["If-None-Match"] = validators["etag"]
+    if validators.get("last_modified"):
+        headers["If-Modified-Since"] = validators["last_modified"]
+    try:
+        response = fetch_with_session(url, method="GET", headers=headers)
+    except (requests.RequestException, UnsafeURLError):
+        return False, None
+    if response.status_code == 304:
+        return True, None
+    unchanged = (
+        hashlib.sha256(response.content).hexdigest() == validators.get("body_hash")
+    )
+    return unchanged, response
 
 
-def list_items(soup):
-    output = {"h1": [], "h2": [], "h3": [], "h4": []}
-    for i in range(1, 5):
-        for header in soup.find_all(f"h{i}"):
-            output[f"h{i}"].append(header.get_text(strip=True))
-    return output
+def fetch_css(hrefs):
+    # Fetched in parallel and served from the shared revalidating cache.
+    return fetch_stylesheets(hrefs, sanitize_css)
 
 
-def validate_links(links):
+def validate_links(links, on_result=None, force_refresh=False):
     """Parallel link validation for improved performance"""
     from parallel_link_validator import validate_links_parallel
 
-    return validate_links_parallel(links, max_workers=20)
+    return validate_links_parallel(
+        links, max_workers=20, on_result=on_result, force_refresh=force_refresh
+    )
 
 
-def fetch_links(soup, base_url):
-    links = []
-    for a in soup.find_all("a", href=True):
-        href = a.get("href")
-        if not href.startswith("http"):
-            href = requests.compat.urljoin(base_url, href)
-        links.append(href)
-    return validate_links(links)
+def fetch_links(links, on_result=None, force_refresh=False):
+    return validate_links(links, on_result, force_refresh)
 
 
 def compare_links(links1, links2):
-    def normalize_link(link):
-        # Parse the URL to extract the path
-        path = requests.compat.urlparse(link).path
-        # Remove the ".html" extension if present
-        if path.endswith(".html"):
-            path = path[:-5]
-        elif path.endswith("/"):
-            path = path[:-1]
-        return path
-
-    # Normalize links
-    normalized_links1 = {normalize_link(link) for link, status in links1}
-    normalized_links2 = {normalize_link(link) for link, status in links2}
+    # Normalize links (the keys link_presence looks links up with)
+    normalized_links1 = {url_to_path(link) for link, status in links1}
+    normalized_links2 = {url_to_path(link) for link, status in links2}
 
     # Create a dictionary to store comparison results
     comparison = {}
@@ -188,193 +257,580 @@ def compare_links(links1, links2):
 
 
 def compare_items(items1, items2):
-    comparison = {"h1": [], "h2": [], "h3": [], "h4": []}
-    for key in comparison.keys():
-        set1 = set(items1[key])
-        set2 = set(items2[key])
-        all_items = set1.union(set2)
-        for item in all_items:
-            if item in set1 and item in set2:
-                # Check if the item is modified
-                if items1[key].count(item) != items2[key].count(item):
-                    comparison[key].append(
-                        (item, item, "modified")
-                    )  # Present in both but modified
-                else:
-                    comparison[key].append(
-                        (item, item, "both")
-                    )  # Present in both and identical
-            elif item in set1:
-                comparison[key].append((item, None, "one"))  # Present in one
-            else:
-                comparison[key].append((None, item, "one"))  # Present in one
-    return comparison
+    # Linear-time summary per header level; see header_diff.
+    return summarize_headers(items1, items2)
+
 
+def compare_text(text1, text2):
+    # Myers line diff with a time budget; see text_diff for the details.
+    return compare_lines(text1, text2)
 
-def extract_text(soup):
-    # Remove script and style elements
-    for script in soup(["script", "style"]):
-        script.decompose()
-    # Get text and normalize whitespace
-    text = soup.get_text(separator="\n")
-    lines = [line.strip() for line in text.split("\n") if line.strip()]
-    return lines
 
+def _timed(timings, stage, func, *args):
+    """Run one pipeline stage and record its wall-clock duration in seconds."""
+    start = time.perf_counter()
+    try:
+        return func(*args)
+    finally:
+        timings[stage] = round(time.perf_counter() - start, 3)
 
-def compare_text(text1, text2):
-    # Use difflib to compare text
-    d = difflib.SequenceMatcher(None, text1, text2)
-    comparison = []
-
-    for tag, i1, i2, j1, j2 in d.get_opcodes():
-        if tag == "equal":
-            # Text is the same in both versions
-            for line in text1[i1:i2]:
-                comparison.append(("both", line, None))
-        elif tag == "replace":
-            # Text is modified - find character-level differences
-            for line1, line2 in zip(text1[i1:i2], text2[j1:j2]):
-                s = difflib.SequenceMatcher(None, line1, line2)
-                left_changes = []
-                right_changes = []
-
-                for (
-                    subtag,
-                    left_start,
-                    left_end,
-                    right_start,
-                    right_end,
-                ) in s.get_opcodes():
-                    if subtag != "equal":
-                        left_changes.append((left_start, left_end))
-                        right_changes.append((right_start, right_end))
-
-                comparison.append(
-                    ("modified", line1, line2, left_changes, right_changes)
-                )
-        elif tag == "delete":
-            # Text only in first sequence
-            for line in text1[i1:i2]:
-                comparison.append(("left", line, None))
-        elif tag == "insert":
-            # Text only in second sequence
-            for line in text2[j1:j2]:
-                comparison.append(("right", None, line))
 
-    return comparison
+def process_side(url, side_key="url1", progress=None, response=None, parsed=None):
+    """
+    Fetch and analyse one side of a comparison. Headers, links, images,
+    stylesheet hrefs and text come from a single extraction pass.
+    Stylesheets are then fetched on the stage executor while the HTML is
+    sanitized on this thread.
+
+    Links are not validated here: parsed, if given, is a Future resolved
+    with the page's links in document order as soon as the page is parsed
+    (an empty list if it could not be fetched), so the caller can validate
+    the links of both sides together.
+
+    progress, if given, is a comparison_jobs.ComparisonProgress-like object
+    told about each finished stage, and given the side data as soon as it
+    is parsed and again once its content is ready to display. response, if
+    given, is an already fetched response for url.
+    """
+    timings = {}
+    side = {
+        "content": None,
+        "css": [],
+        "broken_links": [],
+        "images": [],
+        "results": {},
+        "links": [],
+        "text": None,
+        "error": None,
+        "validators": None,
+        "timings": timings,
+    }
+    start = time.perf_counter()
+
+    def stage(name, func, *args):
+        result = _timed(timings, name, func, *args)
+        if progress is not None:
+            progress.stage_done(side_key, name)
+        return result
+
+    try:
+        fetched = stage("fetch", fetch_and_parse, url, None, response)
+        if isinstance(fetched, str):
+            side["error"] = fetched
+            timings["total"] = round(time.perf_counter() - start, 3)
+            if progress is not None:
+                progress.side_ready(side_key, side, [])
+                progress.content_ready(side_key, side)
+            return side
+        response, page = fetched
+        side["validators"] = page_validators(response)
+        side["results"] = page.headers
+        # Announced before parsed is set, which is what lets link validation
+        # start: the link rows always exist before their statuses arrive.
+        if progress is not None:
+            progress.side_ready(side_key, side, page.links)
+        if parsed is not None:
+            parsed.set_result(page.links)
+
+        css_future = _stage_executor.submit(
+            stage, "css", fetch_css, page.stylesheets
+        )
+
+        side["content"] = stage("content", sanitize_html, response.text)
+        side["images"] = page.images
+        side["text"] = page.text
+
+        side["css"], side["broken_links"] = css_future.result()
+        if progress is not None:
+            progress.content_ready(side_key, side)
+        timings["total"] = round(time.perf_counter() - start, 3)
+        return side
+    finally:
+        # Never leave the caller waiting on a side that failed early.
+        if parsed is not None and not parsed.done():
+            parsed.set_result([])
+
+
+def run_comparison(url1, url2, progress=None, responses=None, force_refresh=False):
+    """
+    Run both sides of a comparison concurrently and compare the results.
+    Returns the comparison data dict stored by store_comparison, plus a
+    "timings" entry with the per-stage durations of each side.
+    responses optionally maps "url1"/"url2" to already fetched responses.
+    force_refresh bypasses the link status cache.
+    """
+    responses = responses or {}
+    parsed = {"url1": Future(), "url2": Future()}
+    futures = {
+        key: _side_executor.submit(
+            process_side, url, key, progress, responses.get(key), parsed[key]
+        )
+        for key, url in (("url1", url1), ("url2", url2))
+    }
+
+    # Validate every distinct link of both pages exactly once, starting as
+    # soon as both are parsed (while their stylesheets are still loading).
+    page_links = {key: future.result() for key, future in parsed.items()}
+    unique_links = list(dict.fromkeys(page_links["url1"] + page_links["url2"]))
+    on_link = None
+    if progress is not None:
+        progress.links_queued(len(unique_links))
+        on_link = progress.link_done
+    comparison_timings = {}
+    links_future = _stage_executor.submit(
+        _timed,
+        comparison_timings,
+        "links",
+        fetch_links,
+        unique_links,
+        on_link,
+        force_refresh,
+    )
+
+    side1, side2 = futures["url1"].result(), futures["url2"].result()
+    statuses = dict(links_future.result())
+    if progress is not None:
+        progress.stage_done("comparison", "links")
+    # Fan the statuses back out to each page's links in document order.
+    side1["links"] = [(link, statuses[link]) for link in page_links["url1"]]
+    side2["links"] = [(link, statuses[link]) for link in page_links["url2"]]
+
+    comparison, links_comparison, text_comparison = None, {}, None
+
+    # Compare texts if both URLs were successfully fetched
+    if side1["error"] is None and side2["error"] is None:
+        text_comparison = compare_text(side1["text"], side2["text"])
+
+    if side1["results"] and side2["results"]:
+        comparison = compare_items(side1["results"], side2["results"])
+
+    if side1["links"] and side2["links"]:
+        links_comparison = compare_links(side1["links"], side2["links"])
+
+    if progress is not None:
+        progress.stage_done("comparison", "compare")
+
+    return {
+        "url1": url1,
+        "url2": url2,
+        "content1": side1["content"],
+        "content2": side2["content"],
+        "css1": side1["css"],
+        "css2": side2["css"],
+        "comparison": comparison,
+        "error1": side1["error"],
+        "error2": side2["error"],
+        "broken_links1": side1["broken_links"],
+        "broken_links2": side2["broken_links"],
+        "images1": side1["images"],
+        "images2": side2["images"],
+        "results1": side1["results"],
+        "results2": side2["results"],
+        "links1": side1["links"],
+        "links2": side2["links"],
+        "links_comparison": links_comparison,
+        "text_comparison": text_comparison,
+        "page_validators": {"url1": side1["validators"], "url2": side2["validators"]},
+        "timings": {
+            "url1": side1["timings"],
+            "url2": side2["timings"],
+            "comparison": comparison_timings,
+        },
+    }
+
+
+def compare_urls(url1, url2, progress=None, use_cache=True):
+    """
+    Compare url1 and url2, reusing a stored comparison when possible.
+    If a successful comparison of the same pair was stored within
+    RESULT_CACHE_TTL and both pages are unchanged since (304, or the same
+    body hash), the stored result is returned with a "cached_from" entry and
+    link validation and diffing are skipped. Otherwise the full pipeline
+    runs, reusing any page bodies fetched by the check. Without use_cache
+    links are also re-checked rather than taken from the link status cache.
+    """
+    responses = {}
+    cached = None
+    if use_cache and RESULT_CACHE_TTL > 0:
+        cached = find_fresh_comparison(url1, url2, RESULT_CACHE_TTL)
+
+    if cached is not None:
+        validators = cached["page_validators"]
+        checks = {
+            key: _side_executor.submit(check_unchanged, url, validators.get(key) or {})
+            for key, url in (("url1", url1), ("url2", url2))
+        }
+        unchanged = True
+        for key, future in checks.items():
+            side_unchanged, response = future.result()
+            unchanged = unchanged and side_unchanged
+            if response is not None:
+                responses[key] = response
+
+        if unchanged:
+            data = get_comparison(cached["id"])
+            if data is not None:
+                data["links_comparison"] = _links_comparison(data)
+                data["cached_from"] = {
+                    "id": cached["id"],
+                    "timestamp": cached["timestamp"],
+                }
+                if progress is not None:
+                    progress.stage_done("comparison", "cache_hit")
+                return data
+
+    return run_comparison(
+        url1, url2, progress, responses, force_refresh=not use_cache
+    )
+
+
+# Background comparisons, for pages whose link validation outlasts proxy
+# timeouts. The job ID is the comparison's row ID.
+_job_queue = ComparisonJobQueue(compare_urls, max_workers=4, max_pending=32)
+
+
+def _wants_json():
+    best = request.accept_mimetypes.best_match(["application/json", "text/html"])
+    return best == "application/json"
+
+
+def submit_comparison_job(url1, url2, use_cache=True):
+    """Queue a background comparison and answer with its job ID."""
+    try:
+        job_id = _job_queue.submit(url1, url2, use_cache=use_cache)
+    except JobQueueFull as e:
+        if _wants_json():
+            return jsonify({"error": str(e)}), 503
+        return f"Too many comparisons in progress, try again later ({e})", 503
+
+    status_url = url_for("comparison_status", comparison_id=job_id)
+    if _wants_json():
+        return jsonify({"job_id": job_id, "status_url": status_url}), 202
+    return redirect(url_for("view_comparison", comparison_id=job_id))
+
+
+# Streamed comparisons run here while the request thread relays their events.
+_stream_executor = ThreadPoolExecutor(
+    max_workers=8, thread_name_prefix="compare-stream"
+)
+
+# Text comparison rows sent per stream event
+TEXT_EVENT_ROWS = 500
+
+
+def _compare_and_store(url1, url2, progress, use_cache):
+    # Stored here rather than by the response generator, so the result is
+    # kept even if the browser goes away mid-stream.
+    data = compare_urls(url1, url2, progress, use_cache)
+    if not data.get("cached_from"):
+        store_comparison(data)
+    return data
+
+
+def _side_events(data, n):
+    """The "side" and "content" stream events for side n of a finished comparison dict."""
+    yield {
+        "type": "side",
+        "side": f"url{n}",
+        "error": data[f"error{n}"],
+        "results": data[f"results{n}"],
+        "links": [{"url": link, "status": status} for link, status in data[f"links{n}"]],
+    }
+    yield {
+        "type": "content",
+        "side": f"url{n}",
+        "content": data[f"content{n}"],
+        "css": data[f"css{n}"],
+        "error": data[f"error{n}"],
+        "broken_links": data[f"broken_links{n}"],
+    }
+
+
+def _links_comparison(data):
+    """The {path: presence} link comparison of a comparison dict."""
+    links_comparison = data["links_comparison"]
+    # Comparisons without links on both sides used to store []
+    return links_comparison if isinstance(links_comparison, dict) else {}
+
+
+def comparison_events(url1, url2, use_cache=True):
+    """
+    Run a comparison and yield events for the streamed page as it goes:
+    each side's headers and link rows as soon as it is parsed, the header
+    comparison once both are, each side's content once its CSS is in, link
+    statuses as they are validated, then the text rows and "done".
+    """
+    events = ComparisonEventStream()
+    future = _stream_executor.submit(_compare_and_store, url1, url2, events, use_cache)
+    future.add_done_callback(lambda _: events.close())
+
+    sides = {}
+    for event in events.events():
+        yield event
+        if event["type"] == "side":
+            sides[event["side"]] = event["results"]
+            if len(sides) == 2 and sides["url1"] and sides["url2"]:
+                yield {
+                    "type": "headers",
+                    "comparison": compare_items(sides["url1"], sides["url2"]),
+                    "header_diff": diff_headers(sides["url1"], sides["url2"]),
+                }
+
+    try:
+        data = future.result()
+    except Exception as e:
+        yield {"type": "error", "message": f"Comparison failed: {e}"}
+        return
+
+    if data.get("cached_from"):
+        # A reused result streamed nothing yet; send it whole.
+        for n in (1, 2):
+            yield from _side_events(data, n)
+        if data["comparison"]:
+            yield {
+                "type": "headers",
+                "comparison": data["comparison"],
+                "header_diff": diff_headers(data["results1"], data["results2"]),
+            }
+
+    text_comparison = data["text_comparison"] or []
+    for start in range(0, len(text_comparison), TEXT_EVENT_ROWS):
+        yield {
+            "type": "text",
+            "rows": text_comparison[start : start + TEXT_EVENT_ROWS],
+        }
+
+    links_comparison = _links_comparison(data)
+    unique_links = {
+        link
+        for link, status in data["links1"] + data["links2"]
+        if link_presence(link, links_comparison) == "one"
+    }
+    yield {
+        "type": "done",
+        "unique_links": sorted(unique_links),
+        "text_rows": len(text_comparison),
+        "timings": data.get("timings"),
+        "cached_from": data.get("cached_from"),
+    }
+
+
+def stream_comparison(url1, url2, use_cache=True):
+    """
+    Send the page shell at once and fill it in as the comparison progresses,
+    instead of rendering only after the whole pipeline has finished.
+    """
+    response = app.response_class(
+        stream_template(
+            "template.html",
+            url1=url1,
+            url2=url2,
+            stream_events=comparison_events(url1, url2, use_cache),
+            recent_comparisons=get_recent_comparisons(),
+        )
+    )
+    # Keep proxies such as nginx from buffering the stream
+    response.headers["X-Accel-Buffering"] = "no"
+    response.headers["Cache-Control"] = "no-cache"
+    return response
 
 
 @app.route("/", methods=["GET", "POST"])
 def index():
-    url1, url2, error1, error2, comparison = None, None, None, None, None
-    content1, content2 = None, None
-    css1, css2 = [], []
-    broken_links1, broken_links2 = [], []
-    images1, images2 = [], []
-    results1, results2 = {}, {}
-    links1, links2 = [], []
-    links_comparison = []
-    text_comparison = None
+    comparison_data = {
+        "url1": None,
+        "url2": None,
+        "content1": None,
+        "content2": None,
+        "css1": [],
+        "css2": [],
+        "comparison": None,
+        "error1": None,
+        "error2": None,
+        "broken_links1": [],
+        "broken_links2": [],
+        "images1": [],
+        "images2": [],
+        "results1": {},
+        "results2": {},
+        "links1": [],
+        "links2": [],
+        "links_comparison": {},
+        "text_comparison": None,
+        "timings": None,
+        "cached_from": None,
+        "header_diff": None,
+    }
     recent_comparisons = get_recent_comparisons()  # Get recent comparisons for display
 
     if request.method == "POST":
         url1 = request.form.get("url1")
         url2 = request.form.get("url2")
 
-        soup1 = fetch_and_parse(url1)
-        if isinstance(soup1, BeautifulSoup):
-            content1 = sanitize_html(soup1.prettify())
-            css1, broken_links1 = fetch_css(soup1, url1)
-            images1 = fetch_images(soup1, url1)
-            results1 = list_items(soup1)
-            links1 = fetch_links(soup1, url1)
-            text1 = extract_text(soup1)  # Extract text from first URL
-        else:
-            error1 = soup1
-
-        soup2 = fetch_and_parse(url2)
-        if isinstance(soup2, BeautifulSoup):
-            content2 = sanitize_html(soup2.prettify())
-            css2, broken_links2 = fetch_css(soup2, url2)
-            images2 = fetch_images(soup2, url2)
-            results2 = list_items(soup2)
-            links2 = fetch_links(soup2, url2)
-            text2 = extract_text(soup2)  # Extract text from second URL
-        else:
-            error2 = soup2
-
-        # Compare texts if both URLs were successfully fetched
-        if isinstance(soup1, BeautifulSoup) and isinstance(soup2, BeautifulSoup):
-            text_comparison = compare_text(text1, text2)
-
-        if results1 and results2:
-            comparison = compare_items(results1, results2)
-
-        if links1 and links2:
-            links_comparison = compare_links(links1, links2)
-
-        # After all comparisons are done, store the results
-        comparison_data = {
-            "url1": url1,
-            "url2": url2,
-            "content1": content1,
-            "content2": content2,
-            "css1": css1,
-            "css2": css2,
-            "comparison": comparison,
-            "error1": error1,
-            "error2": error2,
-            "broken_links1": broken_links1,
-            "broken_links2": broken_links2,
-            "images1": images1,
-            "images2": images2,
-            "results1": results1,
-            "results2": results2,
-            "links1": links1,
-            "links2": links2,
-            "links_comparison": links_comparison,
-            "text_comparison": text_comparison,
-        }
-        store_comparison(comparison_data)
+        use_cache = not request.form.get("refresh")
+        if request.form.get("background") or request.args.get("background"):
+            return submit_comparison_job(url1, url2, use_cache)
+        if request.form.get("stream") or request.args.get("stream"):
+            return stream_comparison(url1, url2, use_cache)
+
+        comparison_data = compare_urls(url1, url2, use_cache=use_cache)
+
+        # After all comparisons are done, store the results. A reused result
+        # is already stored.
+        if not comparison_data.get("cached_from"):
+            store_comparison(comparison_data)
+        # Occurrence-level header diff for the headers tab; cheap enough
+        # to compute per view rather than store.
+        comparison_data["header_diff"] = diff_headers(
+            comparison_data["results1"], comparison_data["results2"]
+        )
 
     return render_template(
         "template.html",
-        url1=url1,
-        url2=url2,
-        content1=content1,
-        content2=content2,
-        css1=css1,
-        css2=css2,
-        comparison=comparison,
-        error1=error1,
-        error2=error2,
-        broken_links1=broken_links1,
-        broken_links2=broken_links2,
-        images1=images1,
-        images2=images2,
-        results1=results1,
-        results2=results2,
-        links1=links1,
-        links2=links2,
-        links_comparison=links_comparison,
-        text_comparison=text_comparison,
+        **comparison_data,
         recent_comparisons=recent_comparisons,  # Add recent comparisons to template
     )
 
 
 # Add a new route to view historical comparisons
+def _job_status(comparison_id):
+    """Status dict for a comparison: live progress if this process runs it."""
+    job = _job_queue.get(comparison_id)
+    if job is not None:
+        return job.to_dict()
+    status = get_comparison_status(comparison_id)
+    if status is None:
+        return None
+    if status in ("queued", "running"):
+        # Its worker is gone (e.g. the server restarted mid-run).
+        status = "interrupted"
+    return {"id": comparison_id, "status": status}
+
+
+@app.route("/comparison/<int:comparison_id>/status")
+def comparison_status(comparison_id):
+    status = _job_status(comparison_id)
+    if status is None:
+        return jsonify({"error": "Comparison not found"}), 404
+    return jsonify(status)
+
+
 @app.route("/comparison/<int:comparison_id>")
 def view_comparison(comparison_id):
-    comparison_data = get_comparison(comparison_id)
+    status = _job_status(comparison_id)
+    if status is None:
+        return "Comparison not found", 404
+    if status["status"] in ("queued", "running", "interrupted"):
+        return render_template("job.html", job=status)
+
+    # Only the header is rendered here; each tab loads its own data from the
+    # per-tab endpoints below when it is first opened.
+    comparison_data = get_comparison_fields(comparison_id, ["url1", "url2"])
     if comparison_data:
+        lazy_tabs = {
+            "Websites": url_for("comparison_visual", comparison_id=comparison_id),
+            "Headers": url_for("comparison_headers", comparison_id=comparison_id),
+            "Links": url_for("comparison_links", comparison_id=comparison_id),
+            "TextTab": url_for("comparison_text", comparison_id=comparison_id),
+        }
         return render_template(
             "template.html",
-            **comparison_data,
+            url1=comparison_data["url1"],
+            url2=comparison_data["url2"],
+            lazy_tabs=lazy_tabs,
             recent_comparisons=get_recent_comparisons(),
         )
     return "Comparison not found", 404
 
 
+# Per-tab endpoints for stored comparisons. Each loads only the columns its
+# tab shows; links and text rows are paginated with ?offset=&limit=.
+DEFAULT_PAGE_SIZE = 200
+MAX_PAGE_SIZE = 1000
+
+
+def _pagination():
+    offset = max(request.args.get("offset", 0, type=int), 0)
+    limit = request.args.get("limit", DEFAULT_PAGE_SIZE, type=int)
+    return offset, min(max(limit, 1), MAX_PAGE_SIZE)
+
+
+def _split_sides(data, fields):
+    """Regroup field1/field2 values into {"side1": {field: ...}, "side2": ...}."""
+    return {
+        f"side{n}": {field: data[f"{field}{n}"] for field in fields} for n in (1, 2)
+    }
+
+
+def _not_found():
+    return jsonify({"error": "Comparison not found"}), 404
+
+
+@app.route("/comparison/<int:comparison_id>/visual")
+def comparison_visual(comparison_id):
+    data = get_comparison_fields(
+        comparison_id,
+        ["url1", "url2", "content1", "content2", "css1", "css2", "error1",
+         "error2", "broken_links1", "broken_links2", "comparison"],
+    )
+    if data is None:
+        return _not_found()
+    payload = _split_sides(data, ["url", "content", "css", "error", "broken_links"])
+    payload["comparison"] = data["comparison"]
+    return jsonify(payload)
+
+
+@app.route("/comparison/<int:comparison_id>/headers")
+def comparison_headers(comparison_id):
+    data = get_comparison_fields(
+        comparison_id, ["url1", "url2", "results1", "results2", "comparison"]
+    )
+    if data is None:
+        return _not_found()
+    payload = _split_sides(data, ["url", "results"])
+    payload["comparison"] = data["comparison"]
+    payload["header_diff"] = diff_headers(data["results1"], data["results2"])
+    return jsonify(payload)
+
+
+@app.route("/comparison/<int:comparison_id>/links")
+def comparison_links(comparison_id):
+    offset, limit = _pagination()
+    data = get_comparison_fields(comparison_id, ["url1", "url2", "links_comparison"])
+    if data is None:
+        return _not_found()
+
+    links_comparison = _links_comparison(data)
+    payload = {"offset": offset, "limit": limit}
+    for n in (1, 2):
+        page = get_comparison_list_slice(comparison_id, f"links{n}", offset, limit)
+        payload[f"side{n}"] = {
+            "url": data[f"url{n}"],
+            "total": page["total"],
+            "links": [
+                {
+                    "url": link,
+                    "status": status,
+                    # Flag links whose path only appears on one side
+                    "unique": link_presence(link, links_comparison) == "one",
+                }
+                for link, status in page["items"]
+            ],
+        }
+    return jsonify(payload)
+
+
+@app.route("/comparison/<int:comparison_id>/text")
+def comparison_text(comparison_id):
+    offset, limit = _pagination()
+    page = get_comparison_list_slice(comparison_id, "text_comparison", offset, limit)
+    if page is None:
+        return _not_found()
+    return jsonify(
+        {"offset": offset, "limit": limit, "total": page["total"], "rows": page["items"]}
+    )
+
+
 if __name__ == "__main__":
     # Debug mode exposes the Werkzeug interactive debugger (RCE if reachable).
     # Off by default; opt in explicitly for local development.
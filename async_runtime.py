@@ -0,0 +1,108 @@
+import asyncio
+import atexit
+import logging
+import os
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Optional
+
+import aiohttp
+
+from host_concurrency import MAX_CONNECTIONS
+from http_session_manager import create_safe_client_session
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncRuntime:
+    """
+    A process-wide asyncio event loop running in a background thread, with
+    one long-lived aiohttp session from create_safe_client_session().
+    Threads hand it coroutines through submit() and get
+    concurrent.futures.Future objects back, so connections, TLS sessions
+    and DNS results are reused across link validations instead of being
+    rebuilt by asyncio.run() each time.
+
+    The loop thread is started on first use, and again in a forked child
+    (threads do not survive fork).
+    """
+
+    def __init__(self, connection_limit: int = MAX_CONNECTIONS):
+        self.connection_limit = connection_limit
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def _run(self, loop: asyncio.AbstractEventLoop, ready: threading.Event):
+        asyncio.set_event_loop(loop)
+        loop.call_soon(ready.set)
+        try:
+            loop.run_forever()
+        finally:
+            loop.run_until_complete(loop.shutdown_asyncgens())
+            loop.close()
+
+    async def _open_session(self) -> aiohttp.ClientSession:
+        return create_safe_client_session(self.connection_limit)
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._loop is not None and self._pid == os.getpid():
+                return
+            loop = asyncio.new_event_loop()
+            ready = threading.Event()
+            thread = threading.Thread(
+                target=self._run, args=(loop, ready), name="async-runtime", daemon=True
+            )
+            thread.start()
+            ready.wait()
+            self._session = asyncio.run_coroutine_threadsafe(
+                self._open_session(), loop
+            ).result()
+            self._loop, self._thread, self._pid = loop, thread, os.getpid()
+
+    def submit(self, func: Callable[..., Any], *args, **kwargs) -> Future:
+        """
+        Run the coroutine func(*args, session=<shared session>, **kwargs)
+        on the runtime's loop and return a Future for its result.
+        """
+        self._ensure_started()
+        return asyncio.run_coroutine_threadsafe(
+            func(*args, session=self._session, **kwargs), self._loop
+        )
+
+    @property
+    def running(self) -> bool:
+        """True if the loop thread was started in this process and is alive."""
+        return (
+            self._loop is not None
+            and self._pid == os.getpid()
+            and self._thread.is_alive()
+        )
+
+    def shutdown(self, timeout: float = 5.0):
+        """Close the shared session and stop the loop thread."""
+        with self._lock:
+            loop, thread, session = self._loop, self._thread, self._session
+            owned = self._pid == os.getpid()
+            self._loop = self._thread = self._session = self._pid = None
+        if loop is None or not owned:
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(session.close(), loop).result(timeout)
+        except Exception as e:
+            logger.warning(f"Closing the async runtime session failed: {e}")
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout)
+
+
+# Shared by link validation in the app and the crawler.
+_async_runtime = AsyncRuntime()
+atexit.register(_async_runtime.shutdown)
+
+
+def get_async_runtime() -> AsyncRuntime:
+    """Get the global async runtime."""
+    return _async_runtime
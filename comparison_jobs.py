@@ -0,0 +1,240 @@
+import logging
+import queue
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from database import (
+    create_comparison_job,
+    update_comparison_status,
+    complete_comparison_job,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class JobQueueFull(RuntimeError):
+    """Raised when the background comparison queue is at capacity."""
+
+
+class ComparisonProgress:
+    """
+    Thread-safe progress of one comparison. The pipeline reports finished
+    stages and link checks; readers take a snapshot().
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.stages_done: List[str] = []
+        self.links_total = 0
+        self.links_validated = 0
+
+    def stage_done(self, side: str, stage: str):
+        with self._lock:
+            self.stages_done.append(f"{side}:{stage}")
+
+    def links_queued(self, count: int):
+        with self._lock:
+            self.links_total += count
+
+    def link_done(self, link: str, status: str):
+        with self._lock:
+            self.links_validated += 1
+
+    def side_ready(self, side: str, data: Dict[str, Any], links: List[str]):
+        """
+        Called as soon as a side is parsed (or has failed to load), before
+        its links are validated or its CSS fetched. data is the side dict so
+        far, with its headers, and links the page's links in document order.
+        """
+
+    def content_ready(self, side: str, data: Dict[str, Any]):
+        """Called once a side's sanitized content and CSS are ready too."""
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "stages_done": list(self.stages_done),
+                "links_total": self.links_total,
+                "links_validated": self.links_validated,
+            }
+
+
+class ComparisonEventStream(ComparisonProgress):
+    """
+    ComparisonProgress that also queues events for a streamed response:
+    {"type": "side", ...} with a side's headers and link rows once it is
+    parsed, {"type": "content", ...} once its content and CSS are ready and
+    {"type": "link", ...} per validated link. events() yields them until
+    close() is called.
+    """
+
+    _CLOSED = object()
+
+    def __init__(self):
+        super().__init__()
+        self._events: "queue.Queue" = queue.Queue()
+
+    def side_ready(self, side: str, data: Dict[str, Any], links: List[str]):
+        self._events.put(
+            {
+                "type": "side",
+                "side": side,
+                "error": data["error"],
+                "results": data["results"],
+                "links": [{"url": link, "status": None} for link in links],
+            }
+        )
+
+    def content_ready(self, side: str, data: Dict[str, Any]):
+        self._events.put(
+            {
+                "type": "content",
+                "side": side,
+                "content": data["content"],
+                "css": data["css"],
+                "error": data["error"],
+                "broken_links": data["broken_links"],
+            }
+        )
+
+    def link_done(self, link: str, status: str):
+        super().link_done(link, status)
+        self._events.put({"type": "link", "url": link, "status": status})
+
+    def close(self):
+        """No more events will follow; ends events()."""
+        self._events.put(self._CLOSED)
+
+    def events(self) -> Iterator[Dict[str, Any]]:
+        while True:
+            event = self._events.get()
+            if event is self._CLOSED:
+                return
+            yield event
+
+
+class ComparisonJob:
+    """A comparison running in the background, identified by its row ID."""
+
+    def __init__(self, job_id: int, url1: str, url2: str, options=None):
+        self.id = job_id
+        self.url1 = url1
+        self.url2 = url2
+        # Extra keyword arguments for the comparison function
+        self.options = options or {}
+        self.status = "queued"
+        self.error: Optional[str] = None
+        self.progress = ComparisonProgress()
+        self.submitted_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {
+            "id": self.id,
+            "url1": self.url1,
+            "url2": self.url2,
+            "status": self.status,
+            "error": self.error,
+            "submitted_at": self.submitted_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+        data.update(self.progress.snapshot())
+        return data
+
+
+class ComparisonJobQueue:
+    """
+    Runs comparisons on a bounded worker pool. Each job gets a row in the
+    comparisons table up front (status 'queued'), moves to 'running' and
+    ends as 'completed' with its results, or 'failed'.
+    """
+
+    def __init__(
+        self,
+        run_comparison: Callable[..., Dict[str, Any]],
+        max_workers: int = 4,
+        max_pending: int = 32,
+        keep_finished: int = 200,
+    ):
+        self._run_comparison = run_comparison
+        self.max_pending = max_pending
+        self.keep_finished = keep_finished
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="compare-job"
+        )
+        self._jobs: "OrderedDict[int, ComparisonJob]" = OrderedDict()
+        self._active = 0
+        self._lock = threading.Lock()
+
+    def submit(self, url1: str, url2: str, **options) -> int:
+        """
+        Queue a comparison and return its job (comparison) ID. options are
+        passed on to the comparison function.
+        Raises JobQueueFull when max_pending jobs are already queued or running.
+        """
+        with self._lock:
+            if self._active >= self.max_pending:
+                raise JobQueueFull(
+                    f"{self._active} comparisons already queued or running"
+                )
+            self._active += 1
+
+        try:
+            job = ComparisonJob(
+                create_comparison_job(url1, url2), url1, url2, options
+            )
+            with self._lock:
+                self._jobs[job.id] = job
+            self._executor.submit(self._run, job)
+        except Exception:
+            with self._lock:
+                self._active -= 1
+            raise
+        return job.id
+
+    def get(self, job_id: int) -> Optional[ComparisonJob]:
+        """Get a job known to this process, or None."""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _run(self, job: ComparisonJob):
+        job.status = "running"
+        job.started_at = time.time()
+        try:
+            update_comparison_status(job.id, "running")
+            data = self._run_comparison(
+                job.url1, job.url2, progress=job.progress, **job.options
+            )
+            complete_comparison_job(job.id, data)
+            job.status = "completed"
+        except Exception as e:
+            logger.exception(f"Background comparison {job.id} failed")
+            job.status = "failed"
+            job.error = f"Comparison failed: {e}"
+            try:
+                update_comparison_status(job.id, "failed", error=job.error)
+            except Exception:
+                logger.exception(f"Could not mark comparison {job.id} as failed")
+        finally:
+            job.finished_at = time.time()
+            with self._lock:
+                self._active -= 1
+                self._prune()
+
+    def _prune(self):
+        """Forget the oldest finished jobs beyond keep_finished. Holds _lock."""
+        finished = [
+            job_id
+            for job_id, job in self._jobs.items()
+            if job.status in ("completed", "failed")
+        ]
+        for job_id in finished[: max(0, len(finished) - self.keep_finished)]:
+            del self._jobs[job_id]
+
+    def shutdown(self, wait: bool = True):
+        self._executor.shutdown(wait=wait)
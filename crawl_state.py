@@ -0,0 +1,339 @@
+import json
+import logging
+import os
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from database_optimized import DatabaseConnectionPool
+
+logger = logging.getLogger(__name__)
+
+# SQLite file holding the state of unfinished crawls, next to this module
+# unless configured, so it does not depend on the working directory.
+CRAWL_STATE_DB = os.environ.get(
+    "COMPARE_WEB_CRAWL_STATE_DB",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "crawl_state.db"),
+)
+
+
+class CrawlStateStore:
+    """
+    Persistent crawl state, so an interrupted crawl can resume instead of
+    starting over.
+
+    It also keeps a snapshot of every page crawled (its validators, body
+    hash and extracted links), across runs, for incremental re-crawls.
+
+    A run records its frontier (every URL queued, in queue order, marked
+    done once its page was processed; together they are the visited set),
+    the discovered links in discovery order and every occurrence of them.
+    The crawler writes this in checkpoints, each one transaction, so a
+    resumed run sees exactly the state after some whole number of pages.
+    Finished runs keep only their summary row.
+    """
+
+    def __init__(self, db_pool: Optional[DatabaseConnectionPool] = None):
+        self.db_pool = db_pool if db_pool is not None else DatabaseConnectionPool(
+            CRAWL_STATE_DB
+        )
+        self._schema_ready = False
+
+    def _ensure_schema(self, cursor):
+        if self._schema_ready:
+            return
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS crawl_runs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                home_url TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'running',
+                pages_crawled INTEGER NOT NULL DEFAULT 0,
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_crawl_runs_home ON crawl_runs(home_url, status)"
+        )
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS crawl_frontier (
+                run_id INTEGER NOT NULL REFERENCES crawl_runs(id) ON DELETE CASCADE,
+                seq INTEGER NOT NULL,
+                url TEXT NOT NULL,
+                done INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (run_id, seq),
+                UNIQUE (run_id, url)
+            )
+        """)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS crawl_links (
+                run_id INTEGER NOT NULL REFERENCES crawl_runs(id) ON DELETE CASCADE,
+                seq INTEGER NOT NULL,
+                url TEXT NOT NULL,
+                is_internal INTEGER NOT NULL,
+                PRIMARY KEY (run_id, seq)
+            )
+        """)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS crawl_sources (
+                run_id INTEGER NOT NULL REFERENCES crawl_runs(id) ON DELETE CASCADE,
+                url TEXT NOT NULL,
+                page TEXT NOT NULL,
+                link_text TEXT,
+                attributes TEXT,  -- JSON object
+                raw_url TEXT  -- url as written in the page, before canonicalization
+            )
+        """)
+        cursor.execute("PRAGMA table_info(crawl_sources)")
+        if "raw_url" not in [row[1] for row in cursor.fetchall()]:
+            cursor.execute("ALTER TABLE crawl_sources ADD COLUMN raw_url TEXT")
+            logger.info("Added raw_url column to crawl_sources")
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_crawl_sources_run ON crawl_sources(run_id)"
+        )
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS crawl_pages (
+                url TEXT PRIMARY KEY,
+                final_url TEXT NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                body_hash TEXT NOT NULL,
+                links TEXT NOT NULL,  -- JSON [[absolute url, text, attributes], ...]
+                crawled_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        self._schema_ready = True
+
+    def start_run(self, home_url: str) -> int:
+        """Create a run whose frontier holds home_url; returns its id."""
+        with self.db_pool.get_cursor() as (cursor, conn):
+            self._ensure_schema(cursor)
+            cursor.execute("BEGIN")
+            try:
+                cursor.execute("INSERT INTO crawl_runs (home_url) VALUES (?)", (home_url,))
+                run_id = cursor.lastrowid
+                cursor.execute(
+                    "INSERT INTO crawl_frontier (run_id, seq, url) VALUES (?, 0, ?)",
+                    (run_id, home_url),
+                )
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+        return run_id
+
+    def find_unfinished_run(self, home_url: str) -> Optional[int]:
+        """The id of the latest unfinished run of home_url, if any."""
+        with self.db_pool.get_cursor() as (cursor, conn):
+            self._ensure_schema(cursor)
+            cursor.execute(
+                """
+                SELECT id FROM crawl_runs
+                WHERE home_url = ? AND status = 'running'
+                ORDER BY id DESC LIMIT 1
+            """,
+                (home_url,),
+            )
+            row = cursor.fetchone()
+        return row[0] if row else None
+
+    def load_run(self, run_id: int) -> Optional[Dict[str, Any]]:
+        """
+        The checkpointed state of a run: {"home_url", "pages_crawled",
+        "frontier": [(url, done), ...] in queue order, "links": [(url,
+        is_internal), ...] in discovery order, "sources": [(url, page, text,
+        attributes, raw_url), ...] in the order found}. None if there is no
+        such run.
+        """
+        with self.db_pool.get_cursor() as (cursor, conn):
+            self._ensure_schema(cursor)
+            cursor.execute(
+                "SELECT home_url, pages_crawled FROM crawl_runs WHERE id = ?", (run_id,)
+            )
+            row = cursor.fetchone()
+            if row is None:
+                return None
+            cursor.execute(
+                "SELECT url, done FROM crawl_frontier WHERE run_id = ? ORDER BY seq",
+                (run_id,),
+            )
+            frontier = [(url, bool(done)) for url, done in cursor.fetchall()]
+            cursor.execute(
+                "SELECT url, is_internal FROM crawl_links WHERE run_id = ? ORDER BY seq",
+                (run_id,),
+            )
+            links = [(url, bool(internal)) for url, internal in cursor.fetchall()]
+            cursor.execute(
+                """
+                SELECT url, page, link_text, attributes, raw_url FROM crawl_sources
+                WHERE run_id = ? ORDER BY rowid
+            """,
+                (run_id,),
+            )
+            sources = [
+                (url, page, text, json.loads(attributes) if attributes else {}, raw_url)
+                for url, page, text, attributes, raw_url in cursor.fetchall()
+            ]
+        return {
+            "home_url": row[0],
+            "pages_crawled": row[1],
+            "frontier": frontier,
+            "links": links,
+            "sources": sources,
+        }
+
+    def checkpoint(
+        self,
+        run_id: int,
+        pages_crawled: int,
+        queued: List[Tuple[int, str]],
+        done: Iterable[str],
+        links: List[Tuple[int, str, bool]],
+        sources: List[Tuple[str, str, str, Dict[str, Any], str]],
+    ):
+        """
+        Save, in one transaction, what changed since the last checkpoint:
+        URLs queued as (seq, url), pages processed, links discovered as
+        (seq, url, is_internal) and their (url, page, text, attributes,
+        raw_url) occurrences.
+        """
+        with self.db_pool.get_cursor() as (cursor, conn):
+            self._ensure_schema(cursor)
+            cursor.execute("BEGIN")
+            try:
+                cursor.executemany(
+                    "INSERT INTO crawl_frontier (run_id, seq, url) VALUES (?, ?, ?)",
+                    [(run_id, seq, url) for seq, url in queued],
+                )
+                cursor.executemany(
+                    "UPDATE crawl_frontier SET done = 1 WHERE run_id = ? AND url = ?",
+                    [(run_id, url) for url in done],
+                )
+                cursor.executemany(
+                    "INSERT INTO crawl_links (run_id, seq, url, is_internal) VALUES (?, ?, ?, ?)",
+                    [(run_id, seq, url, int(internal)) for seq, url, internal in links],
+                )
+                cursor.executemany(
+                    """
+                    INSERT INTO crawl_sources
+                        (run_id, url, page, link_text, attributes, raw_url)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                    [
+                        (run_id, url, page, text, json.dumps(attributes), raw_url)
+                        for url, page, text, attributes, raw_url in sources
+                    ],
+                )
+                cursor.execute(
+                    """
+                    UPDATE crawl_runs SET pages_crawled = ?, updated_at = CURRENT_TIMESTAMP
+                    WHERE id = ?
+                """,
+                    (pages_crawled, run_id),
+                )
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+
+    def get_page(self, url: str) -> Optional[Dict[str, Any]]:
+        """
+        The snapshot of url from its last crawl: {"final_url", "etag",
+        "last_modified", "body_hash", "links": [(absolute url, text,
+        attributes), ...]}, or None if it was never crawled.
+        """
+        with self.db_pool.get_cursor() as (cursor, conn):
+            self._ensure_schema(cursor)
+            cursor.execute(
+                """
+                SELECT final_url, etag, last_modified, body_hash, links
+                FROM crawl_pages WHERE url = ?
+            """,
+                (url,),
+            )
+            row = cursor.fetchone()
+        if row is None:
+            return None
+        return {
+            "final_url": row[0],
+            "etag": row[1],
+            "last_modified": row[2],
+            "body_hash": row[3],
+            "links": [tuple(link) for link in json.loads(row[4])],
+        }
+
+    def save_pages(self, pages: Dict[str, Dict[str, Any]]):
+        """Store page snapshots ({url: snapshot} as returned by get_page) in one transaction."""
+        if not pages:
+            return
+        with self.db_pool.get_cursor() as (cursor, conn):
+            self._ensure_schema(cursor)
+            cursor.execute("BEGIN")
+            try:
+                cursor.executemany(
+                    """
+                    INSERT OR REPLACE INTO crawl_pages
+                        (url, final_url, etag, last_modified, body_hash, links)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                    [
+                        (
+                            url,
+                            page["final_url"],
+                            page["etag"],
+                            page["last_modified"],
+                            page["body_hash"],
+                            json.dumps(page["links"]),
+                        )
+                        for url, page in pages.items()
+                    ],
+                )
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+
+    def finish_run(self, run_id: int, pages_crawled: int):
+        """Mark a run completed and drop its frontier and link data."""
+        with self.db_pool.get_cursor() as (cursor, conn):
+            self._ensure_schema(cursor)
+            cursor.execute("BEGIN")
+            try:
+                for table in ("crawl_frontier", "crawl_links", "crawl_sources"):
+                    cursor.execute(f"DELETE FROM {table} WHERE run_id = ?", (run_id,))
+                cursor.execute(
+                    """
+                    UPDATE crawl_runs
+                    SET status = 'completed', pages_crawled = ?, updated_at = CURRENT_TIMESTAMP
+                    WHERE id = ?
+                """,
+                    (pages_crawled, run_id),
+                )
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+
+    def delete_run(self, run_id: int):
+        with self.db_pool.get_cursor() as (cursor, conn):
+            self._ensure_schema(cursor)
+            cursor.execute("DELETE FROM crawl_runs WHERE id = ?", (run_id,))
+
+    def list_runs(self, limit: int = 20) -> List[Dict[str, Any]]:
+        with self.db_pool.get_cursor() as (cursor, conn):
+            self._ensure_schema(cursor)
+            cursor.execute(
+                """
+                SELECT id, home_url, status, pages_crawled, created_at, updated_at
+                FROM crawl_runs ORDER BY id DESC LIMIT ?
+            """,
+                (limit,),
+            )
+            return [dict(row) for row in cursor.fetchall()]
+
+
+# Shared by the crawl route.
+_crawl_state_store = CrawlStateStore()
+
+
+def get_crawl_state_store() -> CrawlStateStore:
+    """Get the global crawl state store."""
+    return _crawl_state_store
@@ -1,21 +1,114 @@
 import requests
 from urllib.parse import urlparse, urljoin
-from bs4 import BeautifulSoup, Tag  # Import Tag
 from collections import deque  # Use deque for efficient queue operations
-from concurrent.futures import ThreadPoolExecutor, as_completed
-import csv
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
+import hashlib
 import os
+import time
 from datetime import datetime
 
-from http_session_manager import assert_safe_url, UnsafeURLError
-
-# Optional: For robots.txt parsing
-# from urllib.robotparser import RobotFileParser
+from http_session_manager import assert_safe_url, create_safe_session, UnsafeURLError
+from dom_extractor import iter_anchors, resolve_backend
+from link_status_cache import get_link_status_cache
+from host_circuit_breaker import HOST_UNREACHABLE_STATUS, PROBE, REJECT, WAIT, get_host_breaker
+from parallel_link_validator import LinkProgress, ParallelLinkValidator, status_for
+from url_canonicalizer import get_url_canonicalizer
+from link_store import CompactLinkStore, LinkStore
+from crawl_output import (
+    CRAWL_OUTPUT_DIR,
+    CRAWL_OUTPUT_FORMATS,
+    CrawlOutputSink,
+    create_sinks,
+    sink_class_for,
+    link_row,
+    occurrence_row,
+)
+from robots import get_robots_cache
+from sitemap import iter_sitemap_urls
+from head_fallback import (
+    HEAD_FALLBACK_STATUSES,
+    RANGE_GET_HEADERS,
+    get_head_support,
+    range_get_status,
+)
+
+# Above this many links to check, the checks run as one batch on the
+# shared async runtime (ParallelLinkValidator.iter_links) instead of a
+# thread pool.
+ASYNC_CHECK_THRESHOLD = 50
+
+# Pages fetched at once by crawl() (1 crawls one page at a time), and the
+# politeness limits applied per host when crawling concurrently.
+CRAWL_WORKERS = int(os.environ.get("COMPARE_WEB_CRAWL_WORKERS", "8"))
+CRAWL_MAX_PER_HOST = int(os.environ.get("COMPARE_WEB_CRAWL_MAX_PER_HOST", "4"))
+CRAWL_DELAY = float(os.environ.get("COMPARE_WEB_CRAWL_DELAY", "0"))
+
+# Pages crawled between two saves of the crawl state (see crawl_state.py).
+CRAWL_CHECKPOINT_PAGES = int(os.environ.get("COMPARE_WEB_CRAWL_CHECKPOINT_PAGES", "100"))
+
+# Obey robots.txt (rules and Crawl-delay), and seed the queue with the
+# site's sitemaps before crawling. "0" turns either off.
+CRAWL_RESPECT_ROBOTS = os.environ.get("COMPARE_WEB_CRAWL_ROBOTS", "1").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+CRAWL_USE_SITEMAPS = os.environ.get("COMPARE_WEB_CRAWL_SITEMAPS", "1").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+
+# Re-crawl pages conditionally, reusing the links extracted last time for
+# pages that did not change (see crawl_state.CrawlStateStore.get_page).
+# Off by default; it needs a page or state store from the caller.
+CRAWL_INCREMENTAL = os.environ.get("COMPARE_WEB_CRAWL_INCREMENTAL", "0").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+
+# Keep link_details in a link_store.CompactLinkStore (string and attribute
+# tables, array-backed occurrences) instead of a dict per occurrence.
+CRAWL_COMPACT_LINKS = os.environ.get("COMPARE_WEB_CRAWL_COMPACT_LINKS", "1").lower() in (
+    "1",
+    "true",
+    "yes",
+)
 
 
 class WebCrawler:
-    def __init__(self, home_url):
+    def __init__(
+        self,
+        home_url,
+        parser=None,
+        force_refresh=False,
+        max_per_host=CRAWL_MAX_PER_HOST,
+        crawl_delay=CRAWL_DELAY,
+        state_store=None,
+        checkpoint_every=CRAWL_CHECKPOINT_PAGES,
+        canonicalizer=None,
+        respect_robots=CRAWL_RESPECT_ROBOTS,
+        use_sitemaps=CRAWL_USE_SITEMAPS,
+        incremental=CRAWL_INCREMENTAL,
+        page_store=None,
+        compact_links=CRAWL_COMPACT_LINKS,
+        output=None,
+    ):
+        # Links are keyed, queued and cached by their canonical URL (see
+        # url_canonicalizer); the URL as written is kept per occurrence.
+        # Pages and links are requested as first written, as servers need
+        # not serve the canonical form (e.g. "/docs" for "/docs/"):
+        # request_urls maps canonical URLs to that spelling where it differs.
+        self.canonicalizer = (
+            canonicalizer if canonicalizer is not None else get_url_canonicalizer()
+        )
+        self.request_urls = {}
         # Validate and store home URL
+        raw_home_url = home_url
+        home_url = self.canonicalizer.canonicalize(home_url)
+        if raw_home_url != home_url:
+            self.request_urls[home_url] = raw_home_url
         parsed_home = urlparse(home_url)
         if not parsed_home.scheme or not parsed_home.netloc:
             raise ValueError("Invalid home URL provided.")
@@ -23,34 +116,124 @@ class WebCrawler:
         assert_safe_url(home_url)
         self.home_url = home_url
         self.home_domain = parsed_home.netloc
+        # Parser backend from dom_extractor.PARSER_BACKENDS (lxml-fast by default)
+        self.parser = resolve_backend(parser)
+        # Link statuses come from the shared link status cache when fresh;
+        # force_refresh re-checks every link (results are still cached).
+        self.link_cache = get_link_status_cache()
+        self.force_refresh = force_refresh
+        # Shared per-host circuit breaker: once a host stops answering, its
+        # remaining links are reported as unreachable without a request.
+        self.breaker = get_host_breaker()
+        # Shared record of hosts that reject HEAD; their links get a range GET.
+        self.head_support = get_head_support()
+        # Politeness: pages fetched at once per host, and seconds between
+        # the start of two fetches from the same host.
+        self.max_per_host = max(1, max_per_host)
+        self.crawl_delay = crawl_delay
+        # Shared robots.txt cache; with respect_robots, disallowed pages are
+        # not queued and a site's Crawl-delay raises crawl_delay for it.
+        self.robots = get_robots_cache() if respect_robots else None
+        self.robots_skipped = set()
+        # {site: error} for sites whose robots.txt could not be fetched, so
+        # none of their pages were crawled (reported in the results)
+        self.robots_unreachable = {}
+        # Seed the queue from the sitemaps listed in robots.txt (or
+        # /sitemap.xml) so a concurrent crawl has pages to fetch at once.
+        self.use_sitemaps = use_sitemaps
 
         # Use sets for efficient membership testing and deduplication
         self.internal_links = set()
         self.external_links = set()
         self.visited_links = set()
-        # Store detailed info including text and attributes for each unique link URL
-        self.link_details = {}
+        # Store detailed info including text and attributes for each unique
+        # link URL: a link_store mapping of URL -> link detail dict
+        self.compact_links = compact_links
+        self.link_details = self._new_link_store()
 
         # Queue for URLs to crawl (using deque for efficiency)
         self.crawl_queue = deque([self.home_url])
         self.visited_links.add(self.home_url)  # Add home URL as visited initially
-
-        # Use a requests.Session for connection pooling and headers
-        self.session = requests.Session()
+        self.pages_crawled = 0
+
+        # Optional crawl_state.CrawlStateStore: crawl progress is saved
+        # every checkpoint_every pages under run_id so it can be resumed.
+        self.state_store = state_store
+        self.checkpoint_every = max(1, checkpoint_every)
+        self.run_id = None
+        # Changes since the last checkpoint
+        self._unsaved = {"queued": [], "done": [], "links": [], "sources": []}
+
+        # Incremental crawl: a snapshot of every page crawled (validators,
+        # body hash, links) is kept in page_store (by default state_store;
+        # without either the crawl is not incremental). Pages with a
+        # snapshot are fetched conditionally and not parsed again when
+        # unchanged; force_refresh re-downloads them.
+        self.page_store = None
+        if incremental:
+            self.page_store = page_store or state_store
+        self.pages_unchanged = 0
+        self._unsaved_pages = {}  # url -> snapshot, saved every checkpoint_every pages
+
+        # Where crawl() writes its results: crawl_output format names
+        # and/or CrawlOutputSink objects. Link occurrences are streamed to
+        # them page by page, the link statuses once they are checked.
+        self.output = CRAWL_OUTPUT_FORMATS if output is None else output
+        for name in self.output:
+            if not isinstance(name, CrawlOutputSink):
+                sink_class_for(name)  # Unknown formats and missing pyarrow fail here
+        self._sinks = []
+        self._pending_rows = []  # Occurrences of the page being processed
+
+        # Use a requests.Session for connection pooling and headers; it only
+        # connects to addresses validated by assert_safe_url's DNS cache.
+        # Sized for the crawl workers and the link check threads.
+        self.session = create_safe_session(pool_maxsize=max(20, CRAWL_WORKERS))
         self.session.headers.update(
             {
                 "User-Agent": "MyCoolWebCrawler/1.0 (Python Requests; +http://mycrawler.example.com)"  # Be a polite crawler
             }
         )
 
-        # Optional: Robots.txt handling
-        # self.rp = RobotFileParser()
-        # self.rp.set_url(urljoin(home_url, '/robots.txt'))
-        # try:
-        #     self.rp.read()
-        # except Exception as e:
-        #     print(f"Could not read robots.txt for {home_url}: {e}")
-        #     self.rp = None # Disable robots checking if reading fails
+    @property
+    def user_agent(self):
+        return self.session.headers["User-Agent"]
+
+    def request_url(self, url):
+        """The URL to request for canonical URL url: its first spelling seen."""
+        return self.request_urls.get(url, url)
+
+    def _note_spelling(self, url, raw_url):
+        """Remember raw_url as the URL to request for url, unless one is known."""
+        if raw_url != url and url not in self.request_urls:
+            self.request_urls[url] = raw_url
+
+    def _robots_allow(self, url):
+        """False if robots.txt disallows crawling url (reported once per URL)."""
+        if self.robots is None:
+            return True
+        policy = self.robots.get(url, self.session)
+        if policy.can_fetch(self.user_agent, self.request_url(url)):
+            return True
+        if policy.unreachable:
+            site = self.robots.site_of(url)
+            if site not in self.robots_unreachable:
+                self.robots_unreachable[site] = policy.error
+                print(f"robots.txt unreachable ({policy.error}), not crawling {site}")
+            return False
+        if url not in self.robots_skipped:
+            self.robots_skipped.add(url)
+            print(f"Skipping disallowed (robots.txt): {url}")
+        return False
+
+    def _delay_for(self, url):
+        """Seconds between two fetches from url's host: crawl_delay or the site's Crawl-delay."""
+        if self.robots is None:
+            return self.crawl_delay
+        return max(
+            self.crawl_delay,
+            self.robots.get(url, self.session).crawl_delay(self.user_agent),
+        )
 
     def _is_valid_url(self, url):
         """Checks if a URL has a valid scheme and network location."""
@@ -68,40 +251,79 @@ class WebCrawler:
         except ValueError:
             return False
 
-    def _get_all_attributes(self, tag: Tag):
-        """Extracts ALL attributes from a tag."""
-        # Convert multi-value attributes (like class) to space-separated strings
-        attrs = {}
-        for attr, value in tag.attrs.items():
-            if isinstance(value, list):
-                attrs[attr] = " ".join(value)
-            else:
-                attrs[attr] = value
-        return attrs
-
     def _check_accessibility(self, url):
         """
         Checks if a single URL is accessible using a HEAD request.
-        Returns True if accessible (status 2xx), False otherwise.
+        Returns True if accessible (status 2xx or 3xx), False otherwise.
         Handles common request exceptions.
         """
+        return self._check_status(url) == "OK"
+
+    def _check_status(self, url):
+        """
+        HEAD url and return "OK" (status 2xx or 3xx) or "ERROR (...)", the
+        status format and rule shared with link validation and the link
+        status cache (see parallel_link_validator.status_for).
+        Falls back to a one-byte range GET when HEAD is answered with
+        403/405/501, or straight away for hosts known to reject HEAD.
+        Returns HOST_UNREACHABLE_STATUS without a request while the host's
+        circuit breaker is open.
+        """
         try:
             assert_safe_url(url)
-            # Use the session for the HEAD request too
-            head_response = self.session.head(url, timeout=5, allow_redirects=True)
-            # Consider any 2xx status code as accessible
-            return 200 <= head_response.status_code < 300
         except UnsafeURLError:
             print(f"Skipping accessibility check for disallowed URL {url}")
+            return "ERROR (disallowed URL)"
+
+        host = urlparse(url).netloc.lower()
+        decision = self.breaker.before_request(host)
+        while decision == WAIT:  # Another thread is probing the host
+            time.sleep(0.05)
+            decision = self.breaker.before_request(host)
+        if decision == REJECT:
+            return HOST_UNREACHABLE_STATUS
+
+        unreachable = False
+        try:
+            status_code = head_status = None
+            if self.head_support.supports_head(host):
+                # Use the session for the HEAD request too
+                head_status = self.session.head(
+                    url, timeout=5, allow_redirects=True
+                ).status_code
+                if head_status not in HEAD_FALLBACK_STATUSES:
+                    status_code = head_status
+            if status_code is None:
+                # Many servers reject HEAD but serve GET: ask for one byte
+                # and close without reading the body.
+                with self.session.get(
+                    url,
+                    headers=RANGE_GET_HEADERS,
+                    timeout=5,
+                    allow_redirects=True,
+                    stream=True,
+                ) as response:
+                    status_code = range_get_status(response.status_code)
+                if head_status is not None and status_code != head_status:
+                    self.head_support.mark_unsupported(host)
+            # Same rule as link validation: both fill the link status cache
+            return status_for(status_code)
         except requests.exceptions.Timeout:
             print(f"Accessibility check timed out for {url}")
-        except requests.exceptions.ConnectionError:
+            unreachable = True
+            return "ERROR (Timeout)"
+        except requests.exceptions.ConnectionError as e:
             print(f"Accessibility check connection error for {url}")
+            unreachable = True
+            return f"ERROR ({e})"
         except requests.exceptions.RequestException as e:
             print(f"Accessibility check error for {url}: {e}")
+            return f"ERROR ({e})"
         except Exception as e:  # Catch unexpected errors during HEAD request
             print(f"Unexpected error during accessibility check for {url}: {e}")
-        return False
+            return f"ERROR (Exception: {e})"
+        finally:
+            self.breaker.record_result(host, failed=unreachable, probe=decision == PROBE)
 
     def _check_all_accessibility(self, max_workers=20):
         """
@@ -109,128 +331,494 @@ class WebCrawler:
         request per unique URL. Runs after the crawl so the crawl loop itself
         stays fast and never re-checks a URL seen on multiple pages.
         """
-        urls = [
-            url
-            for url, detail in self.link_details.items()
-            if detail.get("accessible") is None
-        ]
+        report_every = 0
+        for progress in self.iter_accessibility(max_workers):
+            if not report_every:
+                report_every = max(1, progress.total // 10)
+            if progress.completed % report_every == 0 or progress.completed == progress.total:
+                print(f"Checked {progress.completed}/{progress.total} links")
+
+    def iter_accessibility(self, max_workers=20):
+        """
+        Check every discovered URL not checked yet, yielding a LinkProgress
+        as each status is known (link_details is updated first). URLs with a
+        fresh entry in the link status cache come first and are not
+        requested. New results are added to the cache.
+        """
+        urls = self.link_details.unchecked()
+        if not urls:
+            return
+
+        total = len(urls)
+        completed = 0
+        cached = {} if self.force_refresh else self.link_cache.get_many(urls)
+        for url, status in cached.items():
+            completed += 1
+            self._set_status(url, status)
+            yield LinkProgress(url, status, completed, total)
+        urls = [url for url in urls if url not in cached]
         if not urls:
             return
 
+        if len(urls) > ASYNC_CHECK_THRESHOLD:
+            results = self._iter_statuses_async(urls, max_workers)
+        else:
+            results = self._iter_statuses_threaded(urls, max_workers)
+
+        checked = []
+        try:
+            for url, status in results:
+                completed += 1
+                self._set_status(url, status)
+                if status != HOST_UNREACHABLE_STATUS:
+                    checked.append((url, status))
+                yield LinkProgress(url, status, completed, total)
+        finally:
+            self.link_cache.put_many(checked)
+
+    def _set_status(self, url, status):
+        self.link_details.set_status(url, status)
+
+    def _iter_statuses_threaded(self, urls, max_workers):
+        """Yield (url, status) as each URL is checked with _check_status on a thread pool."""
         with ThreadPoolExecutor(max_workers=max_workers) as executor:
             future_to_url = {
-                executor.submit(self._check_accessibility, url): url for url in urls
+                executor.submit(self._check_status, self.request_url(url)): url
+                for url in urls
             }
-            for future in as_completed(future_to_url):
-                url = future_to_url[future]
-                try:
-                    self.link_details[url]["accessible"] = future.result()
-                except Exception as e:
-                    print(f"Unexpected error during accessibility check for {url}: {e}")
-                    self.link_details[url]["accessible"] = False
+            try:
+                for future in as_completed(future_to_url):
+                    url = future_to_url[future]
+                    try:
+                        status = future.result()
+                    except Exception as e:
+                        print(f"Unexpected error during accessibility check for {url}: {e}")
+                        status = f"ERROR (Exception: {e})"
+                    yield url, status
+            finally:
+                for future in future_to_url:
+                    future.cancel()
+
+    def _iter_statuses_async(self, urls, max_workers):
+        """
+        Yield (url, status) as each URL is checked, as one batch on the
+        shared async runtime so its connections are reused across crawls.
+        """
+        safe_urls = {}  # URL to request -> canonical URL
+        for url in urls:
+            try:
+                assert_safe_url(url)
+                safe_urls[self.request_url(url)] = url
+            except UnsafeURLError:
+                print(f"Skipping accessibility check for disallowed URL {url}")
+                yield url, "ERROR (disallowed URL)"
+        validator = ParallelLinkValidator(max_workers=max_workers)
+        for progress in validator.iter_links(list(safe_urls)):
+            yield safe_urls[progress.link], progress.status
+
+    def _snapshot_for(self, url):
+        """The page_store snapshot of url to re-crawl it against, if any."""
+        if self.page_store is None or self.force_refresh:
+            return None
+        try:
+            return self.page_store.get_page(url)
+        except Exception as e:
+            print(f"Could not read the stored snapshot of {url}: {e}")
+            return None
 
-    def _crawl_page(self, url):
-        """Crawls a single page, extracts links and their details, and adds them to sets/queue."""
+    def _fetch_page(self, url, snapshot=None):
+        """
+        GET url and return (final URL, HTML, validators) for HTML pages,
+        None for anything else or on error. With a snapshot of the page
+        from an earlier crawl the request is conditional, and HTML is None
+        if the page did not change (304, or the same body hash). Does not
+        parse, so concurrent crawl workers spend their time on the network
+        only.
+        """
         print(f"Crawling: {url}")  # Log which page is being crawled
 
-        # --- Optional: robots.txt check ---
-        # if self.rp and not self.rp.can_fetch(self.session.headers['User-Agent'], url):
-        #     print(f"Skipping disallowed (robots.txt): {url}")
-        #     return
-        # --- End optional ---
-
         try:
             assert_safe_url(url)
-            response = self.session.get(url, timeout=10)
+            headers = {}
+            if snapshot is not None:
+                if snapshot["etag"]:
+                    headers["If-None-Match"] = snapshot["etag"]
+                if snapshot["last_modified"]:
+                    headers["If-Modified-Since"] = snapshot["last_modified"]
+            response = self.session.get(url, timeout=10, headers=headers)
+            if response.status_code == 304 and snapshot is not None:
+                return snapshot["final_url"], None, None
             response.raise_for_status()  # Raise HTTPError for bad responses (4xx or 5xx)
 
             # Check content type - only parse HTML
             content_type = response.headers.get("content-type", "").lower()
             if "html" not in content_type:
                 print(f"Skipping non-HTML content at {url}")
-                return
+                return None
+            validators = {
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+                "body_hash": hashlib.sha256(response.content).hexdigest(),
+            }
+            if snapshot is not None and validators["body_hash"] == snapshot["body_hash"]:
+                return snapshot["final_url"], None, validators
+            # Use response.url for accuracy after redirects
+            return response.url, response.text, validators
 
-            soup = BeautifulSoup(
-                response.text, "html.parser"
-            )  # Consider 'lxml' for speed if installed
+        except requests.exceptions.Timeout:
+            print(f"Request timed out for {url}")
+        except requests.exceptions.ConnectionError:
+            print(f"Connection error for {url}")
+        except requests.exceptions.HTTPError as e:
+            print(f"HTTP error {e.response.status_code} for {url}")
+        except requests.exceptions.RequestException as e:
+            print(f"Error crawling {url}: {e}")
+        except Exception as e:  # Catch other potential errors
+            print(f"Unexpected error fetching page {url}: {e}")
+        return None
 
-            for a_tag in soup.find_all("a", href=True):
-                href = a_tag.get("href", "").strip()
+    def _process_page(self, url, page, snapshot=None):
+        """
+        Add the links of a page fetched by _fetch_page to sets/queue:
+        extracted from its HTML, or taken from snapshot if it is unchanged.
+        """
+        final_url, html, validators = page
+        if html is None:
+            self.pages_unchanged += 1
+            links = snapshot["links"]
+        else:
+            links = self._extract_links(url, final_url, html)
+        for raw_url, link_text, attributes in links:
+            self._add_link_occurrence(
+                self.canonicalizer.canonicalize(raw_url),
+                url,
+                link_text,
+                attributes,
+                raw_url,
+            )
+        if self.page_store is not None and validators is not None:
+            self._unsaved_pages[url] = {"final_url": final_url, "links": links, **validators}
+
+    def _extract_links(self, url, final_url, html):
+        """(absolute URL, text, attributes) of every crawlable link in html, in order."""
+        links = []
+        try:
+            # Yields (href, text, attributes) for every <a href>, including
+            # ALL attributes of the tag.
+            for href, link_text, attributes in iter_anchors(html, self.parser):
+                href = href.strip()
                 if not href:  # Skip empty hrefs
                     continue
 
                 # Resolve relative URLs
-                absolute_url = urljoin(
-                    response.url, href
-                )  # Use response.url for accuracy after redirects
-
-                if not self._is_valid_url(absolute_url):
+                raw_url = urljoin(final_url, href)
+                if not self._is_valid_url(raw_url):
                     continue
+                links.append((raw_url, link_text, attributes))
+        except Exception as e:  # Catch other potential errors (e.g., parsing)
+            print(f"Unexpected error processing page {url}: {e}")
+        return links
 
-                # Get all attributes including href
-                attributes = self._get_all_attributes(a_tag)
-                link_text = a_tag.get_text(strip=True)
-
-                # Store details aggregated by absolute_url. Accessibility is
-                # deferred to a single parallel pass after the crawl (see
-                # _check_all_accessibility) so we issue one HEAD per unique URL
-                # instead of one per occurrence inline in this loop.
-                if absolute_url not in self.link_details:
-                    self.link_details[absolute_url] = {
-                        "url": absolute_url,  # Store the URL itself for easy access
-                        "is_internal": self._is_internal_link(absolute_url),
-                        "accessible": None,  # Filled in by the post-crawl pass
-                        "sources": [],  # List of (source_page, link_text, attributes) tuples
-                    }
-                # Add occurrence details (page found on, text, specific attributes)
-                self.link_details[absolute_url]["sources"].append(
-                    {"page": url, "text": link_text, "attributes": attributes}
+    def _add_link_occurrence(self, absolute_url, page, link_text, attributes, raw_url=None):
+        """
+        Record that page links to absolute_url (a canonical URL, written
+        raw_url in the page), queueing it if internal and new.
+        """
+        if raw_url is None:
+            raw_url = absolute_url
+        self._note_spelling(absolute_url, raw_url)
+        # Store details aggregated by absolute_url. Accessibility is
+        # deferred to a single parallel pass after the crawl (see
+        # _check_all_accessibility) so we issue one HEAD per unique URL
+        # instead of one per occurrence.
+        if absolute_url in self.link_details:
+            is_internal = self.link_details.is_internal(absolute_url)
+        else:
+            is_internal = self._is_internal_link(absolute_url)
+            self.link_details.add_link(absolute_url, is_internal)
+            if self.run_id is not None:
+                self._unsaved["links"].append(
+                    (len(self.link_details) - 1, absolute_url, is_internal)
                 )
+        # Add occurrence details (page found on, text, specific attributes)
+        self.link_details.add_occurrence(absolute_url, page, link_text, attributes, raw_url)
+        if self.run_id is not None:
+            self._unsaved["sources"].append(
+                (absolute_url, page, link_text, attributes, raw_url)
+            )
+        if self._sinks:
+            self._pending_rows.append(
+                occurrence_row(absolute_url, is_internal, page, link_text, attributes, raw_url)
+            )
+
+        # Classify link and add to queue if internal and new
+        if is_internal:
+            self.internal_links.add(absolute_url)
+            self._enqueue(absolute_url)
+        else:
+            self.external_links.add(absolute_url)
+
+    def _enqueue(self, url):
+        """Queue an internal URL to crawl unless it was queued before or robots.txt disallows it."""
+        # Add to queue only if it hasn't been visited/queued
+        if url in self.visited_links or not self._robots_allow(url):
+            return False
+        self.visited_links.add(url)  # Mark as visited *when queued*
+        self.crawl_queue.append(url)
+        if self.run_id is not None:
+            self._unsaved["queued"].append((len(self.visited_links) - 1, url))
+        return True
 
-                # Classify link and add to queue if internal and new
-                if self.link_details[absolute_url]["is_internal"]:
-                    self.internal_links.add(absolute_url)
-                    # Add to queue only if it hasn't been visited/queued
-                    if absolute_url not in self.visited_links:
-                        self.visited_links.add(
-                            absolute_url
-                        )  # Mark as visited *when queued*
-                        self.crawl_queue.append(absolute_url)
-                else:
-                    self.external_links.add(absolute_url)
+    def _seed_from_sitemaps(self, limit):
+        """
+        Queue up to limit internal pages listed in the site's sitemaps
+        (those in robots.txt, else /sitemap.xml), after what is already
+        queued. Returns the number of pages added.
+        """
+        sitemaps = []
+        if self.robots is not None:
+            sitemaps = self.robots.get(self.home_url, self.session).sitemaps
+        if not sitemaps:
+            sitemaps = [urljoin(self.home_url, "/sitemap.xml")]
+        added = 0
+        urls = iter_sitemap_urls(sitemaps, self.session)
+        try:
+            for raw_url in urls:
+                if added >= limit:
+                    break
+                if not self._is_valid_url(raw_url):
+                    continue
+                url = self.canonicalizer.canonicalize(raw_url)
+                if not self._is_internal_link(url):
+                    continue
+                self._note_spelling(url, raw_url)
+                if self._enqueue(url):
+                    added += 1
+        finally:
+            urls.close()
+        if added:
+            print(f"Queued {added} pages from sitemaps.")
+        return added
+
+    def _new_link_store(self):
+        return CompactLinkStore() if self.compact_links else LinkStore()
+
+    def _page_processed(self, url):
+        """Count a crawled page, checkpointing the crawl state every checkpoint_every pages."""
+        self.pages_crawled += 1
+        if self._pending_rows:
+            for sink in self._sinks:
+                sink.write_occurrences(self._pending_rows)
+            self._pending_rows = []
+        if len(self._unsaved_pages) >= self.checkpoint_every:
+            self._save_snapshots()
+        if self.run_id is None:
+            return
+        self._unsaved["done"].append(url)
+        if len(self._unsaved["done"]) >= self.checkpoint_every:
+            self._checkpoint()
 
-        except requests.exceptions.Timeout:
-            print(f"Request timed out for {url}")
-        except requests.exceptions.ConnectionError:
-            print(f"Connection error for {url}")
-        except requests.exceptions.HTTPError as e:
-            print(f"HTTP error {e.response.status_code} for {url}")
-        except requests.exceptions.RequestException as e:
-            print(f"Error crawling {url}: {e}")
-        except Exception as e:  # Catch other potential errors (e.g., BS4 parsing)
-            print(f"Unexpected error processing page {url}: {e}")
+    def _save_snapshots(self):
+        """Save the page snapshots taken since the last save."""
+        if not self._unsaved_pages:
+            return
+        try:
+            self.page_store.save_pages(self._unsaved_pages)
+        except Exception as e:
+            print(f"Could not save page snapshots: {e}")
+        self._unsaved_pages = {}
+
+    def _checkpoint(self):
+        """Save the crawl state changed since the last checkpoint."""
+        if self.run_id is None or not any(self._unsaved.values()):
+            return
+        self.state_store.checkpoint(
+            self.run_id,
+            self.pages_crawled,
+            self._unsaved["queued"],
+            self._unsaved["done"],
+            self._unsaved["links"],
+            self._unsaved["sources"],
+        )
+        self._unsaved = {"queued": [], "done": [], "links": [], "sources": []}
 
-    def crawl(self, max_pages=10):
+    def discard_unfinished(self):
         """
-        Performs the crawl up to max_pages.
-        Uses a queue for breadth-first crawling.
-        Returns detailed link information.
+        Delete the latest unfinished crawl of home_url from state_store, so
+        crawl() starts over. Returns whether there was one.
         """
-        pages_crawled = 0
-        while self.crawl_queue and pages_crawled < max_pages:
+        if self.state_store is None:
+            return False
+        # Runs are saved under the canonical home_url, not the URL as given
+        run_id = self.state_store.find_unfinished_run(self.home_url)
+        if run_id is None:
+            return False
+        self.state_store.delete_run(run_id)
+        return True
+
+    def resume(self, run_id=None):
+        """
+        Restore the checkpointed state of run_id (by default the latest
+        unfinished crawl of home_url) from state_store, so crawl() carries
+        on where it stopped. Returns False if there is nothing to resume.
+        """
+        if self.state_store is None:
+            return False
+        if run_id is None:
+            run_id = self.state_store.find_unfinished_run(self.home_url)
+        state = self.state_store.load_run(run_id) if run_id is not None else None
+        if state is None:
+            return False
+
+        self.visited_links = {url for url, _ in state["frontier"]}
+        self.crawl_queue = deque(url for url, done in state["frontier"] if not done)
+        self.link_details.close()
+        self.link_details = self._new_link_store()
+        self.internal_links = set()
+        self.external_links = set()
+        for url, is_internal in state["links"]:
+            self.link_details.add_link(url, is_internal)
+            (self.internal_links if is_internal else self.external_links).add(url)
+        for url, page, link_text, attributes, raw_url in state["sources"]:
+            self.link_details.add_occurrence(url, page, link_text, attributes, raw_url or url)
+            self._note_spelling(url, raw_url or url)
+        self.pages_crawled = state["pages_crawled"]
+        self.run_id = run_id
+        print(
+            f"Resuming crawl run {run_id}: {self.pages_crawled} pages crawled, "
+            f"{len(self.crawl_queue)} queued."
+        )
+        return True
+
+    def _crawl_page(self, url):
+        """Crawls a single page, extracts links and their details, and adds them to sets/queue."""
+        snapshot = self._snapshot_for(url)
+        page = self._fetch_page(self.request_url(url), snapshot)
+        if page is not None:
+            self._process_page(url, page, snapshot)
+
+    def _crawl_sequentially(self, max_pages):
+        while self.crawl_queue and self.pages_crawled < max_pages:
             url_to_crawl = self.crawl_queue.popleft()
             self._crawl_page(url_to_crawl)
-            pages_crawled += 1
-            # Optional: Add a small delay between requests to be polite
-            # time.sleep(0.1)
+            self._page_processed(url_to_crawl)
+            if self.crawl_queue and self.pages_crawled < max_pages:
+                delay = self._delay_for(self.crawl_queue[0])
+                if delay:
+                    time.sleep(delay)  # Be polite between requests
 
-        print(f"Crawl finished. Crawled {pages_crawled} pages.")
+    def _crawl_concurrently(self, max_pages, max_workers):
+        """
+        Crawl with up to max_workers pages being fetched at once, at most
+        max_per_host of them (and one per crawl_delay seconds, or the
+        host's robots.txt Crawl-delay if longer) per host.
+        Pages are dispatched in queue order and parsed on this thread in
+        that same order, so the pages crawled, the queue and link_details
+        come out exactly as in a sequential crawl.
+        """
+        # (url, host, future, snapshot) in dispatch order
+        in_flight = deque()
+        last_start = {}  # host -> time.monotonic() of its last dispatch
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            while in_flight or (self.crawl_queue and self.pages_crawled < max_pages):
+                # Dispatch from the head of the queue while there is room
+                wait_for = None
+                while (
+                    self.crawl_queue
+                    and len(in_flight) < max_workers
+                    and self.pages_crawled + len(in_flight) < max_pages
+                ):
+                    url = self.crawl_queue[0]
+                    host = urlparse(url).netloc.lower()
+                    busy = sum(
+                        1 for _, h, f, _ in in_flight if h == host and not f.done()
+                    )
+                    if busy >= self.max_per_host:
+                        break  # Wait for one of its fetches to finish
+                    ready_in = (
+                        last_start.get(host, float("-inf"))
+                        + self._delay_for(url)
+                        - time.monotonic()
+                    )
+                    if ready_in > 0:
+                        wait_for = ready_in
+                        break
+                    self.crawl_queue.popleft()
+                    last_start[host] = time.monotonic()
+                    snapshot = self._snapshot_for(url)
+                    in_flight.append(
+                        (
+                            url,
+                            host,
+                            executor.submit(self._fetch_page, self.request_url(url), snapshot),
+                            snapshot,
+                        )
+                    )
 
-        # Check accessibility of all discovered links in one parallel pass.
-        self._check_all_accessibility()
+                if not in_flight:
+                    time.sleep(wait_for or 0)
+                    continue
+                # Finished fetches waiting behind an earlier page are not
+                # waited for again
+                pending = [future for _, _, future, _ in in_flight if not future.done()]
+                if pending:
+                    wait(pending, timeout=wait_for, return_when=FIRST_COMPLETED)
+                # Parse finished pages in dispatch (BFS) order
+                while in_flight and in_flight[0][2].done():
+                    url, _, future, snapshot = in_flight.popleft()
+                    page = future.result()
+                    if page is not None:
+                        self._process_page(url, page, snapshot)
+                    self._page_processed(url)
+
+    def crawl(self, max_pages=10, max_workers=CRAWL_WORKERS):
+        """
+        Performs the crawl up to max_pages.
+        Uses a queue for breadth-first crawling, fetching up to max_workers
+        pages at once (1 crawls one page at a time).
+        With a state_store, progress is checkpointed so resume() can pick
+        the crawl up again if it is interrupted.
+        Returns detailed link information.
+        """
+        if self.state_store is not None and self.run_id is None:
+            self.run_id = self.state_store.start_run(self.home_url)
+        if self.use_sitemaps and self.pages_crawled == 0:
+            # Already-queued pages are skipped, so a resumed run that had
+            # not crawled anything yet is not seeded twice.
+            self._seed_from_sitemaps(max_pages - len(self.crawl_queue))
 
-        # Prepare results: Separate internal/external link details
-        results = {"internal": [], "external": []}
+        try:
+            self._open_output()
+            if max_workers > 1:
+                self._crawl_concurrently(max_pages, max_workers)
+            else:
+                self._crawl_sequentially(max_pages)
+            self._checkpoint()
+            self._save_snapshots()
+
+            if self.page_store is not None:
+                print(
+                    f"Crawl finished. Crawled {self.pages_crawled} pages "
+                    f"({self.pages_unchanged} unchanged since the last crawl)."
+                )
+            else:
+                print(f"Crawl finished. Crawled {self.pages_crawled} pages.")
+
+            # Check accessibility of all discovered links in one parallel pass.
+            self._check_all_accessibility()
+            self._write_link_statuses()
+        finally:
+            self._close_output()
+
+        # Prepare results: Separate internal/external link details, plus the
+        # circuit breaker state of every host the links point to and the
+        # sites not crawled because their robots.txt was unreachable
+        results = {
+            "internal": [],
+            "external": [],
+            "hosts": self.get_host_states(),
+            "robots_unreachable": dict(self.robots_unreachable),
+        }
         all_links = self.internal_links.union(self.external_links)
 
         for link_url in sorted(list(all_links)):
@@ -241,63 +829,81 @@ class WebCrawler:
                 else:
                     results["external"].append(detail)
 
-        # Store results in CSV file before returning
-        self._save_to_csv(results)
+        if self.run_id is not None:
+            self.state_store.finish_run(self.run_id, self.pages_crawled)
 
         return results  # Return the structured details
 
-    def _save_to_csv(self, results):
-        """Save crawl results to a CSV file."""
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        domain_name = self.home_domain.replace(".", "_")
-        filename = f"crawl_results_{domain_name}_{timestamp}.csv"
-
-        # Create directory if it doesn't exist
-        os.makedirs("crawl_results", exist_ok=True)
-        filepath = os.path.join("crawl_results", filename)
-
-        with open(filepath, "w", newline="", encoding="utf-8") as csvfile:
-            fieldnames = [
-                "url",
-                "type",
-                "accessible",
-                "source_page",
-                "link_text",
-                "attributes",
-            ]
-            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-
-            writer.writeheader()
-
-            # Write internal links
-            for link_detail in results["internal"]:
-                for source in link_detail["sources"]:
-                    writer.writerow(
-                        {
-                            "url": link_detail["url"],
-                            "type": "internal",
-                            "accessible": link_detail["accessible"],
-                            "source_page": source["page"],
-                            "link_text": source["text"],
-                            "attributes": str(source["attributes"]),
-                        }
-                    )
+    def get_host_states(self):
+        """
+        {host: {"state", "failures"}} for the host of every link found:
+        its circuit breaker state (closed, open or half_open) and its
+        consecutive connection failures.
+        """
+        hosts = sorted({urlparse(url).netloc.lower() for url in self.link_details})
+        return self.breaker.get_host_states(hosts)
 
-            # Write external links
-            for link_detail in results["external"]:
-                for source in link_detail["sources"]:
-                    writer.writerow(
-                        {
-                            "url": link_detail["url"],
-                            "type": "external",
-                            "accessible": link_detail["accessible"],
-                            "source_page": source["page"],
-                            "link_text": source["text"],
-                            "attributes": str(source["attributes"]),
-                        }
-                    )
+    def _open_output(self):
+        """
+        Create the sinks in self.output, and stream them the occurrences
+        found before this crawl() (by a resumed run).
+        """
+        self._sinks = []
+        base_path = None
+        for output in self.output:
+            if isinstance(output, CrawlOutputSink):
+                self._sinks.append(output)
+                continue
+            if base_path is None:
+                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+                domain_name = self.home_domain.replace(".", "_")
+                # Create directory if it doesn't exist
+                os.makedirs(CRAWL_OUTPUT_DIR, exist_ok=True)
+                base_path = os.path.join(
+                    CRAWL_OUTPUT_DIR, f"crawl_results_{domain_name}_{timestamp}"
+                )
+            self._sinks.extend(create_sinks(base_path, [output]))
+        if not self._sinks:
+            return
+        for url in self.link_details:
+            detail = self.link_details[url]
+            rows = [
+                occurrence_row(
+                    url,
+                    detail["is_internal"],
+                    source["page"],
+                    source["text"],
+                    source["attributes"],
+                    source["raw_url"],
+                )
+                for source in detail["sources"]
+            ]
+            for sink in self._sinks:
+                sink.write_occurrences(rows)
 
-        print(f"Crawl results saved to: {filepath}")
+    def _write_link_statuses(self):
+        """Write every link with its status to the sinks."""
+        if not self._sinks:
+            return
+        rows = []
+        for url in self.link_details:
+            detail = self.link_details[url]
+            rows.append(
+                link_row(url, detail["is_internal"], detail["accessible"], detail["status"])
+            )
+        for sink in self._sinks:
+            sink.write_links(rows)
+
+    def _close_output(self):
+        """Finish the result files, including after a failed crawl."""
+        if self._pending_rows:
+            for sink in self._sinks:
+                sink.write_occurrences(self._pending_rows)
+            self._pending_rows = []
+        for sink in self._sinks:
+            for path in sink.close():
+                print(f"Crawl results saved to: {path}")
+        self._sinks = []
 
     def close_session(self):
         """Closes the requests session."""
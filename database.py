@@ -8,6 +8,13 @@ try:
         store_comparison_optimized,
         get_recent_comparisons_optimized,
         get_comparison_optimized,
+        create_comparison_job as create_comparison_job_optimized,
+        update_comparison_status as update_comparison_status_optimized,
+        complete_comparison_job as complete_comparison_job_optimized,
+        get_comparison_status as get_comparison_status_optimized,
+        find_fresh_comparison as find_fresh_comparison_optimized,
+        get_comparison_fields as get_comparison_fields_optimized,
+        get_comparison_list_slice as get_comparison_list_slice_optimized,
     )
 
     USE_OPTIMIZED = True
@@ -185,3 +192,74 @@ def get_comparison(comparison_id):
         return data
 
     return None
+
+
+def _require_optimized(feature):
+    if not USE_OPTIMIZED:
+        raise RuntimeError(f"{feature} requires the optimized database backend")
+
+
+def create_comparison_job(url1, url2):
+    """Create a queued comparison row for a background job and return its ID"""
+    _require_optimized("Background comparisons")
+    return create_comparison_job_optimized(url1, url2)
+
+
+def update_comparison_status(comparison_id, status, error=None):
+    """Update the status of a background comparison"""
+    _require_optimized("Background comparisons")
+    return update_comparison_status_optimized(comparison_id, status, error)
+
+
+def complete_comparison_job(comparison_id, data):
+    """Store the results of a background comparison"""
+    _require_optimized("Background comparisons")
+    return complete_comparison_job_optimized(comparison_id, data)
+
+
+def get_comparison_status(comparison_id):
+    """Get the status of a comparison ('completed' for legacy rows)"""
+    if USE_OPTIMIZED:
+        return get_comparison_status_optimized(comparison_id)
+
+    # The original schema has no status column; every row is complete.
+    conn = sqlite3.connect("comparisons.db")
+    c = conn.cursor()
+    c.execute("SELECT id FROM comparisons WHERE id = ?", (comparison_id,))
+    result = c.fetchone()
+    conn.close()
+    return "completed" if result else None
+
+
+def find_fresh_comparison(url1, url2, max_age_seconds):
+    """Find a reusable stored comparison of url1 vs url2, or None"""
+    if USE_OPTIMIZED:
+        return find_fresh_comparison_optimized(url1, url2, max_age_seconds)
+
+    # The original schema stores no page validators, so nothing is reusable.
+    return None
+
+
+def get_comparison_fields(comparison_id, fields):
+    """Get only the given fields of a comparison, e.g. for one tab"""
+    if USE_OPTIMIZED:
+        return get_comparison_fields_optimized(comparison_id, fields)
+
+    # Fallback: load the whole row and pick the fields
+    data = get_comparison(comparison_id)
+    if data is None:
+        return None
+    return {"id": comparison_id, **{field: data.get(field) for field in fields}}
+
+
+def get_comparison_list_slice(comparison_id, field, offset=0, limit=100):
+    """Get one page of a list field of a comparison, plus its total length"""
+    if USE_OPTIMIZED:
+        return get_comparison_list_slice_optimized(comparison_id, field, offset, limit)
+
+    # Fallback: load the whole row and slice the list
+    data = get_comparison(comparison_id)
+    if data is None:
+        return None
+    items = data.get(field) or []
+    return {"items": items[offset : offset + limit], "total": len(items)}
@@ -1,5 +1,6 @@
 import sqlite3
 import json
+import hashlib
 import threading
 from contextlib import contextmanager
 from typing import Optional, List, Dict, Any
@@ -127,7 +128,8 @@ def init_db_optimized():
                     -- Add metadata columns for better querying
                     comparison_hash TEXT,  -- For deduplication
                     content_size INTEGER DEFAULT 0,  -- For monitoring storage
-                    status TEXT DEFAULT 'completed'  -- For async processing
+                    status TEXT DEFAULT 'completed',  -- For async processing
+                    page_validators TEXT  -- ETag/Last-Modified/body hash per page, for result reuse
                 )
             """)
 
@@ -182,6 +184,10 @@ def init_db_optimized():
                 if 'status' not in columns:
                     cursor.execute("ALTER TABLE comparisons ADD COLUMN status TEXT DEFAULT 'completed'")
                     logger.info("Added status column")
+
+                if 'page_validators' not in columns:
+                    cursor.execute("ALTER TABLE comparisons ADD COLUMN page_validators TEXT")
+                    logger.info("Added page_validators column")
                     
                 conn.commit()
             except sqlite3.Error as e:
@@ -236,6 +242,56 @@ def init_db_optimized():
                 logger.warning(f"Could not create summary view: {e}")
 
 
+# Columns holding comparison results, in insert order.
+RESULT_COLUMNS = [
+    "content1", "content2", "css1", "css2", "comparison",
+    "error1", "error2", "broken_links1", "broken_links2", "images1", "images2",
+    "results1", "results2", "links1", "links2", "links_comparison", "text_comparison"
+]
+
+
+def _serialize_comparison(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Serialize the result fields of a comparison for the comparisons table."""
+    return {
+        "url1": data["url1"],
+        "url2": data["url2"],
+        "content1": data["content1"],
+        "content2": data["content2"],
+        "css1": json.dumps(data.get("css1", [])),
+        "css2": json.dumps(data.get("css2", [])),
+        "comparison": json.dumps(data["comparison"])
+        if data.get("comparison")
+        else None,
+        "error1": data.get("error1"),
+        "error2": data.get("error2"),
+        "broken_links1": json.dumps(data.get("broken_links1", [])),
+        "broken_links2": json.dumps(data.get("broken_links2", [])),
+        "images1": json.dumps(data.get("images1", [])),
+        "images2": json.dumps(data.get("images2", [])),
+        "results1": json.dumps(data.get("results1", {})),
+        "results2": json.dumps(data.get("results2", {})),
+        "links1": json.dumps(data.get("links1", [])),
+        "links2": json.dumps(data.get("links2", [])),
+        "links_comparison": json.dumps(data.get("links_comparison", {})),
+        "text_comparison": json.dumps(data.get("text_comparison", [])),
+    }
+
+
+def _comparison_hash(url1: str, url2: str) -> str:
+    # Must be stable across processes (unlike hash()) to find earlier runs.
+    comparison_key = f"{url1}|{url2}"
+    return hashlib.sha256(comparison_key.encode("utf-8")).hexdigest()
+
+
+def _serialize_validators(data: Dict[str, Any]) -> Optional[str]:
+    validators = data.get("page_validators")
+    return json.dumps(validators) if validators else None
+
+
+def _content_size(data: Dict[str, Any]) -> int:
+    return len(str(data.get("content1", ""))) + len(str(data.get("content2", "")))
+
+
 def store_comparison_optimized(
     data: Dict[str, Any], async_mode: bool = True
 ) -> Optional[int]:
@@ -252,44 +308,20 @@ def store_comparison_optimized(
             has_hash_column = 'comparison_hash' in columns
             has_size_column = 'content_size' in columns
             has_status_column = 'status' in columns
+            has_validators_column = 'page_validators' in columns
 
             # Generate comparison hash for deduplication (if column exists)
             comparison_hash = None
             content_size = 0
             if has_hash_column:
-                comparison_key = f"{data['url1']}|{data['url2']}"
-                comparison_hash = str(hash(comparison_key))
+                comparison_hash = _comparison_hash(data["url1"], data["url2"])
 
             # Calculate content size for monitoring (if column exists)
             if has_size_column:
-                content_size = len(str(data.get("content1", ""))) + len(
-                    str(data.get("content2", ""))
-                )
+                content_size = _content_size(data)
 
             # Serialize complex data structures
-            serialized_data = {
-                "url1": data["url1"],
-                "url2": data["url2"],
-                "content1": data["content1"],
-                "content2": data["content2"],
-                "css1": json.dumps(data.get("css1", [])),
-                "css2": json.dumps(data.get("css2", [])),
-                "comparison": json.dumps(data["comparison"])
-                if data.get("comparison")
-                else None,
-                "error1": data.get("error1"),
-                "error2": data.get("error2"),
-                "broken_links1": json.dumps(data.get("broken_links1", [])),
-                "broken_links2": json.dumps(data.get("broken_links2", [])),
-                "images1": json.dumps(data.get("images1", [])),
-                "images2": json.dumps(data.get("images2", [])),
-                "results1": json.dumps(data.get("results1", {})),
-                "results2": json.dumps(data.get("results2", {})),
-                "links1": json.dumps(data.get("links1", [])),
-                "links2": json.dumps(data.get("links2", [])),
-                "links_comparison": json.dumps(data.get("links_comparison", {})),
-                "text_comparison": json.dumps(data.get("text_comparison", [])),
-            }
+            serialized_data = _serialize_comparison(data)
             
             # Add optional columns only if they exist
             if has_hash_column:
@@ -298,13 +330,11 @@ def store_comparison_optimized(
                 serialized_data["content_size"] = content_size
             if has_status_column:
                 serialized_data["status"] = "completed"
+            if has_validators_column:
+                serialized_data["page_validators"] = _serialize_validators(data)
 
             # Build dynamic INSERT statement based on available columns
-            base_columns = [
-                "url1", "url2", "content1", "content2", "css1", "css2", "comparison",
-                "error1", "error2", "broken_links1", "broken_links2", "images1", "images2",
-                "results1", "results2", "links1", "links2", "links_comparison", "text_comparison"
-            ]
+            base_columns = ["url1", "url2"] + RESULT_COLUMNS
             
             optional_columns = []
             if has_hash_column:
@@ -313,6 +343,8 @@ def store_comparison_optimized(
                 optional_columns.append("content_size")
             if has_status_column:
                 optional_columns.append("status")
+            if has_validators_column:
+                optional_columns.append("page_validators")
                 
             all_columns = base_columns + optional_columns
             placeholders = [f":{col}" for col in all_columns]
@@ -353,6 +385,110 @@ def store_comparison_optimized(
         return _store_sync()
 
 
+def create_comparison_job(url1: str, url2: str) -> int:
+    """
+    Insert a placeholder row for a background comparison with status
+    'queued' and return its ID. Results are filled in by
+    complete_comparison_job().
+    """
+    with _db_pool.get_cursor() as (cursor, conn):
+        cursor.execute(
+            """
+            INSERT INTO comparisons (url1, url2, comparison_hash, status)
+            VALUES (?, ?, ?, 'queued')
+        """,
+            (url1, url2, _comparison_hash(url1, url2)),
+        )
+        comparison_id = cursor.lastrowid
+        conn.commit()
+        return comparison_id
+
+
+def update_comparison_status(
+    comparison_id: int, status: str, error: Optional[str] = None
+):
+    """Set the status of a comparison row, e.g. 'running' or 'failed'."""
+    with _db_pool.get_cursor() as (cursor, conn):
+        if error is None:
+            cursor.execute(
+                "UPDATE comparisons SET status = ? WHERE id = ?",
+                (status, comparison_id),
+            )
+        else:
+            # Surface job failures through the existing error column.
+            cursor.execute(
+                "UPDATE comparisons SET status = ?, error1 = ? WHERE id = ?",
+                (status, error, comparison_id),
+            )
+        conn.commit()
+
+
+def complete_comparison_job(comparison_id: int, data: Dict[str, Any]):
+    """Write the results of a background comparison and mark it completed."""
+    serialized_data = _serialize_comparison(data)
+    serialized_data["id"] = comparison_id
+    serialized_data["content_size"] = _content_size(data)
+    serialized_data["page_validators"] = _serialize_validators(data)
+
+    assignments = ", ".join(f"{col} = :{col}" for col in RESULT_COLUMNS)
+    with _db_pool.get_cursor() as (cursor, conn):
+        cursor.execute(
+            f"""
+            UPDATE comparisons
+            SET {assignments}, content_size = :content_size,
+                page_validators = :page_validators, status = 'completed'
+            WHERE id = :id
+        """,
+            serialized_data,
+        )
+        conn.commit()
+    logger.info(f"Completed background comparison {comparison_id}")
+
+
+def get_comparison_status(comparison_id: int) -> Optional[str]:
+    """Get only the status of a comparison, or None if it does not exist."""
+    with _db_pool.get_cursor() as (cursor, conn):
+        cursor.execute(
+            "SELECT COALESCE(status, 'completed') FROM comparisons WHERE id = ?",
+            (comparison_id,),
+        )
+        row = cursor.fetchone()
+        return row[0] if row else None
+
+
+def find_fresh_comparison(
+    url1: str, url2: str, max_age_seconds: int
+) -> Optional[Dict[str, Any]]:
+    """
+    Find the newest successful comparison of url1 vs url2 stored within
+    max_age_seconds that recorded page validators. Returns a dict with id,
+    timestamp and the decoded page_validators, or None.
+    """
+    with _db_pool.get_cursor() as (cursor, conn):
+        cursor.execute(
+            """
+            SELECT id, timestamp, page_validators
+            FROM comparisons
+            WHERE comparison_hash = ?
+              AND COALESCE(status, 'completed') = 'completed'
+              AND error1 IS NULL AND error2 IS NULL
+              AND page_validators IS NOT NULL
+              AND timestamp >= datetime('now', ?)
+            ORDER BY timestamp DESC, id DESC
+            LIMIT 1
+        """,
+            (_comparison_hash(url1, url2), f"-{int(max_age_seconds)} seconds"),
+        )
+        row = cursor.fetchone()
+        if row is None:
+            return None
+        try:
+            validators = json.loads(row["page_validators"])
+        except json.JSONDecodeError:
+            return None
+        return {"id": row["id"], "timestamp": row["timestamp"], "page_validators": validators}
+
+
 def get_recent_comparisons_optimized(limit: int = 10) -> List[Dict[str, Any]]:
     """Get the most recent comparisons with optimized query."""
     with _db_pool.get_cursor() as (cursor, conn):
@@ -412,7 +548,7 @@ def get_comparison_optimized(
                 SELECT id, url1, url2, css1, css2, comparison, error1, error2,
                        broken_links1, broken_links2, images1, images2, results1, results2,
                        links1, links2, links_comparison, text_comparison, timestamp,
-                       comparison_hash, content_size, status
+                       comparison_hash, content_size, status, page_validators
                 FROM comparisons WHERE id = ?
             """,
                 (comparison_id,),
@@ -437,7 +573,7 @@ def get_comparison_optimized(
                 "links2",
                 "text_comparison",
             ]
-            dict_fields = ["results1", "results2", "links_comparison"]
+            dict_fields = ["results1", "results2", "links_comparison", "page_validators"]
 
             for field in list_fields + dict_fields:
                 default = [] if field in list_fields else {}
@@ -468,6 +604,130 @@ def get_comparison_optimized(
         return None
 
 
+# Fields the per-tab endpoints may load, mapped to their empty value when
+# stored as JSON (None for plain text columns).
+_TAB_FIELDS = {
+    "url1": None,
+    "url2": None,
+    "content1": None,
+    "content2": None,
+    "error1": None,
+    "error2": None,
+    "timestamp": None,
+    "status": None,
+    "css1": [],
+    "css2": [],
+    "broken_links1": [],
+    "broken_links2": [],
+    "images1": [],
+    "images2": [],
+    "links1": [],
+    "links2": [],
+    "text_comparison": [],
+    "results1": {},
+    "results2": {},
+    "links_comparison": {},
+    "comparison": None,
+}
+_LIST_FIELDS = {
+    field for field, default in _TAB_FIELDS.items() if isinstance(default, list)
+}
+_JSON_FIELDS = _LIST_FIELDS | {"results1", "results2", "links_comparison", "comparison"}
+
+
+def get_comparison_fields(
+    comparison_id: int, fields: List[str]
+) -> Optional[Dict[str, Any]]:
+    """
+    Load only the given fields of a comparison, e.g. for a single tab.
+    JSON fields are decoded; missing or corrupt values get the empty value
+    the template expects. Returns None if the comparison does not exist.
+    """
+    unknown = set(fields) - set(_TAB_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown comparison fields: {sorted(unknown)}")
+
+    with _db_pool.get_cursor() as (cursor, conn):
+        cursor.execute(
+            f"SELECT id, {', '.join(fields)} FROM comparisons WHERE id = ?",
+            (comparison_id,),
+        )
+        row = cursor.fetchone()
+        if row is None:
+            return None
+
+        data = dict(row)
+        for field in fields:
+            if field not in _JSON_FIELDS:
+                continue
+            default = _TAB_FIELDS[field]
+            raw = data.get(field)
+            if not raw:
+                data[field] = default
+                continue
+            try:
+                data[field] = json.loads(raw)
+            except json.JSONDecodeError:
+                logger.warning(
+                    f"Failed to parse JSON field {field} for comparison {comparison_id}"
+                )
+                data[field] = default
+        return data
+
+
+def get_comparison_list_slice(
+    comparison_id: int, field: str, offset: int = 0, limit: int = 100
+) -> Optional[Dict[str, Any]]:
+    """
+    Page through a JSON list field (e.g. links1, text_comparison) without
+    loading the rest of the row. SQLite's json_each() does the slicing.
+    Returns {"items": [...], "total": n}, or None if the comparison does not
+    exist.
+    """
+    if field not in _LIST_FIELDS:
+        raise ValueError(f"Not a list field: {field}")
+
+    with _db_pool.get_cursor() as (cursor, conn):
+        try:
+            # Only arrays are sliced: an errored comparison stores JSON null
+            cursor.execute(
+                f"""
+                SELECT json_type({field}) = 'array', json_array_length({field})
+                FROM comparisons WHERE id = ?
+            """,
+                (comparison_id,),
+            )
+            row = cursor.fetchone()
+            if row is None:
+                return None
+            if not row[0]:
+                return {"items": [], "total": 0}
+            total = row[1]
+
+            cursor.execute(
+                f"""
+                SELECT json_each.type, json_each.value
+                FROM comparisons, json_each(comparisons.{field})
+                WHERE comparisons.id = ?
+                ORDER BY json_each.key
+                LIMIT ? OFFSET ?
+            """,
+                (comparison_id, limit, offset),
+            )
+        except sqlite3.OperationalError:
+            logger.warning(
+                f"Failed to parse JSON field {field} for comparison {comparison_id}"
+            )
+            return {"items": [], "total": 0}
+
+        # Arrays and objects come back as JSON text; scalars as SQL values.
+        items = [
+            json.loads(value) if value_type in ("array", "object") else value
+            for value_type, value in cursor.fetchall()
+        ]
+        return {"items": items, "total": total}
+
+
 def search_comparisons(query: str, limit: int = 20) -> List[Dict[str, Any]]:
     """Search comparisons by URL with optimized query."""
     with _db_pool.get_cursor() as (cursor, conn):
@@ -0,0 +1,233 @@
+import os
+from typing import Dict, Iterator, List, NamedTuple, Tuple
+from urllib.parse import urljoin
+
+from bs4 import BeautifulSoup
+from bs4.element import NavigableString, PreformattedString
+from lxml import etree, html as lxml_html
+
+HEADER_TAGS = ("h1", "h2", "h3", "h4", "h5", "h6")
+
+# "html.parser" and "lxml" build a BeautifulSoup tree with that tree builder;
+# "lxml-fast" skips BeautifulSoup and works on lxml directly.
+PARSER_BACKENDS = ("html.parser", "lxml", "lxml-fast")
+DEFAULT_PARSER_BACKEND = os.environ.get("COMPARE_WEB_PARSER", "lxml-fast")
+
+# Elements whose text content is never visible.
+_HIDDEN_TEXT_TAGS = frozenset(("script", "style"))
+
+
+class PageExtract(NamedTuple):
+    """Everything the comparison needs from one page, collected in one pass."""
+
+    headers: Dict[str, List[str]]
+    links: List[str]
+    images: List[str]
+    stylesheets: List[str]
+    text: List[str]
+
+
+def _absolute(href: str, base_url: str) -> str:
+    return href if href.startswith("http") else urljoin(base_url, href)
+
+
+def resolve_backend(backend=None) -> str:
+    """Return backend, or the configured default, after validating it."""
+    backend = backend or DEFAULT_PARSER_BACKEND
+    if backend not in PARSER_BACKENDS:
+        raise ValueError(
+            f"Unknown parser backend {backend!r}; expected one of {PARSER_BACKENDS}"
+        )
+    return backend
+
+
+def _parse_tree(html: str):
+    """Parse html into an lxml.html tree, or None for an empty document."""
+    try:
+        try:
+            return lxml_html.document_fromstring(html)
+        except ValueError:
+            # lxml refuses str input that carries an XML encoding declaration.
+            return lxml_html.document_fromstring(html.encode("utf-8"))
+    except etree.LxmlError:
+        return None
+
+
+def _parse_events(html: str):
+    """Parse html with lxml's pull parser and return its buffered events."""
+    parser = etree.HTMLPullParser(events=("start", "end", "comment", "pi"))
+    try:
+        parser.feed(html)
+    except ValueError:
+        # lxml refuses str input that carries an XML encoding declaration.
+        parser = etree.HTMLPullParser(events=("start", "end", "comment", "pi"))
+        parser.feed(html.encode("utf-8"))
+    try:
+        parser.close()
+    except etree.LxmlError:
+        return []  # Empty or unparseable document
+    return parser.read_events()
+
+
+def extract_page(html: str, base_url: str, backend=None) -> PageExtract:
+    """
+    Collect headers, links, images, stylesheet hrefs and visible text lines
+    from html with the given parser backend (see PARSER_BACKENDS).
+    """
+    backend = resolve_backend(backend)
+    if backend == "lxml-fast":
+        return _extract_from_events(html, base_url)
+    return _extract_from_soup(BeautifulSoup(html, backend), base_url)
+
+
+def _is_visible_string(node) -> bool:
+    # Comments, doctypes, CDATA and the like are PreformattedStrings.
+    # Script/style contents are excluded by their parent, not their type, so
+    # this holds for every tree builder.
+    return (
+        isinstance(node, NavigableString)
+        and not isinstance(node, PreformattedString)
+        and (node.parent is None or node.parent.name not in _HIDDEN_TEXT_TAGS)
+    )
+
+
+def _extract_from_soup(soup: BeautifulSoup, base_url: str) -> PageExtract:
+    """Single walk over soup.descendants producing the same PageExtract."""
+    headers = {tag: [] for tag in HEADER_TAGS}
+    links, images, stylesheets, text = [], [], [], []
+
+    for node in soup.descendants:
+        if isinstance(node, NavigableString):
+            if _is_visible_string(node):
+                # Normalize whitespace
+                text.extend(line.strip() for line in node.split("\n") if line.strip())
+            continue
+
+        name = node.name
+        if name in headers:
+            headers[name].append(
+                "".join(
+                    s.strip() for s in node.descendants if _is_visible_string(s)
+                )
+            )
+        elif name == "a":
+            href = node.get("href")
+            if href is not None:
+                links.append(_absolute(href, base_url))
+        elif name == "img":
+            src = node.get("src")
+            if src:
+                images.append(_absolute(src, base_url))
+        elif name == "link":
+            href = node.get("href")
+            rel = [value.lower() for value in node.get("rel") or []]
+            if href and "stylesheet" in rel:
+                stylesheets.append(_absolute(href, base_url))
+
+    return PageExtract(headers, links, images, stylesheets, text)
+
+
+def _extract_from_events(html: str, base_url: str) -> PageExtract:
+    """
+    lxml-fast backend: one walk over lxml parser events, no BeautifulSoup.
+
+    Text is emitted in document order without a second tree walk: the text
+    preceding a node is its previous sibling's tail (or its parent's text)
+    and is final once that node starts; the text after an element's last
+    child is final once the element ends.
+    """
+    headers = {tag: [] for tag in HEADER_TAGS}
+    links, images, stylesheets, text = [], [], [], []
+
+    hidden_depth = 0
+    open_headers = []  # [(element, parts)] for headers currently being read
+
+    def emit(string):
+        if not string or hidden_depth:
+            return
+        for _, parts in open_headers:
+            parts.append(string)
+        # Normalize whitespace
+        text.extend(line.strip() for line in string.split("\n") if line.strip())
+
+    for event, el in _parse_events(html):
+        if event == "end":
+            emit(el[-1].tail if len(el) else el.text)
+            tag = el.tag
+            if tag in _HIDDEN_TEXT_TAGS:
+                hidden_depth -= 1
+            elif open_headers and open_headers[-1][0] is el:
+                _, parts = open_headers.pop()
+                # Same result as BeautifulSoup's get_text(strip=True)
+                headers[tag].append("".join(p.strip() for p in parts))
+            continue
+
+        # "start", "comment" and "pi": everything before this node is known.
+        previous = el.getprevious()
+        if previous is not None:
+            emit(previous.tail)
+        else:
+            parent = el.getparent()
+            if parent is not None:
+                emit(parent.text)
+        if event != "start":
+            continue  # Comment and processing-instruction text is not visible
+
+        tag = el.tag
+        if tag in _HIDDEN_TEXT_TAGS:
+            hidden_depth += 1
+        elif tag in headers:
+            open_headers.append((el, []))
+        elif tag == "a":
+            href = el.get("href")
+            if href is not None:
+                links.append(_absolute(href, base_url))
+        elif tag == "img":
+            src = el.get("src")
+            if src:
+                images.append(_absolute(src, base_url))
+        elif tag == "link":
+            href = el.get("href")
+            if href and "stylesheet" in el.get("rel", "").lower().split():
+                stylesheets.append(_absolute(href, base_url))
+
+    return PageExtract(headers, links, images, stylesheets, text)
+
+
+def _element_text(el) -> str:
+    """Visible text of an lxml element, matching get_text(strip=True)."""
+    parts = [el.text]
+    for child in el:
+        if isinstance(child.tag, str) and child.tag not in _HIDDEN_TEXT_TAGS:
+            parts.append(_element_text(child))
+        parts.append(child.tail)
+    return "".join(part.strip() for part in parts if part)
+
+
+def _soup_attributes(tag) -> Dict[str, str]:
+    # Convert multi-value attributes (like class) to space-separated strings
+    return {
+        attr: " ".join(value) if isinstance(value, list) else value
+        for attr, value in tag.attrs.items()
+    }
+
+
+def iter_anchors(html: str, backend=None) -> Iterator[Tuple[str, str, Dict[str, str]]]:
+    """
+    Yield (href, link_text, attributes) for every <a href> in html, with
+    ALL attributes of the tag as strings. href is returned unresolved.
+    """
+    backend = resolve_backend(backend)
+    if backend == "lxml-fast":
+        root = _parse_tree(html)
+        if root is None:
+            return
+        for a_tag in root.iter("a"):
+            href = a_tag.get("href")
+            if href is not None:
+                yield href, _element_text(a_tag), dict(a_tag.attrib)
+        return
+
+    soup = BeautifulSoup(html, backend)
+    for a_tag in soup.find_all("a", href=True):
+        yield a_tag["href"], a_tag.get_text(strip=True), _soup_attributes(a_tag)
@@ -0,0 +1,61 @@
+import threading
+import time
+from collections import OrderedDict
+
+# HEAD answers that often mean "HEAD not supported" rather than "broken".
+HEAD_FALLBACK_STATUSES = frozenset((403, 405, 501))
+
+# The cheapest GET: one byte, and the body is never read.
+RANGE_GET_HEADERS = {"Range": "bytes=0-0"}
+
+# 416 to a one-byte range request means the resource exists but is empty.
+RANGE_NOT_SATISFIABLE = 416
+
+
+def range_get_status(status_code: int) -> int:
+    """Status of a range GET as the link check should see it."""
+    return 200 if status_code == RANGE_NOT_SATISFIABLE else status_code
+
+
+class HeadSupport:
+    """
+    Thread-safe record of hosts that reject HEAD but serve GET, so their
+    links are checked with a range GET straight away. Entries expire after
+    ttl seconds in case the server is fixed.
+    """
+
+    def __init__(self, ttl: float = 3600.0, max_hosts: int = 10000):
+        self.ttl = ttl
+        self.max_hosts = max_hosts
+        self._unsupported: "OrderedDict[str, float]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def supports_head(self, host: str) -> bool:
+        with self._lock:
+            marked_at = self._unsupported.get(host)
+            if marked_at is None:
+                return True
+            if time.monotonic() - marked_at > self.ttl:
+                del self._unsupported[host]
+                return True
+            return False
+
+    def mark_unsupported(self, host: str):
+        with self._lock:
+            self._unsupported[host] = time.monotonic()
+            self._unsupported.move_to_end(host)
+            while len(self._unsupported) > self.max_hosts:
+                self._unsupported.popitem(last=False)
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return {"hosts_without_head": list(self._unsupported)}
+
+
+# Shared by link validation and the crawler.
+_head_support = HeadSupport()
+
+
+def get_head_support() -> HeadSupport:
+    """Get the global HEAD support record."""
+    return _head_support
@@ -0,0 +1,106 @@
+from bisect import bisect_left
+from collections import Counter, defaultdict, deque
+from typing import Dict, List, Sequence, Tuple
+
+from dom_extractor import HEADER_TAGS
+
+
+def _longest_increasing(values: Sequence[int]) -> List[int]:
+    """
+    Indexes of one longest strictly increasing subsequence of values, in
+    O(n log n) (patience sorting).
+    """
+    # tail_values[k] is the smallest last value of an increasing run of
+    # length k + 1 seen so far, and tails[k] its index.
+    tails: List[int] = []
+    tail_values: List[int] = []
+    previous = [-1] * len(values)
+    for i, value in enumerate(values):
+        k = bisect_left(tail_values, value)
+        if k:
+            previous[i] = tails[k - 1]
+        if k == len(tails):
+            tails.append(i)
+            tail_values.append(value)
+        else:
+            tails[k] = i
+            tail_values[k] = value
+
+    run = []
+    i = tails[-1] if tails else -1
+    while i != -1:
+        run.append(i)
+        i = previous[i]
+    run.reverse()
+    return run
+
+
+def diff_header_list(headers1: List[str], headers2: List[str]) -> dict:
+    """
+    Occurrence-level diff of one header level.
+
+    The k-th occurrence of a header on one page is paired with its k-th
+    occurrence on the other. Unpaired occurrences are "removed" (page 1) or
+    "added" (page 2). Of the paired ones, the largest set that keeps its
+    relative order is "same" and the rest are "moved".
+
+    Returns {"side1": [status per header of page 1],
+    "side2": [status per header of page 2], "pairs": [[index1, index2], ...]}.
+    """
+    positions: Dict[str, deque] = defaultdict(deque)
+    for j, header in enumerate(headers2):
+        positions[header].append(j)
+
+    pairs: List[Tuple[int, int]] = []
+    for i, header in enumerate(headers1):
+        queue = positions.get(header)
+        if queue:
+            pairs.append((i, queue.popleft()))
+
+    side1 = ["removed"] * len(headers1)
+    side2 = ["added"] * len(headers2)
+    for i, j in pairs:
+        side1[i] = side2[j] = "moved"
+    # pairs is ordered by index1, so the in-order pairs are the longest
+    # increasing run of index2.
+    for k in _longest_increasing([j for _, j in pairs]):
+        i, j = pairs[k]
+        side1[i] = side2[j] = "same"
+
+    return {"side1": side1, "side2": side2, "pairs": [list(pair) for pair in pairs]}
+
+
+def diff_headers(
+    headers1: Dict[str, List[str]], headers2: Dict[str, List[str]]
+) -> Dict[str, dict]:
+    """diff_header_list() for every header level (h1-h6)."""
+    return {
+        tag: diff_header_list(headers1.get(tag, []), headers2.get(tag, []))
+        for tag in HEADER_TAGS
+    }
+
+
+def summarize_headers(
+    headers1: Dict[str, List[str]], headers2: Dict[str, List[str]]
+) -> Dict[str, list]:
+    """
+    Per level, one (header1, header2, presence) tuple per distinct header in
+    document order: "both" if it occurs equally often on both pages,
+    "modified" if on both but a different number of times, "one" if only
+    on one page.
+    """
+    summary = {}
+    for tag in HEADER_TAGS:
+        list1, list2 = headers1.get(tag, []), headers2.get(tag, [])
+        counts1, counts2 = Counter(list1), Counter(list2)
+        entries = []
+        for header in dict.fromkeys(list1 + list2):
+            if header in counts1 and header in counts2:
+                presence = "both" if counts1[header] == counts2[header] else "modified"
+                entries.append((header, header, presence))
+            elif header in counts1:
+                entries.append((header, None, "one"))
+            else:
+                entries.append((None, header, "one"))
+        summary[tag] = entries
+    return summary
@@ -0,0 +1,148 @@
+import threading
+import time
+from typing import Dict, Iterable
+
+# Status reported for links that were not requested because their host's
+# breaker is open.
+HOST_UNREACHABLE_STATUS = "ERROR (host unreachable)"
+
+# Decisions returned by HostCircuitBreaker.before_request(). PROBE lets
+# the request through as the half-open probe; its result must be recorded
+# with probe=True.
+ALLOW = "allow"
+PROBE = "probe"
+REJECT = "reject"
+WAIT = "wait"
+
+
+class _Breaker:
+    __slots__ = ("state", "failures", "opened_at", "probing")
+
+    def __init__(self):
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probing = False
+
+
+class HostCircuitBreaker:
+    """
+    Thread-safe per-host circuit breaker.
+
+    closed: requests go through; failure_threshold consecutive connection
+    failures or timeouts open the breaker.
+    open: requests are rejected without being sent, for reset_timeout
+    seconds.
+    half_open: then a single probe request is let through while others
+    wait. If it reaches the host the breaker closes, otherwise it opens
+    again. Requests that started before the breaker opened and finish
+    while it is half open only update the failure count.
+    Any HTTP response, even an error status, counts as the host being
+    reachable.
+    """
+
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._hosts: Dict[str, _Breaker] = {}
+        self._lock = threading.Lock()
+
+    def _breaker(self, host: str) -> _Breaker:
+        """Get or create the breaker of host. Holds _lock."""
+        breaker = self._hosts.get(host)
+        if breaker is None:
+            breaker = self._hosts[host] = _Breaker()
+        return breaker
+
+    def before_request(self, host: str) -> str:
+        """
+        Decide whether a request to host may be sent: ALLOW, PROBE (send it
+        as the half-open probe), REJECT (the breaker is open) or WAIT (a
+        probe is in flight; ask again later).
+        """
+        with self._lock:
+            breaker = self._breaker(host)
+            if breaker.state == "closed":
+                return ALLOW
+            if breaker.state == "open":
+                if time.monotonic() - breaker.opened_at < self.reset_timeout:
+                    return REJECT
+                breaker.state = "half_open"
+            if breaker.probing:
+                return WAIT
+            breaker.probing = True
+            return PROBE
+
+    def record_result(self, host: str, failed: bool, probe: bool = False):
+        """
+        Record whether a request let through by before_request() reached
+        host. probe is whether before_request() answered PROBE for it.
+        """
+        with self._lock:
+            breaker = self._breaker(host)
+            if probe and breaker.state == "half_open":
+                breaker.probing = False
+                if failed:
+                    breaker.state = "open"
+                    breaker.opened_at = time.monotonic()
+                    breaker.failures += 1
+                else:
+                    breaker.state = "closed"
+                    breaker.failures = 0
+                return
+
+            if not failed:
+                breaker.failures = 0
+                return
+            breaker.failures += 1
+            if breaker.state == "closed" and breaker.failures >= self.failure_threshold:
+                breaker.state = "open"
+                breaker.opened_at = time.monotonic()
+
+    def cancel(self, host: str, probe: bool = False):
+        """Forget a request let through by before_request() that was never completed."""
+        if not probe:
+            return
+        with self._lock:
+            breaker = self._hosts.get(host)
+            if breaker is not None and breaker.state == "half_open":
+                breaker.probing = False
+
+    def get_state(self, host: str) -> str:
+        with self._lock:
+            breaker = self._hosts.get(host)
+            return breaker.state if breaker is not None else "closed"
+
+    def get_host_states(self, hosts: Iterable[str]) -> Dict[str, dict]:
+        """State and consecutive failure count of each of hosts."""
+        with self._lock:
+            states = {}
+            for host in hosts:
+                breaker = self._hosts.get(host)
+                states[host] = {
+                    "state": breaker.state if breaker is not None else "closed",
+                    "failures": breaker.failures if breaker is not None else 0,
+                }
+            return states
+
+    def reset(self, host: str):
+        with self._lock:
+            self._hosts.pop(host, None)
+
+    def get_stats(self) -> dict:
+        """Hosts whose breaker is not closed, with their state."""
+        with self._lock:
+            return {
+                host: {"state": breaker.state, "failures": breaker.failures}
+                for host, breaker in self._hosts.items()
+                if breaker.state != "closed"
+            }
+
+
+# Shared by link validation and the crawler.
+_host_breaker = HostCircuitBreaker()
+
+
+def get_host_breaker() -> HostCircuitBreaker:
+    """Get the global host circuit breaker."""
+    return _host_breaker
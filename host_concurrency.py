@@ -0,0 +1,193 @@
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, Iterable, Optional
+
+# Responses that mean "slow down" rather than "this link is broken".
+RETRY_STATUSES = frozenset((429, 503))
+
+# Process-wide cap on concurrent link checks across all hosts and runs.
+MAX_CONNECTIONS = int(os.environ.get("COMPARE_WEB_MAX_CONNECTIONS", "64"))
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date)."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+class _HostState:
+    __slots__ = ("limit", "ssthresh", "in_flight", "base_latency", "blocked_until", "backoff")
+
+    def __init__(self, limit: float, ssthresh: float, backoff: float):
+        self.limit = limit
+        self.ssthresh = ssthresh
+        self.in_flight = 0
+        self.base_latency: Optional[float] = None
+        self.blocked_until = 0.0
+        self.backoff = backoff
+
+
+class HostConcurrencyController:
+    """
+    Thread-safe per-host concurrency limits, adjusted AIMD-style from how
+    each host responds, under a global cap on requests in flight.
+
+    A host starts at initial_limit and grows by one per response while its
+    window is in use (slow start), then by 1/limit once it has pushed back
+    (congestion avoidance). 429/503 responses and timeouts halve its limit;
+    429/503 also pause the host for Retry-After (or an exponential backoff).
+    Responses much slower than the host's baseline latency shrink the limit
+    gently.
+    """
+
+    def __init__(
+        self,
+        global_limit: int = MAX_CONNECTIONS,
+        initial_limit: int = 4,
+        min_limit: int = 1,
+        max_limit: int = 64,
+        latency_tolerance: float = 2.0,
+        default_backoff: float = 1.0,
+        max_backoff: float = 30.0,
+    ):
+        self.global_limit = global_limit
+        self.initial_limit = initial_limit
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_tolerance = latency_tolerance
+        self.default_backoff = default_backoff
+        self.max_backoff = max_backoff
+        self._hosts: Dict[str, _HostState] = {}
+        self._in_flight = 0
+        self._lock = threading.Lock()
+
+    def _state(self, host: str) -> _HostState:
+        """Get or create the state of host. Holds _lock."""
+        state = self._hosts.get(host)
+        if state is None:
+            state = _HostState(self.initial_limit, self.max_limit, self.default_backoff)
+            self._hosts[host] = state
+        return state
+
+    def try_acquire(self, host: str) -> bool:
+        """Take a request slot for host if one is free right now."""
+        with self._lock:
+            state = self._state(host)
+            if (
+                self._in_flight >= self.global_limit
+                or state.in_flight >= int(state.limit)
+                or time.monotonic() < state.blocked_until
+            ):
+                return False
+            state.in_flight += 1
+            self._in_flight += 1
+            return True
+
+    def cancel(self, host: str):
+        """Return a slot taken by try_acquire() that was not used."""
+        with self._lock:
+            self._state(host).in_flight -= 1
+            self._in_flight -= 1
+
+    def release(
+        self,
+        host: str,
+        elapsed: float,
+        status_code: Optional[int] = None,
+        retry_after: Optional[str] = None,
+        timed_out: bool = False,
+    ):
+        """
+        Return a slot taken by try_acquire() and adapt host's limit to how
+        the request went: its duration, HTTP status and Retry-After header.
+        """
+        with self._lock:
+            state = self._state(host)
+            window_full = state.in_flight >= int(state.limit)
+            state.in_flight -= 1
+            self._in_flight -= 1
+
+            if status_code in RETRY_STATUSES or timed_out:
+                # Multiplicative decrease
+                state.ssthresh = max(self.min_limit, state.limit / 2)
+                state.limit = state.ssthresh
+                if status_code in RETRY_STATUSES:
+                    delay = parse_retry_after(retry_after)
+                    if delay is None:
+                        delay = state.backoff
+                        state.backoff = min(state.backoff * 2, self.max_backoff)
+                    state.blocked_until = max(
+                        state.blocked_until, time.monotonic() + delay
+                    )
+                return
+
+            state.backoff = self.default_backoff
+            if state.base_latency is None or elapsed < state.base_latency:
+                state.base_latency = elapsed
+            else:
+                # Let the baseline drift up slowly so one lucky fast
+                # response does not make every later one look slow.
+                state.base_latency += (elapsed - state.base_latency) * 0.01
+
+            if elapsed > self.latency_tolerance * state.base_latency + 0.05:
+                # The host is queueing requests: back off gently.
+                state.limit = max(self.min_limit, state.limit - 1 / state.limit)
+            elif window_full:
+                # Additive increase, only while the window is actually used
+                step = 1 if state.limit < state.ssthresh else 1 / state.limit
+                state.limit = min(self.max_limit, state.limit + step)
+
+    def ready_in(self, host: str) -> float:
+        """Seconds until host's Retry-After pause ends (0 if not paused)."""
+        with self._lock:
+            state = self._hosts.get(host)
+            if state is None:
+                return 0.0
+            return max(0.0, state.blocked_until - time.monotonic())
+
+    def next_ready_in(self, hosts: Iterable[str]) -> float:
+        """Seconds until the first of hosts leaves its Retry-After pause."""
+        return min((self.ready_in(host) for host in hosts), default=0.0)
+
+    def get_limit(self, host: str) -> int:
+        with self._lock:
+            return int(self._state(host).limit)
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return {
+                "in_flight": self._in_flight,
+                "hosts": {
+                    host: {
+                        "limit": round(state.limit, 2),
+                        "in_flight": state.in_flight,
+                        "paused_for": round(
+                            max(0.0, state.blocked_until - time.monotonic()), 2
+                        ),
+                    }
+                    for host, state in self._hosts.items()
+                },
+            }
+
+
+# Shared by all link validation, so the global cap and what was learned
+# about each host hold across comparisons.
+_host_controller = HostConcurrencyController()
+
+
+def get_host_controller() -> HostConcurrencyController:
+    """Get the global host concurrency controller."""
+    return _host_controller
@@ -1,11 +1,25 @@
+import asyncio
 import requests
 from urllib.parse import urlparse
-from typing import Dict
+from typing import Dict, List, Optional, Tuple
 import threading
 import ipaddress
+import os
 import socket
+import time
+from collections import OrderedDict
 from contextlib import contextmanager
 
+import aiohttp
+from aiohttp.abc import AbstractResolver
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.exceptions import ConnectTimeoutError, NewConnectionError
+
+# Seconds a validated DNS answer is reused by assert_safe_url() and by the
+# connections opened through the safe adapter and resolver.
+DNS_CACHE_TTL = int(os.environ.get("COMPARE_WEB_DNS_TTL", "60"))
+
 
 class UnsafeURLError(ValueError):
     """Raised when a URL targets a disallowed scheme or a private/internal host."""
@@ -23,11 +37,119 @@ def _is_disallowed_ip(ip: "ipaddress._BaseAddress") -> bool:
     )
 
 
+def _check_ip_literal(hostname: str) -> Optional[int]:
+    """
+    If hostname is a literal IP address, raise UnsafeURLError when it is
+    disallowed and return its address family; return None for host names.
+    """
+    address = hostname.strip("[]").lower()
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return None  # Not a literal IP
+    if _is_disallowed_ip(ip):
+        raise UnsafeURLError(f"Disallowed host address: {hostname}")
+    return socket.AF_INET6 if ip.version == 6 else socket.AF_INET
+
+
+class SafeDNSCache:
+    """
+    Thread-safe TTL cache of DNS answers that passed the SSRF check.
+
+    A host name is resolved at most once per ttl seconds, and only to
+    addresses that are all allowed; hosts with a disallowed address are
+    cached as unsafe for the same time. Resolution failures are not cached.
+    """
+
+    def __init__(self, ttl: int = DNS_CACHE_TTL, max_hosts: int = 10000):
+        self.ttl = ttl
+        self.max_hosts = max_hosts
+        # host -> (addresses, or the UnsafeURLError message, expires_at)
+        self._entries: "OrderedDict[str, Tuple[object, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def resolve(self, hostname: str) -> List[Tuple[int, str]]:
+        """
+        Allowed (family, ip) addresses of hostname. Raises UnsafeURLError if
+        it cannot be resolved or resolves to any disallowed address.
+        """
+        key = hostname.lower()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                answer = entry[0]
+            else:
+                self.misses += 1
+                answer = None
+        if answer is None:
+            answer = self._lookup(hostname)
+            with self._lock:
+                self._entries[key] = (answer, time.monotonic() + self.ttl)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_hosts:
+                    self._entries.popitem(last=False)
+        if isinstance(answer, str):
+            raise UnsafeURLError(answer)
+        return answer
+
+    def _lookup(self, hostname: str):
+        try:
+            addr_info = socket.getaddrinfo(hostname, None, type=socket.SOCK_STREAM)
+        except socket.gaierror as e:
+            raise UnsafeURLError(f"Could not resolve host {hostname}: {e}") from e
+
+        addresses = list(
+            dict.fromkeys((family, sockaddr[0]) for family, _, _, _, sockaddr in addr_info)
+        )
+        for _, address in addresses:
+            ip = ipaddress.ip_address(address)
+            if _is_disallowed_ip(ip):
+                return f"Host {hostname} resolves to disallowed address {ip}"
+        return addresses
+
+    def forget(self, hostname: str):
+        with self._lock:
+            self._entries.pop(hostname.lower(), None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return {"hosts": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+_dns_cache = SafeDNSCache()
+
+
+def get_dns_cache() -> SafeDNSCache:
+    """Get the global validated DNS cache."""
+    return _dns_cache
+
+
+def resolve_safe(hostname: str) -> List[Tuple[int, str]]:
+    """
+    The (family, ip) addresses it is safe to connect to for hostname, which
+    may be a literal IP. Raises UnsafeURLError otherwise.
+    """
+    family = _check_ip_literal(hostname)
+    if family is not None:
+        return [(family, hostname.strip("[]"))]
+    return _dns_cache.resolve(hostname)
+
+
 def assert_safe_url(url: str) -> None:
     """
     Guard against SSRF: only allow http(s) URLs whose host does not resolve to a
     private, loopback, link-local, or otherwise internal address. Raises
-    UnsafeURLError when the URL should not be fetched.
+    UnsafeURLError when the URL should not be fetched. Host names are
+    resolved through the shared DNS cache, so the connection made later by
+    a safe session or connector uses the same, already validated, answer.
     """
     parsed = urlparse(url)
     if parsed.scheme not in ("http", "https"):
@@ -37,28 +159,114 @@ def assert_safe_url(url: str) -> None:
     if not hostname:
         raise UnsafeURLError("URL has no host")
 
-    # If the host is a literal IP, check it directly.
-    try:
-        literal_ip = ipaddress.ip_address(hostname)
-    except ValueError:
-        literal_ip = None  # Not a literal IP; resolve the hostname below.
+    resolve_safe(hostname)
 
-    if literal_ip is not None:
-        if _is_disallowed_ip(literal_ip):
-            raise UnsafeURLError(f"Disallowed host address: {hostname}")
-        return
 
-    try:
-        addr_info = socket.getaddrinfo(hostname, parsed.port or None)
-    except socket.gaierror as e:
-        raise UnsafeURLError(f"Could not resolve host {hostname}: {e}") from e
+class _SafeConnectionMixin:
+    """
+    Connect to an address from resolve_safe() instead of letting urllib3
+    resolve the host again, so the address that was checked is the one
+    connected to. TLS still verifies the certificate for the host name.
+    """
+
+    def _new_conn(self):
+        hostname = self._dns_host
+        error = None
+        for _, address in resolve_safe(hostname):
+            self._dns_host = address
+            try:
+                return super()._new_conn()
+            except (ConnectTimeoutError, NewConnectionError) as e:
+                error = e
+            finally:
+                self._dns_host = hostname
+        raise error
+
+
+class SafeHTTPConnection(_SafeConnectionMixin, HTTPConnection):
+    pass
+
+
+class SafeHTTPSConnection(_SafeConnectionMixin, HTTPSConnection):
+    pass
+
+
+class _SafeHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = SafeHTTPConnection
+
+
+class _SafeHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = SafeHTTPSConnection
+
 
-    for family, _, _, _, sockaddr in addr_info:
-        ip = ipaddress.ip_address(sockaddr[0])
-        if _is_disallowed_ip(ip):
-            raise UnsafeURLError(
-                f"Host {hostname} resolves to disallowed address {ip}"
-            )
+class SafeHTTPAdapter(requests.adapters.HTTPAdapter):
+    """HTTPAdapter whose connections only go to addresses allowed by resolve_safe()."""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _SafeHTTPConnectionPool,
+            "https": _SafeHTTPSConnectionPool,
+        }
+
+
+def create_safe_session(**adapter_kwargs) -> requests.Session:
+    """A requests.Session with SafeHTTPAdapter mounted for http and https."""
+    session = requests.Session()
+    adapter = SafeHTTPAdapter(**adapter_kwargs)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+class SafeResolver(AbstractResolver):
+    """aiohttp resolver answering from the validated DNS cache."""
+
+    async def resolve(self, host: str, port: int = 0, family=socket.AF_INET):
+        addresses = await asyncio.get_running_loop().run_in_executor(
+            None, resolve_safe, host
+        )
+        if family != socket.AF_UNSPEC:
+            # Prefer the requested family, but fall back to the others.
+            addresses = [a for a in addresses if a[0] == family] or addresses
+        return [
+            {
+                "hostname": host,
+                "host": address,
+                "port": port,
+                "family": address_family,
+                "proto": 0,
+                "flags": socket.AI_NUMERICHOST,
+            }
+            for address_family, address in addresses
+        ]
+
+    async def close(self):
+        pass
+
+
+async def _reject_unsafe_ip_literals(request, handler):
+    """
+    aiohttp middleware (run for every redirect hop too) checking literal IP
+    hosts, which aiohttp connects to without asking the resolver.
+    """
+    _check_ip_literal(request.url.raw_host or "")
+    return await handler(request)
+
+
+def create_safe_client_session(limit: int = 100) -> aiohttp.ClientSession:
+    """
+    An aiohttp.ClientSession that only connects to addresses allowed by
+    resolve_safe(). Must be called with an event loop running.
+    """
+    # Per-host limits come from the host concurrency controller, and DNS
+    # answers are cached (and validated) by SafeResolver.
+    connector = aiohttp.TCPConnector(
+        limit=limit, limit_per_host=0, resolver=SafeResolver(), use_dns_cache=False
+    )
+    return aiohttp.ClientSession(
+        connector=connector, middlewares=(_reject_unsafe_ip_literals,)
+    )
 
 
 class HTTPSessionManager:
@@ -95,8 +303,9 @@ class HTTPSessionManager:
                     }
                 )
 
-                # Configure connection pooling
-                adapter = requests.adapters.HTTPAdapter(
+                # Configure connection pooling; connections only go to
+                # addresses validated by resolve_safe()
+                adapter = SafeHTTPAdapter(
                     pool_connections=10,  # Number of connection pools
                     pool_maxsize=20,  # Max connections per pool
                     max_retries=3,  # Retry failed requests
@@ -225,7 +434,6 @@ session_stats = SessionStats()
 
 if __name__ == "__main__":
     # Example usage and performance test
-    import time
 
     test_urls = [
         "https://example.com",
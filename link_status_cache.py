@@ -0,0 +1,197 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from database_optimized import DatabaseConnectionPool, get_db_pool
+
+logger = logging.getLogger(__name__)
+
+# Seconds a link check result stays valid. Errors are kept for much less
+# time than successes so a temporarily failing link is re-checked soon.
+# A TTL of 0 disables caching for that kind of result.
+LINK_CACHE_OK_TTL = int(os.environ.get("COMPARE_WEB_LINK_CACHE_OK_TTL", "21600"))
+LINK_CACHE_ERROR_TTL = int(os.environ.get("COMPARE_WEB_LINK_CACHE_ERROR_TTL", "300"))
+
+# SQLite limits the number of bound parameters per statement.
+_SQL_BATCH_SIZE = 500
+
+
+class LinkStatusCache:
+    """
+    Cache of link check results ("OK" or "ERROR (...)") keyed by URL.
+
+    Two tiers: a thread-safe in-memory LRU in front of a SQLite table, so
+    results survive restarts and are shared between processes using the
+    same database. Both tiers store an absolute expiry time; stale entries
+    are never returned.
+    """
+
+    def __init__(
+        self,
+        db_pool: Optional[DatabaseConnectionPool] = None,
+        max_entries: int = 20000,
+        ok_ttl: int = LINK_CACHE_OK_TTL,
+        error_ttl: int = LINK_CACHE_ERROR_TTL,
+    ):
+        self.db_pool = db_pool
+        self.max_entries = max_entries
+        self.ok_ttl = ok_ttl
+        self.error_ttl = error_ttl
+        self._entries: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._table_ready = False
+        self.hits = 0
+        self.misses = 0
+
+    def _pool(self) -> DatabaseConnectionPool:
+        return self.db_pool if self.db_pool is not None else get_db_pool()
+
+    def _ensure_table(self, cursor):
+        if self._table_ready:
+            return
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS link_status (
+                url TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                checked_at REAL NOT NULL,
+                expires_at REAL NOT NULL
+            )
+        """)
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_link_status_expires ON link_status(expires_at)"
+        )
+        self._table_ready = True
+
+    def ttl_for(self, status: str) -> int:
+        return self.ok_ttl if status == "OK" else self.error_ttl
+
+    def _remember(self, url: str, status: str, expires_at: float):
+        """Add an entry to the memory tier. Holds _lock."""
+        self._entries[url] = (status, expires_at)
+        self._entries.move_to_end(url)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get_many(self, urls: Iterable[str]) -> Dict[str, str]:
+        """Return {url: status} for the URLs with a fresh cached result."""
+        now = time.time()
+        urls = list(dict.fromkeys(urls))
+        found: Dict[str, str] = {}
+        missing: List[str] = []
+        with self._lock:
+            for url in urls:
+                entry = self._entries.get(url)
+                if entry is not None and entry[1] > now:
+                    self._entries.move_to_end(url)
+                    found[url] = entry[0]
+                else:
+                    missing.append(url)
+
+        if missing:
+            try:
+                with self._pool().get_cursor() as (cursor, conn):
+                    self._ensure_table(cursor)
+                    rows = []
+                    for start in range(0, len(missing), _SQL_BATCH_SIZE):
+                        batch = missing[start : start + _SQL_BATCH_SIZE]
+                        cursor.execute(
+                            f"""
+                            SELECT url, status, expires_at FROM link_status
+                            WHERE url IN ({', '.join('?' * len(batch))})
+                            AND expires_at > ?
+                        """,
+                            (*batch, now),
+                        )
+                        rows.extend(cursor.fetchall())
+            except sqlite3.Error as e:
+                logger.warning(f"Link status cache lookup failed: {e}")
+                rows = []
+
+            with self._lock:
+                for url, status, expires_at in rows:
+                    found[url] = status
+                    self._remember(url, status, expires_at)
+
+        with self._lock:
+            self.hits += len(found)
+            self.misses += len(urls) - len(found)
+        return found
+
+    def put_many(self, results: Iterable[Tuple[str, str]]):
+        """Store (url, status) check results in both tiers."""
+        now = time.time()
+        rows = []
+        with self._lock:
+            for url, status in dict(results).items():
+                ttl = self.ttl_for(status)
+                if ttl <= 0:
+                    continue
+                self._remember(url, status, now + ttl)
+                rows.append((url, status, now, now + ttl))
+        if not rows:
+            return
+
+        try:
+            with self._pool().get_cursor() as (cursor, conn):
+                self._ensure_table(cursor)
+                cursor.execute("BEGIN")
+                try:
+                    cursor.executemany(
+                        """
+                        INSERT OR REPLACE INTO link_status (url, status, checked_at, expires_at)
+                        VALUES (?, ?, ?, ?)
+                    """,
+                        rows,
+                    )
+                    conn.commit()
+                except Exception:
+                    conn.rollback()
+                    raise
+        except sqlite3.Error as e:
+            logger.warning(f"Link status cache update failed: {e}")
+
+    def get(self, url: str) -> Optional[str]:
+        return self.get_many([url]).get(url)
+
+    def put(self, url: str, status: str):
+        self.put_many([(url, status)])
+
+    def purge_expired(self) -> int:
+        """Delete expired entries from both tiers; returns the rows deleted."""
+        now = time.time()
+        with self._lock:
+            for url in [u for u, (_, exp) in self._entries.items() if exp <= now]:
+                del self._entries[url]
+        with self._pool().get_cursor() as (cursor, conn):
+            self._ensure_table(cursor)
+            cursor.execute("DELETE FROM link_status WHERE expires_at <= ?", (now,))
+            return cursor.rowcount
+
+    def clear(self):
+        """Drop every cached result from both tiers."""
+        with self._lock:
+            self._entries.clear()
+        with self._pool().get_cursor() as (cursor, conn):
+            self._ensure_table(cursor)
+            cursor.execute("DELETE FROM link_status")
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return {
+                "memory_entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+# Process-wide cache shared by link validation and the crawler.
+_link_status_cache = LinkStatusCache()
+
+
+def get_link_status_cache() -> LinkStatusCache:
+    """Get the global link status cache."""
+    return _link_status_cache
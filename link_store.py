@@ -0,0 +1,295 @@
+import mmap
+import os
+import tempfile
+from array import array
+from collections.abc import Mapping, Sequence
+from typing import Any, Dict, Iterator, List, Optional
+
+# Occurrence arrays of a CompactLinkStore above this many megabytes are
+# moved to a temporary file and read back through mmap.
+LINK_STORE_SPILL_MB = int(os.environ.get("COMPARE_WEB_LINK_STORE_SPILL_MB", "256"))
+
+
+class LinkStore(Mapping):
+    """
+    The crawler's links, keyed by URL in discovery order. Each value is a
+    link detail dict: {"url", "is_internal", "accessible", "status",
+    "sources": [{"page", "text", "attributes", "raw_url"}, ...]}.
+
+    This is the plain layout, one dict per occurrence; CompactLinkStore
+    has the same interface and keeps the same data in far less memory.
+    """
+
+    def __init__(self):
+        self._details: Dict[str, Dict[str, Any]] = {}
+
+    def __getitem__(self, url: str) -> Dict[str, Any]:
+        return self._details[url]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._details)
+
+    def __len__(self) -> int:
+        return len(self._details)
+
+    def __contains__(self, url) -> bool:
+        return url in self._details
+
+    def add_link(self, url: str, is_internal: bool) -> bool:
+        """Add url if it is new; returns whether it was."""
+        if url in self._details:
+            return False
+        self._details[url] = {
+            "url": url,  # Store the URL itself for easy access
+            "is_internal": is_internal,
+            "accessible": None,  # Filled in by the post-crawl pass
+            "status": None,  # "OK" or "ERROR (...)", ditto
+            "sources": [],  # One {page, text, attributes, raw_url} dict per occurrence
+        }
+        return True
+
+    def add_occurrence(self, url, page, text, attributes, raw_url):
+        """Record that page links to url (added with add_link) as raw_url."""
+        self._details[url]["sources"].append(
+            {"page": page, "text": text, "attributes": attributes, "raw_url": raw_url}
+        )
+
+    def is_internal(self, url: str) -> bool:
+        return self._details[url]["is_internal"]
+
+    def set_status(self, url: str, status: str):
+        self._details[url]["accessible"] = status == "OK"
+        self._details[url]["status"] = status
+
+    def unchecked(self) -> List[str]:
+        """URLs whose status is not known yet, in discovery order."""
+        return [url for url, detail in self._details.items() if detail["accessible"] is None]
+
+    def close(self):
+        pass
+
+
+class _StringTable:
+    """Each distinct string stored once; strings are referred to by ID."""
+
+    __slots__ = ("strings", "ids")
+
+    def __init__(self):
+        self.strings: List[Optional[str]] = [None]  # ID 0 is None
+        self.ids: Dict[str, int] = {}
+
+    def id_of(self, value: Optional[str]) -> int:
+        if value is None:
+            return 0
+        string_id = self.ids.get(value)
+        if string_id is None:
+            string_id = self.ids[value] = len(self.strings)
+            self.strings.append(value)
+        return string_id
+
+
+class _LazySources(Sequence):
+    """The sources list of one link, built from its occurrence records on access."""
+
+    __slots__ = ("_store", "_occurrences")
+
+    def __init__(self, store: "CompactLinkStore", occurrences: array):
+        self._store = store
+        self._occurrences = occurrences
+
+    def __len__(self) -> int:
+        return len(self._occurrences)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._store._source(i) for i in self._occurrences[index]]
+        return self._store._source(self._occurrences[index])
+
+    def __eq__(self, other) -> bool:
+        # Compares like the list it stands for
+        if not isinstance(other, (list, _LazySources)):
+            return NotImplemented
+        return len(self) == len(other) and list(self) == list(other)
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return repr(list(self))
+
+
+class CompactLinkStore(Mapping):
+    """
+    LinkStore with a compact layout for large crawls, where every page
+    repeats the same navigation links:
+
+    - page URLs, link texts and raw URLs are kept once each in a string
+      table, and each distinct attribute dict once in an attribute table
+    - an occurrence is five ints (link, page, text, attributes, raw URL
+      IDs) in one array, instead of a dict per occurrence
+    - link details and their sources are built on access; the attribute
+      dicts they hold are shared and must not be modified
+
+    Once the occurrence array grows past spill_bytes it is appended to a
+    temporary file and read back through mmap, so it is paged in by the OS
+    as needed instead of held in memory.
+    """
+
+    _FIELDS = 5  # link, page, text, attributes, raw URL (-1: same as the link)
+
+    def __init__(self, spill_bytes: int = LINK_STORE_SPILL_MB * 1024 * 1024):
+        self.spill_bytes = spill_bytes
+        self._strings = _StringTable()
+        self._urls: List[str] = []
+        self._link_ids: Dict[str, int] = {}
+        self._internal = bytearray()
+        self._status = array("i")  # String ID, 0 while unchecked
+        self._attributes: List[Dict[str, Any]] = []
+        self._attribute_ids: Dict[Any, int] = {}
+        self._records = array("i")
+        self._spill_file = None
+        self._spilled = 0  # Occurrences in the spill file
+        self._spill_view = None  # (mmap, memoryview) of the spill file
+        self._by_link: Optional[List[array]] = None  # Occurrences per link, built on demand
+
+    def __len__(self) -> int:
+        return len(self._urls)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._urls)
+
+    def __contains__(self, url) -> bool:
+        return url in self._link_ids
+
+    def __getitem__(self, url: str) -> Dict[str, Any]:
+        link_id = self._link_ids[url]
+        status = self._strings.strings[self._status[link_id]]
+        return {
+            "url": url,
+            "is_internal": bool(self._internal[link_id]),
+            "accessible": None if status is None else status == "OK",
+            "status": status,
+            "sources": _LazySources(self, self._occurrences_of(link_id)),
+        }
+
+    def add_link(self, url: str, is_internal: bool) -> bool:
+        if url in self._link_ids:
+            return False
+        self._link_ids[url] = len(self._urls)
+        self._urls.append(url)
+        self._internal.append(is_internal)
+        self._status.append(0)
+        if self._by_link is not None:
+            self._by_link.append(array("I"))
+        return True
+
+    def _attribute_id(self, attributes: Dict[str, Any]) -> int:
+        try:
+            key = tuple(attributes.items())
+            hash(key)
+        except TypeError:  # Unhashable values, e.g. a class list
+            key = repr(attributes)
+        attribute_id = self._attribute_ids.get(key)
+        if attribute_id is None:
+            attribute_id = self._attribute_ids[key] = len(self._attributes)
+            self._attributes.append(attributes)
+        return attribute_id
+
+    def add_occurrence(self, url, page, text, attributes, raw_url):
+        link_id = self._link_ids[url]
+        strings = self._strings
+        if self._by_link is not None:
+            self._by_link[link_id].append(self._spilled + len(self._records) // self._FIELDS)
+        self._records.extend(
+            (
+                link_id,
+                strings.id_of(page),
+                strings.id_of(text),
+                self._attribute_id(attributes),
+                -1 if raw_url == url else strings.id_of(raw_url),
+            )
+        )
+        if self._records.itemsize * len(self._records) >= self.spill_bytes:
+            self._spill()
+
+    def is_internal(self, url: str) -> bool:
+        return bool(self._internal[self._link_ids[url]])
+
+    def set_status(self, url: str, status: str):
+        self._status[self._link_ids[url]] = self._strings.id_of(status)
+
+    def unchecked(self) -> List[str]:
+        return [url for url, status in zip(self._urls, self._status) if status == 0]
+
+    def _spill(self):
+        """Move the in-memory occurrence records to the end of the spill file."""
+        if self._spill_file is None:
+            self._spill_file = tempfile.TemporaryFile(prefix="compare-web-links-")
+        self._spill_file.seek(0, os.SEEK_END)
+        self._records.tofile(self._spill_file)
+        self._spill_file.flush()
+        self._spilled += len(self._records) // self._FIELDS
+        self._records = array("i")
+        self._release_view()
+
+    def _release_view(self):
+        if self._spill_view is not None:
+            mapped, view = self._spill_view
+            view.release()
+            mapped.close()
+            self._spill_view = None
+
+    def _record(self, occurrence: int):
+        """The five fields of an occurrence, from the spill file or memory."""
+        fields = self._FIELDS
+        if occurrence >= self._spilled:
+            start = (occurrence - self._spilled) * fields
+            return self._records[start : start + fields]
+        if self._spill_view is None:
+            mapped = mmap.mmap(self._spill_file.fileno(), 0, access=mmap.ACCESS_READ)
+            self._spill_view = (mapped, memoryview(mapped).cast("i"))
+        start = occurrence * fields
+        # A copy: a slice of the view would keep the mmap from closing
+        return self._spill_view[1][start : start + fields].tolist()
+
+    def _iter_link_ids(self) -> Iterator[int]:
+        """The link ID of every occurrence, in order."""
+        fields = self._FIELDS
+        if self._spilled:
+            self._record(0)  # Map the spill file
+            yield from self._spill_view[1][::fields]
+        yield from self._records[::fields]
+
+    def _occurrences_of(self, link_id: int) -> array:
+        if self._by_link is None:
+            # One pass over all occurrences; kept up to date from then on
+            by_link = [array("I") for _ in self._urls]
+            for occurrence, occurrence_link in enumerate(self._iter_link_ids()):
+                by_link[occurrence_link].append(occurrence)
+            self._by_link = by_link
+        return self._by_link[link_id]
+
+    def _source(self, occurrence: int) -> Dict[str, Any]:
+        link_id, page_id, text_id, attribute_id, raw_id = self._record(occurrence)
+        strings = self._strings.strings
+        return {
+            "page": strings[page_id],
+            "text": strings[text_id],
+            "attributes": self._attributes[attribute_id],
+            "raw_url": self._urls[link_id] if raw_id < 0 else strings[raw_id],
+        }
+
+    def get_stats(self) -> dict:
+        return {
+            "links": len(self._urls),
+            "occurrences": self._spilled + len(self._records) // self._FIELDS,
+            "spilled_occurrences": self._spilled,
+            "strings": len(self._strings.strings) - 1,
+            "attribute_sets": len(self._attributes),
+        }
+
+    def close(self):
+        """Delete the spill file."""
+        self._release_view()
+        if self._spill_file is not None:
+            self._spill_file.close()
+            self._spill_file = None
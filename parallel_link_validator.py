@@ -1,117 +1,612 @@
+import argparse
 import asyncio
 import aiohttp
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import queue
+import sys
+from collections import OrderedDict, deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 import requests
-from typing import List, Tuple
+from typing import (
+    AsyncIterator,
+    Callable,
+    Deque,
+    Dict,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+)
+from urllib.parse import urlparse
 import time
 
+from host_circuit_breaker import (
+    ALLOW,
+    HOST_UNREACHABLE_STATUS,
+    PROBE,
+    REJECT,
+    HostCircuitBreaker,
+    get_host_breaker,
+)
+from async_runtime import get_async_runtime
+from head_fallback import (
+    HEAD_FALLBACK_STATUSES,
+    RANGE_GET_HEADERS,
+    HeadSupport,
+    get_head_support,
+    range_get_status,
+)
+from host_concurrency import (
+    MAX_CONNECTIONS,
+    RETRY_STATUSES,
+    HostConcurrencyController,
+    get_host_controller,
+)
+from http_session_manager import (
+    UnsafeURLError,
+    create_safe_client_session,
+    create_safe_session,
+)
+from link_status_cache import LinkStatusCache, get_link_status_cache
+from url_canonicalizer import URLCanonicalizer, get_url_canonicalizer
+
+# Called with (link, status) as each check completes, e.g. to report progress.
+ResultCallback = Optional[Callable[[str, str], None]]
+
+# How often a run waiting only on other runs' requests re-checks for a slot.
+_POLL_INTERVAL = 0.05
+
+# How long iter_links waits for a result from the async runtime before
+# checking that the run and the runtime's loop thread are still alive.
+_RESULT_WAIT = 1.0
+
+# Shared by the threaded checks so connections are reused across runs;
+# it only connects to addresses that pass the SSRF check.
+_session = create_safe_session(pool_connections=100, pool_maxsize=MAX_CONNECTIONS)
+
+
+class _LinkCheck(NamedTuple):
+    """Outcome of one request for a link."""
+
+    status: str  # "OK" or "ERROR (...)"
+    status_code: Optional[int] = None
+    retry_after: Optional[str] = None
+    elapsed: float = 0.0
+    timed_out: bool = False
+    # The host could not be reached at all (connection error or timeout)
+    unreachable: bool = False
+
+
+class LinkProgress(NamedTuple):
+    """One finished link check, yielded by the iter_links_* methods."""
+
+    link: str
+    status: str  # "OK" or "ERROR (...)"
+    completed: int  # Links finished so far, this one included
+    total: int
+
+
+def status_for(status_code: int) -> str:
+    """
+    The link status of an HTTP status code: "OK" for 2xx and 3xx, else
+    "ERROR (<code>)". Every link check uses this rule, as they share the
+    link status cache.
+    """
+    return "OK" if 200 <= status_code < 400 else f"ERROR ({status_code})"
+
+
+class _ValidationRun:
+    """
+    Scheduling state of one validation call, shared by the threaded and
+    async validators. Links are queued per host and only started when the
+    host concurrency controller grants their host a slot; links answered
+    with 429/503 are re-queued (after the host's Retry-After pause) up to
+    max_retries times before they are reported as errors. Links to a host
+    whose circuit breaker is open are reported as unreachable unsent.
+    Finished links are collected until the validator takes them with
+    drain().
+    """
+
+    def __init__(
+        self,
+        links: List[str],
+        controller: HostConcurrencyController,
+        breaker: HostCircuitBreaker,
+        max_in_flight: int,
+        max_retries: int,
+    ):
+        self.controller = controller
+        self.breaker = breaker
+        self.max_in_flight = max_in_flight
+        self.max_retries = max_retries
+        self.total = len(links)
+        self.completed = 0
+        self.finished: Deque[LinkProgress] = deque()
+        self.in_flight = 0
+        # host -> queued (index, link, attempt)
+        self.queues: "OrderedDict[str, Deque[Tuple[int, str, int]]]" = OrderedDict()
+        for index, link in enumerate(links):
+            self._queue(index, link, 0)
+
+    def _queue(self, index: int, link: str, attempt: int, front: bool = False):
+        host = urlparse(link).netloc.lower()
+        queue = self.queues.setdefault(host, deque())
+        if front:
+            queue.appendleft((index, link, attempt))
+        else:
+            queue.append((index, link, attempt))
+
+    @property
+    def done(self) -> bool:
+        return not self.queues and not self.in_flight
+
+    def startable(self):
+        """
+        Yield (index, link, attempt, host, probe) for each link that may
+        start now; probe is whether it is its host's half-open probe.
+        """
+        for host in list(self.queues):
+            queue = self.queues[host]
+            while (
+                queue
+                and self.in_flight < self.max_in_flight
+                and self.controller.try_acquire(host)
+            ):
+                decision = self.breaker.before_request(host)
+                if decision not in (ALLOW, PROBE):
+                    self.controller.cancel(host)
+                    if decision == REJECT:
+                        while queue:
+                            index, link, _ = queue.popleft()
+                            self._record(index, link, HOST_UNREACHABLE_STATUS)
+                    break  # WAIT: a probe for this host is in flight
+                self.in_flight += 1
+                yield (*queue.popleft(), host, decision == PROBE)
+            if not queue:
+                del self.queues[host]
+
+    def wait_timeout(self) -> Optional[float]:
+        """How long to wait for running checks before trying to start more."""
+        if not self.queues:
+            return None  # Nothing left to start; wait for running checks
+        return max(_POLL_INTERVAL, self.controller.next_ready_in(self.queues))
+
+    def finish(self, job: Tuple[int, str, int, str, bool], check: _LinkCheck):
+        """Record a finished check, or queue the link again to retry it."""
+        index, link, attempt, host, probe = job
+        self.in_flight -= 1
+        self.controller.release(
+            host, check.elapsed, check.status_code, check.retry_after, check.timed_out
+        )
+        self.breaker.record_result(host, failed=check.unreachable, probe=probe)
+        if (
+            check.status_code in RETRY_STATUSES
+            and attempt < self.max_retries
+            and self.controller.ready_in(host) <= self.controller.max_backoff
+        ):
+            # The host asked us to slow down; that says nothing about the link.
+            self._queue(index, link, attempt + 1, front=True)
+            return
+        self._record(index, link, check.status)
+
+    def abandon(self, job: Tuple[int, str, int, str, bool]):
+        """Give back the slot of a check that was cancelled before it finished."""
+        host, probe = job[3], job[4]
+        self.in_flight -= 1
+        self.controller.cancel(host)
+        self.breaker.cancel(host, probe)
+
+    def _record(self, index: int, link: str, status: str):
+        self.completed += 1
+        self.finished.append(LinkProgress(link, status, self.completed, self.total))
+
+    def drain(self) -> Iterator[LinkProgress]:
+        """Yield and forget the links finished since the last drain()."""
+        while self.finished:
+            yield self.finished.popleft()
+
 
 class ParallelLinkValidator:
     """Efficient parallel link validation using both threading and async approaches"""
 
-    def __init__(self, max_workers: int = 20, timeout: int = 10):
+    def __init__(
+        self,
+        max_workers: int = 20,
+        timeout: int = 10,
+        cache: Optional[LinkStatusCache] = None,
+        controller: Optional[HostConcurrencyController] = None,
+        max_retries: int = 3,
+        breaker: Optional[HostCircuitBreaker] = None,
+        head_support: Optional[HeadSupport] = None,
+        canonicalizer: Optional[URLCanonicalizer] = None,
+    ):
         self.max_workers = max_workers
         self.timeout = timeout
+        # Optional link status cache consulted by validate_links_smart
+        self.cache = cache
+        # Per-host concurrency limits; max_workers caps this run as a whole.
+        self.controller = controller if controller is not None else get_host_controller()
+        self.max_retries = max_retries
+        # Per-host circuit breaker, so a dead host costs a few timeouts
+        # instead of one per link.
+        self.breaker = breaker if breaker is not None else get_host_breaker()
+        # Hosts known to reject HEAD are checked with a range GET instead.
+        self.head_support = (
+            head_support if head_support is not None else get_head_support()
+        )
+        # Maps spellings of one URL to the one that is checked and cached
+        self.canonicalizer = (
+            canonicalizer if canonicalizer is not None else get_url_canonicalizer()
+        )
 
-    def validate_links_threaded(self, links: List[str]) -> List[Tuple[str, str]]:
-        """
-        Validate links using ThreadPoolExecutor for parallel HTTP requests.
-        Best for moderate number of links (10-100).
-        """
-
-        def validate_single_link(link: str) -> Tuple[str, str]:
-            try:
-                response = requests.head(
+    def _check_link(self, link: str) -> _LinkCheck:
+        start = time.monotonic()
+        host = urlparse(link).netloc.lower()
+        try:
+            response = None
+            if self.head_support.supports_head(host):
+                response = _session.head(
                     link, allow_redirects=True, timeout=self.timeout
                 )
-                if 200 <= response.status_code < 400:
-                    return (link, "OK")
-                else:
-                    return (link, f"ERROR ({response.status_code})")
-            except requests.RequestException as e:
-                return (link, f"ERROR ({str(e)})")
-
-        validated_links = []
+            if response is None or response.status_code in HEAD_FALLBACK_STATUSES:
+                head_status = response.status_code if response is not None else None
+                # Range GET; closing without touching .content reads no body
+                with _session.get(
+                    link,
+                    headers=RANGE_GET_HEADERS,
+                    allow_redirects=True,
+                    timeout=self.timeout,
+                    stream=True,
+                ) as response:
+                    status_code = range_get_status(response.status_code)
+                if head_status is not None and status_code != head_status:
+                    self.head_support.mark_unsupported(host)
+            else:
+                status_code = response.status_code
+        except requests.Timeout as e:
+            return _LinkCheck(
+                f"ERROR ({str(e)})",
+                elapsed=time.monotonic() - start,
+                timed_out=True,
+                unreachable=True,
+            )
+        except requests.ConnectionError as e:
+            return _LinkCheck(
+                f"ERROR ({str(e)})", elapsed=time.monotonic() - start, unreachable=True
+            )
+        except (requests.RequestException, UnsafeURLError) as e:
+            return _LinkCheck(f"ERROR ({str(e)})", elapsed=time.monotonic() - start)
+        return _LinkCheck(
+            status_for(status_code),
+            status_code,
+            response.headers.get("Retry-After"),
+            time.monotonic() - start,
+        )
+
+    async def _check_link_async(
+        self, session: aiohttp.ClientSession, link: str
+    ) -> _LinkCheck:
+        start = time.monotonic()
+        host = urlparse(link).netloc.lower()
+        timeout = aiohttp.ClientTimeout(total=self.timeout)
+        try:
+            head_status = None
+            if self.head_support.supports_head(host):
+                async with session.head(
+                    link, allow_redirects=True, timeout=timeout
+                ) as response:
+                    if response.status not in HEAD_FALLBACK_STATUSES:
+                        return _LinkCheck(
+                            status_for(response.status),
+                            response.status,
+                            response.headers.get("Retry-After"),
+                            time.monotonic() - start,
+                        )
+                    head_status = response.status
+            # Range GET; leaving the context without reading reads no body
+            async with session.get(
+                link, headers=RANGE_GET_HEADERS, allow_redirects=True, timeout=timeout
+            ) as response:
+                status_code = range_get_status(response.status)
+                if head_status is not None and status_code != head_status:
+                    self.head_support.mark_unsupported(host)
+                return _LinkCheck(
+                    status_for(status_code),
+                    status_code,
+                    response.headers.get("Retry-After"),
+                    time.monotonic() - start,
+                )
+        except asyncio.TimeoutError:
+            return _LinkCheck(
+                "ERROR (Timeout)",
+                elapsed=time.monotonic() - start,
+                timed_out=True,
+                unreachable=True,
+            )
+        except aiohttp.ClientConnectionError as e:
+            return _LinkCheck(
+                f"ERROR ({str(e)})", elapsed=time.monotonic() - start, unreachable=True
+            )
+        except Exception as e:
+            return _LinkCheck(f"ERROR ({str(e)})", elapsed=time.monotonic() - start)
+
+    def iter_links_threaded(self, links: List[str]) -> Iterator[LinkProgress]:
+        """
+        Check links on a thread pool, yielding a LinkProgress as each one
+        finishes. Closing the generator early cancels the checks that have
+        not started and waits for the running ones.
+        """
+        run = _ValidationRun(
+            links, self.controller, self.breaker, self.max_workers, self.max_retries
+        )
+        running: Dict = {}
         with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-            # Submit all tasks
-            future_to_link = {
-                executor.submit(validate_single_link, link): link for link in links
-            }
+            try:
+                while not run.done:
+                    for job in run.startable():
+                        running[executor.submit(self._check_link, job[1])] = job
+                    yield from run.drain()
+                    if not running:
+                        if not run.done:
+                            # Every queued host is paused or busy with other runs
+                            time.sleep(run.wait_timeout())
+                        continue
+
+                    finished, _ = wait(
+                        running, timeout=run.wait_timeout(), return_when=FIRST_COMPLETED
+                    )
+                    for future in finished:
+                        job = running.pop(future)
+                        try:
+                            check = future.result()
+                        except Exception as e:
+                            check = _LinkCheck(f"ERROR (Exception: {str(e)})")
+                        run.finish(job, check)
+                    yield from run.drain()
+            finally:
+                # Only reached with checks running if the caller stopped early
+                for future, job in running.items():
+                    if future.cancel():
+                        run.abandon(job)
+                        continue
+                    try:
+                        check = future.result()
+                    except Exception as e:
+                        check = _LinkCheck(f"ERROR (Exception: {str(e)})")
+                    run.finish(job, check)
+
+    async def iter_links_async(
+        self, links: List[str], session: Optional[aiohttp.ClientSession] = None
+    ) -> AsyncIterator[LinkProgress]:
+        """
+        Check links with aiohttp, yielding a LinkProgress as each one
+        finishes. Uses session if given (e.g. the async runtime's shared
+        session), otherwise a session of its own for this call.
+        """
+        if session is None:
+            async with create_safe_client_session(self.max_workers) as session:
+                async for progress in self.iter_links_async(links, session):
+                    yield progress
+            return
+
+        run = _ValidationRun(
+            links, self.controller, self.breaker, self.max_workers, self.max_retries
+        )
+        running: Dict = {}
+        try:
+            while not run.done:
+                for job in run.startable():
+                    task = asyncio.ensure_future(self._check_link_async(session, job[1]))
+                    running[task] = job
+                for progress in run.drain():
+                    yield progress
+                if not running:
+                    if not run.done:
+                        await asyncio.sleep(run.wait_timeout())
+                    continue
 
-            # Collect results as they complete
-            for future in as_completed(future_to_link):
+                finished, _ = await asyncio.wait(
+                    running, timeout=run.wait_timeout(), return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in finished:
+                    job = running.pop(task)
+                    try:
+                        check = task.result()
+                    except Exception as e:
+                        check = _LinkCheck(f"ERROR (Exception: {str(e)})")
+                    run.finish(job, check)
+                for progress in run.drain():
+                    yield progress
+        finally:
+            # Only reached with checks running if the caller stopped early
+            for task in running:
+                task.cancel()
+            await asyncio.gather(*running, return_exceptions=True)
+            for task, job in running.items():
+                if task.cancelled():
+                    run.abandon(job)
+                    continue
                 try:
-                    result = future.result()
-                    validated_links.append(result)
+                    check = task.result()
                 except Exception as e:
-                    link = future_to_link[future]
-                    validated_links.append((link, f"ERROR (Exception: {str(e)})"))
+                    check = _LinkCheck(f"ERROR (Exception: {str(e)})")
+                run.finish(job, check)
 
-        return validated_links
+    def validate_links_threaded(
+        self, links: List[str], on_result: ResultCallback = None
+    ) -> List[Tuple[str, str]]:
+        """
+        Validate links using ThreadPoolExecutor for parallel HTTP requests.
+        Best for moderate number of links (10-100). Results are returned in
+        the order of links; on_result is called in completion order.
+        """
+        return _in_order(links, self.iter_links_threaded(links), on_result)
 
-    async def validate_links_async(self, links: List[str]) -> List[Tuple[str, str]]:
+    async def validate_links_async(
+        self,
+        links: List[str],
+        on_result: ResultCallback = None,
+        session: Optional[aiohttp.ClientSession] = None,
+    ) -> List[Tuple[str, str]]:
         """
         Validate links using aiohttp for async HTTP requests.
-        Best for large number of links (100+).
+        Best for large number of links (100+). Results are returned in the
+        order of links; on_result is called in completion order.
         """
+        statuses = {}
+        async for progress in self.iter_links_async(links, session):
+            statuses[progress.link] = progress.status
+            if on_result is not None:
+                on_result(progress.link, progress.status)
+        return [(link, statuses[link]) for link in links]
 
-        async def validate_single_link_async(
-            session: aiohttp.ClientSession, link: str
-        ) -> Tuple[str, str]:
-            try:
-                async with session.head(
-                    link,
-                    allow_redirects=True,
-                    timeout=aiohttp.ClientTimeout(total=self.timeout),
-                ) as response:
-                    if 200 <= response.status < 400:
-                        return (link, "OK")
-                    else:
-                        return (link, f"ERROR ({response.status})")
-            except asyncio.TimeoutError:
-                return (link, "ERROR (Timeout)")
-            except Exception as e:
-                return (link, f"ERROR ({str(e)})")
-
-        connector = aiohttp.TCPConnector(limit=self.max_workers, limit_per_host=10)
-        async with aiohttp.ClientSession(connector=connector) as session:
-            tasks = [validate_single_link_async(session, link) for link in links]
-            results = await asyncio.gather(*tasks, return_exceptions=True)
-
-            # Handle any exceptions that occurred
-            validated_links = []
-            for i, result in enumerate(results):
-                if isinstance(result, Exception):
-                    validated_links.append(
-                        (links[i], f"ERROR (Exception: {str(result)})")
-                    )
-                else:
-                    validated_links.append(result)
+    def iter_links_smart(
+        self, links: List[str], force_refresh: bool = False
+    ) -> Iterator[LinkProgress]:
+        """
+        Yield a LinkProgress per link as soon as its status is known: links
+        with a fresh result in self.cache first (unless force_refresh is
+        set), then the others as their checks finish. Links with the same
+        canonical URL (see url_canonicalizer) are checked and cached once,
+        under that URL, and each of them is reported. The check requests
+        the first spelling seen, as the canonical form may not be served
+        (e.g. without the trailing slash of "/docs/"). New results are added
+        to the cache, including those finished before the caller stopped.
+        """
+        # canonical URL -> the links spelling it
+        spellings: Dict[str, List[str]] = {}
+        for link in links:
+            spellings.setdefault(self.canonicalizer.canonicalize(link), []).append(link)
+
+        cached = {}
+        if self.cache is not None and not force_refresh:
+            cached = self.cache.get_many(spellings)
+        total = len(links)
+        completed = 0
+        for url, status in cached.items():
+            for link in spellings[url]:
+                completed += 1
+                yield LinkProgress(link, status, completed, total)
 
-            return validated_links
+        # First spelling -> canonical URL, for the links to check
+        to_check = {
+            spellings[url][0]: url for url in spellings if url not in cached
+        }
+        if not to_check:
+            return
+        checked = []
+        try:
+            for progress in self.iter_links(list(to_check)):
+                url = to_check[progress.link]
+                checked.append((url, progress.status))
+                for link in spellings[url]:
+                    completed += 1
+                    yield LinkProgress(link, progress.status, completed, total)
+        finally:
+            if self.cache is not None and checked:
+                # Short-circuited links were never checked; don't cache them.
+                self.cache.put_many(
+                    result for result in checked if result[1] != HOST_UNREACHABLE_STATUS
+                )
 
-    def validate_links_smart(self, links: List[str]) -> List[Tuple[str, str]]:
+    def validate_links_smart(
+        self,
+        links: List[str],
+        on_result: ResultCallback = None,
+        force_refresh: bool = False,
+    ) -> List[Tuple[str, str]]:
         """
         Smart validation that chooses the best method based on number of links.
+        Links with a fresh result in self.cache are not checked again unless
+        force_refresh is set; new results are added to the cache. Results
+        are returned in the order of links.
+        """
+        return _in_order(links, self.iter_links_smart(links, force_refresh), on_result)
+
+    def iter_links(self, links: List[str]) -> Iterator[LinkProgress]:
+        """
+        Check every link, bypassing the cache, yielding a LinkProgress as
+        each one finishes: on a thread pool for up to 50 links, otherwise
+        on the shared async runtime.
         """
         if len(links) <= 50:
             # Use threading for smaller sets
-            return self.validate_links_threaded(links)
-        else:
-            # Use async for larger sets
-            return asyncio.run(self.validate_links_async(links))
+            yield from self.iter_links_threaded(links)
+            return
+
+        # Use async for larger sets, on the shared runtime so connections
+        # are reused across validations. Results are handed over through a
+        # queue so the caller sees each one as it finishes.
+        results: "queue.Queue[Optional[LinkProgress]]" = queue.Queue()
+        runtime = get_async_runtime()
+        future = runtime.submit(self._pump_async, links, results)
+        try:
+            while True:
+                try:
+                    progress = results.get(timeout=_RESULT_WAIT)
+                except queue.Empty:
+                    if future.done():
+                        # Raises the run's exception; a run that returned
+                        # has queued its None, read on the next pass.
+                        future.result()
+                    elif not runtime.running:
+                        raise RuntimeError(
+                            "The async runtime stopped before the link check finished"
+                        )
+                    continue
+                if progress is None:
+                    break
+                yield progress
+            future.result()  # Raises if the run failed
+        finally:
+            future.cancel()
+
+    async def _pump_async(
+        self,
+        links: List[str],
+        results: "queue.Queue[Optional[LinkProgress]]",
+        session: Optional[aiohttp.ClientSession] = None,
+    ):
+        """Put each LinkProgress of iter_links_async() on results, then None."""
+        try:
+            async for progress in self.iter_links_async(links, session):
+                results.put(progress)
+        finally:
+            results.put(None)
+
+
+def _in_order(
+    links: List[str], progress: Iterator[LinkProgress], on_result: ResultCallback
+) -> List[Tuple[str, str]]:
+    """Collect progress into (link, status) pairs in the order of links."""
+    statuses = {}
+    for item in progress:
+        statuses[item.link] = item.status
+        if on_result is not None:
+            on_result(item.link, item.status)
+    return [(link, statuses[link]) for link in links]
 
 
 # Updated function for app.py integration
 def validate_links_parallel(
-    links: List[str], max_workers: int = 20
+    links: List[str],
+    max_workers: int = 20,
+    on_result: ResultCallback = None,
+    force_refresh: bool = False,
+    cache: Optional[LinkStatusCache] = None,
 ) -> List[Tuple[str, str]]:
     """
     Drop-in replacement for the original validate_links function.
     Automatically chooses optimal parallel validation method.
+    on_result, if given, is called with (link, status) as each check completes.
+    Results are cached in the shared link status cache (or cache); set
+    force_refresh to re-check every link anyway.
     """
-    validator = ParallelLinkValidator(max_workers=max_workers)
-    return validator.validate_links_smart(links)
+    validator = ParallelLinkValidator(
+        max_workers=max_workers,
+        cache=cache if cache is not None else get_link_status_cache(),
+    )
+    return validator.validate_links_smart(links, on_result, force_refresh)
 
 
 # Performance comparison function
@@ -153,5 +648,44 @@ def compare_validation_performance():
     return sequential_results, parallel_results
 
 
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Check the links given as arguments (or in a file) and print each status
+    as soon as it is known. Without links, run compare_validation_performance().
+    """
+    parser = argparse.ArgumentParser(
+        description="Check links, printing each status as soon as it is known."
+    )
+    parser.add_argument("links", nargs="*", help="URLs to check")
+    parser.add_argument(
+        "-f", "--file", help="read URLs from this file, one per line ('-' for stdin)"
+    )
+    parser.add_argument(
+        "--force-refresh", action="store_true", help="re-check links with a cached status"
+    )
+    args = parser.parse_args(argv)
+
+    links = list(args.links)
+    if args.file:
+        with open(args.file) if args.file != "-" else sys.stdin as f:
+            links.extend(line.strip() for line in f if line.strip())
+    if not links:
+        compare_validation_performance()
+        return 0
+
+    links = list(dict.fromkeys(links))
+    validator = ParallelLinkValidator(cache=get_link_status_cache())
+    broken = 0
+    for progress in validator.iter_links_smart(links, args.force_refresh):
+        if progress.status != "OK":
+            broken += 1
+        print(
+            f"[{progress.completed}/{progress.total}] {progress.status} {progress.link}",
+            flush=True,
+        )
+    print(f"{len(links) - broken} OK, {broken} broken")
+    return 1 if broken else 0
+
+
 if __name__ == "__main__":
-    compare_validation_performance()
+    sys.exit(main())
@@ -4,6 +4,7 @@ Performance testing script for Compare Web optimizations.
 Run this to measure the performance improvements.
 """
 
+import contextlib
 import time
 import requests
 import sys
@@ -214,6 +215,515 @@ def test_database_performance():
         print(f"Database test failed: {e}")
 
 
+def _synthetic_page(sections=2000):
+    """Build a large, link- and header-heavy HTML page for offline benchmarks."""
+    parts = [
+        "<!DOCTYPE html><html><head><title>Benchmark page</title>",
+        '<link rel="stylesheet" href="/static/site.css">',
+        "<style>body { color: #333; }</style>",
+        "<script>var config = {'debug': false};</script></head><body>",
+    ]
+    for i in range(sections):
+        parts.append(
+            f'<div class="section" id="s{i}">'
+            f"<h{i % 4 + 1}>Section <em>{i}</em></h{i % 4 + 1}>"
+            f"<p>Paragraph {i} with <a href=\"/page/{i}\" class=\"nav item\">link {i}</a>"
+            f" and <a href=\"https://example.com/ext/{i}\">external</a>.<!-- note {i} --></p>"
+            f'<img src="/img/{i}.png" alt="image {i}">'
+            f"<ul><li>Item one &amp; more</li><li>Item two</li></ul></div>\n"
+        )
+    parts.append("</body></html>")
+    return "".join(parts)
+
+
+def test_parser_backend_performance(repeats=3):
+    """Check parser backends extract the same data and compare their throughput."""
+    print("\n=== Parser Backend Performance Test ===")
+
+    try:
+        from dom_extractor import PARSER_BACKENDS, extract_page, iter_anchors
+    except ImportError:
+        print("DOM extractor not available")
+        return
+
+    html = _synthetic_page()
+    size_mb = len(html.encode("utf-8")) / (1024 * 1024)
+    base_url = "https://example.com/"
+    print(f"Parsing a {size_mb:.2f} MB page, best of {repeats} runs...")
+
+    baseline = None
+    baseline_anchors = None
+    for backend in PARSER_BACKENDS:
+        best = None
+        for _ in range(repeats):
+            start_time = time.perf_counter()
+            page = extract_page(html, base_url, backend)
+            elapsed = time.perf_counter() - start_time
+            best = elapsed if best is None else min(best, elapsed)
+        anchors = list(iter_anchors(html, backend))
+
+        if baseline is None:
+            baseline, baseline_anchors = page, anchors
+            match = "baseline"
+        else:
+            mismatched = [
+                field
+                for field in ("headers", "links", "text")
+                if getattr(page, field) != getattr(baseline, field)
+            ]
+            if anchors != baseline_anchors:
+                mismatched.append("anchors")
+            match = "match" if not mismatched else f"MISMATCH in {', '.join(mismatched)}"
+
+        print(
+            f"  {backend:<12} {best:.3f}s  {size_mb / best:6.2f} MB/s  "
+            f"({len(page.links)} links, {len(page.text)} text lines) - {match}"
+        )
+
+
+def test_header_comparison_performance(headers=5000):
+    """Time the header summary and occurrence diff on generated API-style headers."""
+    print("\n=== Header Comparison Performance Test ===")
+
+    try:
+        from header_diff import diff_headers, summarize_headers
+    except ImportError:
+        print("Header diff not available")
+        return
+
+    # Many repeated names, with the second page reordered and trimmed
+    headers1 = {"h2": [f"method{i % (headers // 2)}()" for i in range(headers)]}
+    headers2 = {"h2": headers1["h2"][::-1][: headers - headers // 10] + ["added()"]}
+
+    start_time = time.perf_counter()
+    summarize_headers(headers1, headers2)
+    summary_time = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    diff = diff_headers(headers1, headers2)["h2"]
+    diff_time = time.perf_counter() - start_time
+
+    counts = {status: diff["side1"].count(status) for status in ("same", "moved", "removed")}
+    print(f"{headers} headers per page: summary {summary_time:.3f}s, diff {diff_time:.3f}s")
+    print(f"  {counts['same']} same, {counts['moved']} moved, {counts['removed']} removed, "
+          f"{diff['side2'].count('added')} added")
+
+
+def _lcs_length(a, b):
+    """Longest common subsequence length by dynamic programming, as a reference."""
+    previous = [0] * (len(b) + 1)
+    for x in a:
+        current = [0]
+        for j, y in enumerate(b):
+            current.append(previous[j] + 1 if x == y else max(previous[j + 1], current[j]))
+        previous = current
+    return previous[-1]
+
+
+def test_text_diff_performance(cases=3000, lines=20000):
+    """Check the Myers line diff against an LCS reference and time it on large pages."""
+    print("\n=== Text Diff Performance Test ===")
+
+    try:
+        from text_diff import diff_lines
+    except ImportError:
+        print("Text diff not available")
+        return
+
+    import random
+
+    rng = random.Random(42)
+    mismatches = 0
+    for _ in range(cases):
+        alphabet = [f"line {i}" for i in range(rng.randint(1, 6))]
+        text1 = [rng.choice(alphabet) for _ in range(rng.randint(0, 40))]
+        text2 = [rng.choice(alphabet) for _ in range(rng.randint(0, 40))]
+        ops = diff_lines(text1, text2, timeout=10)
+        # The opcodes must tile both texts, and their equal runs must be a
+        # longest common subsequence.
+        i = j = equal = 0
+        valid = True
+        for tag, i1, i2, j1, j2 in ops:
+            valid = valid and (i1, j1) == (i, j)
+            if tag == "equal":
+                valid = valid and text1[i1:i2] == text2[j1:j2]
+                equal += i2 - i1
+            i, j = i2, j2
+        valid = valid and (i, j) == (len(text1), len(text2))
+        if not valid or equal != _lcs_length(text1, text2):
+            mismatches += 1
+    print(f"{cases} random inputs against an LCS reference: "
+          f"{'match' if not mismatches else f'{mismatches} MISMATCHES'}")
+
+    page = [f"Paragraph {i} of the page" for i in range(lines)]
+    edited = list(page)
+    for i in range(0, lines, 97):
+        edited[i] = f"Edited paragraph {i}"
+    for label, other in (
+        ("scattered edits", edited),
+        ("nothing in common", [f"Other paragraph {i}" for i in range(lines)]),
+    ):
+        start_time = time.perf_counter()
+        ops = diff_lines(page, other)
+        elapsed = time.perf_counter() - start_time
+        changed = sum(1 for op in ops if op[0] != "equal")
+        print(f"  {lines} lines, {label:<17}: {elapsed:.3f}s ({changed} changed blocks)")
+
+
+@contextlib.contextmanager
+def _allow_loopback():
+    """
+    Let the SSRF check through to 127.0.0.1 while the local test sites are
+    crawled. Benchmark only: production code never allows loopback.
+    """
+    import http_session_manager
+
+    is_disallowed_ip = http_session_manager._is_disallowed_ip
+    http_session_manager._is_disallowed_ip = (
+        lambda ip: not ip.is_loopback and is_disallowed_ip(ip)
+    )
+    http_session_manager.get_dns_cache().clear()
+    try:
+        yield
+    finally:
+        http_session_manager._is_disallowed_ip = is_disallowed_ip
+        http_session_manager.get_dns_cache().clear()
+
+
+def _serve_test_site(pages, latency, fanout=5, nav_links=0):
+    """
+    Serve a generated site on 127.0.0.1 where every page links to fanout
+    child pages and back home, plus nav_links links to the first pages,
+    answering each request after latency seconds. Pages carry an ETag and
+    answer If-None-Match with 304. /sitemap.xml lists every page.
+    Returns (server, home URL).
+    """
+    import threading
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            time.sleep(latency)
+            if self.path == "/sitemap.xml":
+                base = f"http://127.0.0.1:{self.server.server_address[1]}"
+                body = (
+                    '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+                    + "".join(f"<url><loc>{base}/page/{m}</loc></url>" for m in range(pages))
+                    + "</urlset>"
+                ).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/xml")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+                return
+            try:
+                n = int(self.path.rsplit("/", 1)[-1] or 0)
+            except ValueError:
+                n = pages
+            if n >= pages:
+                self.send_error(404)
+                return
+            etag = f'"page-{n}"'
+            if self.headers.get("If-None-Match") == etag:
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.end_headers()
+                return
+            nav = "".join(
+                f'<li><a class="nav" href="/page/{m % pages}">Section {m}</a></li>'
+                for m in range(nav_links)
+            )
+            links = '<a href="/page/0">Home</a>' + "".join(
+                f'<a href="/page/{m}">Page {m}</a>'
+                for m in range(n * fanout + 1, min(pages, n * fanout + fanout + 1))
+            )
+            body = (
+                f"<html><body><ul>{nav}</ul><h1>Page {n}</h1>{links}</body></html>"
+            ).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html")
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    class Server(ThreadingHTTPServer):
+        daemon_threads = True
+        request_queue_size = 128  # The default backlog of 5 drops connections
+
+    server = Server(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/page/0"
+
+
+def test_crawl_performance(pages=200, latency=0.02):
+    """Compare sequential and concurrent crawling of a local test site in pages/sec."""
+    print("\n=== Crawl Performance Test ===")
+
+    try:
+        import contextlib
+        import io
+        from crawler import WebCrawler
+    except ImportError:
+        print("Crawler not available")
+        return
+
+    class BenchmarkCrawler(WebCrawler):
+        # Time fetching and parsing only: no link checks, no result files
+        def __init__(self, home_url, **kwargs):
+            super().__init__(home_url, output=(), **kwargs)
+
+        def _check_all_accessibility(self, max_workers=20):
+            pass
+
+    with _allow_loopback():
+        server, home_url = _serve_test_site(pages, latency)
+        print(f"Crawling a {pages}-page local site answering in {latency * 1000:.0f} ms...")
+        try:
+            baseline = None
+            for workers in (1, 4, 8, 16):
+                crawler = BenchmarkCrawler(
+                    home_url, max_per_host=workers, use_sitemaps=False, incremental=False
+                )
+                start_time = time.perf_counter()
+                with contextlib.redirect_stdout(io.StringIO()):
+                    results = crawler.crawl(max_pages=pages, max_workers=workers)
+                    elapsed = time.perf_counter() - start_time
+                    crawler.close_session()
+                found = len(results["internal"])
+                baseline = baseline or elapsed
+                print(
+                    f"  {workers:>2} workers: {pages / elapsed:7.1f} pages/sec "
+                    f"({elapsed:.2f}s, {found} internal links, {baseline / elapsed:.1f}x)"
+                )
+        finally:
+            server.shutdown()
+
+        # A site whose pages form one long chain: following links finds one
+        # page at a time, seeding the queue from /sitemap.xml finds them all.
+        server, home_url = _serve_test_site(pages, latency, fanout=1)
+        print("Crawling the same site as a chain of pages with 8 workers...")
+        try:
+            for use_sitemaps in (False, True):
+                crawler = BenchmarkCrawler(
+                    home_url, max_per_host=8, use_sitemaps=use_sitemaps, incremental=False
+                )
+                start_time = time.perf_counter()
+                with contextlib.redirect_stdout(io.StringIO()):
+                    crawler.crawl(max_pages=pages, max_workers=8)
+                    elapsed = time.perf_counter() - start_time
+                    crawler.close_session()
+                label = "with sitemap" if use_sitemaps else "links only"
+                print(f"  {label:<12}: {crawler.pages_crawled / elapsed:7.1f} pages/sec ({elapsed:.2f}s)")
+        finally:
+            server.shutdown()
+
+        # Re-crawling an unchanged site: the incremental crawl answers every
+        # page with a conditional request and reuses the stored links.
+        import os
+        import tempfile
+        from crawl_state import CrawlStateStore
+        from database_optimized import DatabaseConnectionPool
+
+        server, home_url = _serve_test_site(pages, latency, nav_links=300)
+        db_path = os.path.join(tempfile.mkdtemp(), "crawl_state.db")
+        page_store = CrawlStateStore(DatabaseConnectionPool(db_path))
+        print("Re-crawling an unchanged site with 300 navigation links per page, 8 workers...")
+        try:
+            for label in ("first crawl", "re-crawl"):
+                crawler = BenchmarkCrawler(
+                    home_url,
+                    max_per_host=8,
+                    use_sitemaps=False,
+                    incremental=True,
+                    page_store=page_store,
+                )
+                start_time = time.perf_counter()
+                with contextlib.redirect_stdout(io.StringIO()):
+                    crawler.crawl(max_pages=pages, max_workers=8)
+                    elapsed = time.perf_counter() - start_time
+                    crawler.close_session()
+                print(
+                    f"  {label:<12}: {crawler.pages_crawled / elapsed:7.1f} pages/sec "
+                    f"({elapsed:.2f}s, {crawler.pages_unchanged} pages unchanged)"
+                )
+        finally:
+            server.shutdown()
+
+
+def test_crawl_resume(pages=250, interrupt_after=110, latency=0.002):
+    """
+    Interrupt a checkpointed crawl of a local test site, resume it, and
+    check the result matches an uninterrupted crawl.
+    """
+    print("\n=== Crawl Resume Test ===")
+
+    try:
+        import contextlib
+        import io
+        import tempfile
+        from crawl_state import CrawlStateStore
+        from crawler import WebCrawler
+        from database_optimized import DatabaseConnectionPool
+    except ImportError:
+        print("Crawler not available")
+        return
+
+    class Interrupted(Exception):
+        pass
+
+    class ResumeCrawler(WebCrawler):
+        # Counts fetches, and fails once fail_after pages have been fetched
+        def __init__(self, home_url, fail_after=None, **kwargs):
+            super().__init__(
+                home_url, output=(), use_sitemaps=False, incremental=False, **kwargs
+            )
+            self.fail_after = fail_after
+            self.fetches = 0
+
+        def _fetch_page(self, url, snapshot=None):
+            self.fetches += 1
+            if self.fail_after is not None and self.fetches > self.fail_after:
+                raise Interrupted()
+            return super()._fetch_page(url, snapshot)
+
+        def _check_all_accessibility(self, max_workers=20):
+            pass
+
+    with _allow_loopback():
+        server, home_url = _serve_test_site(pages, latency)
+        print(f"Interrupting a {pages}-page crawl after {interrupt_after} fetches, then resuming...")
+        try:
+            for workers in (1, 8):
+                with contextlib.redirect_stdout(io.StringIO()):
+                    reference = ResumeCrawler(home_url, max_per_host=workers)
+                    reference.crawl(max_pages=pages, max_workers=workers)
+                    reference.close_session()
+
+                    db_path = os.path.join(tempfile.mkdtemp(), "crawl_state.db")
+                    store = CrawlStateStore(DatabaseConnectionPool(db_path))
+                    interrupted = ResumeCrawler(
+                        home_url,
+                        fail_after=interrupt_after,
+                        max_per_host=workers,
+                        state_store=store,
+                        checkpoint_every=25,
+                    )
+                    try:
+                        interrupted.crawl(max_pages=pages, max_workers=workers)
+                    except Interrupted:
+                        pass
+                    interrupted.close_session()
+
+                    resumed = ResumeCrawler(
+                        home_url, max_per_host=workers, state_store=store, checkpoint_every=25
+                    )
+                    resumed.resume()
+                    resumed.crawl(max_pages=pages, max_workers=workers)
+                    resumed.close_session()
+
+                identical = (
+                    resumed.pages_crawled == reference.pages_crawled
+                    and list(resumed.link_details.items()) == list(reference.link_details.items())
+                )
+                print(
+                    f"  {workers} workers: resumed crawl fetched {resumed.fetches} of "
+                    f"{reference.fetches} pages - "
+                    f"{'identical to an uninterrupted crawl' if identical else 'MISMATCH'}"
+                )
+
+            # "Start over" with another spelling of the home URL must discard
+            # the unfinished run, which is saved under the canonical URL
+            restart_url = home_url.replace("http://", "HTTP://") + "#top"
+            with contextlib.redirect_stdout(io.StringIO()):
+                interrupted = ResumeCrawler(
+                    home_url, fail_after=interrupt_after, state_store=store
+                )
+                try:
+                    interrupted.crawl(max_pages=pages, max_workers=1)
+                except Interrupted:
+                    pass
+                interrupted.close_session()
+
+                restarted = ResumeCrawler(restart_url, state_store=store)
+                discarded = restarted.discard_unfinished()
+                restarted.crawl(max_pages=pages, max_workers=1)
+                restarted.close_session()
+            fresh = discarded and restarted.fetches == reference.fetches
+            print(
+                f"  starting over from {restart_url}: "
+                f"{'fresh crawl' if fresh else 'RESUMED'} "
+                f"({restarted.fetches} pages fetched)"
+            )
+        finally:
+            server.shutdown()
+
+
+def test_link_store_memory(pages=5000, nav_links=60, unique_links=5):
+    """Peak memory (tracemalloc) of the crawler's link details, plain vs compact layout."""
+    print("\n=== Link Store Memory Test ===")
+
+    try:
+        import tracemalloc
+        from link_store import CompactLinkStore, LinkStore
+    except ImportError:
+        print("Link store not available")
+        return
+
+    def fill(store):
+        # Like a crawl: every page repeats the same navigation, and the
+        # parser hands over new string and attribute objects each time
+        for n in range(pages):
+            page = f"https://example.com/page/{n}"
+            links = [
+                (
+                    f"https://example.com/section/{m}",
+                    f"Section {m}",
+                    {"class": "nav-link", "href": f"/section/{m}"},
+                )
+                for m in range(nav_links)
+            ] + [
+                (f"https://example.com/page/{n}/{m}", f"Read more {m}", {"href": f"/page/{n}/{m}"})
+                for m in range(unique_links)
+            ]
+            for url, text, attributes in links:
+                if url not in store:
+                    store.add_link(url, True)
+                store.add_occurrence(url, page, text, attributes, url)
+
+    occurrences = pages * (nav_links + unique_links)
+    print(f"{pages} pages, {occurrences} link occurrences")
+    layouts = (
+        ("plain", LinkStore),
+        ("compact", CompactLinkStore),
+        ("compact, spilled", lambda: CompactLinkStore(spill_bytes=1024 * 1024)),
+    )
+    baseline = None
+    for label, factory in layouts:
+        tracemalloc.start()
+        store = factory()
+        fill(store)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        # Reading every occurrence back, as the CSV export does
+        start_time = time.perf_counter()
+        read = sum(len(list(store[url]["sources"])) for url in store)
+        read_time = time.perf_counter() - start_time
+        assert read == occurrences
+        store.close()
+        del store
+        baseline = baseline or peak
+        saving = f", {baseline / peak:.1f}x less" if peak != baseline else ""
+        print(
+            f"  {label:<17}: peak {peak / 1024 / 1024:7.1f} MB{saving} "
+            f"(reading all occurrences back: {read_time:.2f}s)"
+        )
+
+
 def main():
     """Run all performance tests."""
     print("Compare Web Performance Test Suite")
@@ -222,6 +732,12 @@ def main():
     test_link_validation_performance()
     test_session_reuse_performance()
     test_database_performance()
+    test_parser_backend_performance()
+    test_header_comparison_performance()
+    test_text_diff_performance()
+    test_crawl_performance()
+    test_crawl_resume()
+    test_link_store_memory()
 
     print("\n" + "=" * 50)
     print("Performance testing complete!")
@@ -0,0 +1,188 @@
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Optional
+from urllib.parse import urlsplit
+from urllib.robotparser import RobotFileParser
+
+import requests
+import urllib3
+
+from http_session_manager import UnsafeURLError, assert_safe_url
+
+logger = logging.getLogger(__name__)
+
+# Seconds a fetched robots.txt is reused before it is fetched again.
+ROBOTS_CACHE_TTL = int(os.environ.get("COMPARE_WEB_ROBOTS_TTL", "3600"))
+
+# A robots.txt that could not be fetched because of a server or network
+# error is retried after this many seconds instead of ROBOTS_CACHE_TTL.
+ROBOTS_ERROR_TTL = 300
+
+# Crawl-delay values above this are capped, so one odd robots.txt cannot
+# stall a crawl for minutes per page.
+MAX_CRAWL_DELAY = 30.0
+
+# robots.txt files are small; anything past this is ignored (RFC 9309 asks
+# crawlers to parse at least 500 KiB).
+MAX_ROBOTS_BYTES = 512 * 1024
+
+
+class RobotsPolicy:
+    """
+    The robots.txt rules of one site (scheme and host), following RFC 9309:
+    a missing robots.txt (any 4xx) allows everything, and one that could
+    not be fetched (5xx or a network error) disallows everything until it
+    is fetched again.
+    """
+
+    def __init__(
+        self,
+        parser: Optional[RobotFileParser],
+        allow_all: bool = False,
+        error: Optional[str] = None,
+    ):
+        self._parser = parser
+        self.allow_all = allow_all
+        # Why robots.txt could not be fetched, for an unreachable policy
+        self.error = error
+        self.fetched_at = time.monotonic()
+
+    @classmethod
+    def from_text(cls, text: str) -> "RobotsPolicy":
+        parser = RobotFileParser()
+        parser.parse(text.splitlines())
+        return cls(parser)
+
+    def can_fetch(self, user_agent: str, url: str) -> bool:
+        if self._parser is None:
+            return self.allow_all
+        return self._parser.can_fetch(user_agent, url)
+
+    def crawl_delay(self, user_agent: str) -> float:
+        """Seconds to wait between requests (Crawl-delay or Request-rate), capped."""
+        if self._parser is None:
+            return 0.0
+        delay = self._parser.crawl_delay(user_agent)
+        if delay is None:
+            rate = self._parser.request_rate(user_agent)
+            if rate is not None and rate.requests:
+                delay = rate.seconds / rate.requests
+        try:
+            return min(max(float(delay or 0), 0.0), MAX_CRAWL_DELAY)
+        except ValueError:
+            return 0.0
+
+    @property
+    def unreachable(self) -> bool:
+        """True if robots.txt could not be fetched (everything is disallowed)."""
+        return self._parser is None and not self.allow_all
+
+    @property
+    def sitemaps(self) -> List[str]:
+        if self._parser is None:
+            return []
+        return list(self._parser.site_maps() or [])
+
+
+class RobotsCache:
+    """
+    Thread-safe cache of RobotsPolicy objects, one per site. A site's
+    robots.txt is fetched once per ttl seconds; concurrent crawl workers
+    asking about the same site wait for that one fetch.
+    """
+
+    def __init__(
+        self,
+        ttl: float = ROBOTS_CACHE_TTL,
+        error_ttl: float = ROBOTS_ERROR_TTL,
+        max_sites: int = 1000,
+    ):
+        self.ttl = ttl
+        self.error_ttl = error_ttl
+        self.max_sites = max_sites
+        self._policies: "OrderedDict[str, RobotsPolicy]" = OrderedDict()
+        self._fetch_locks = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def site_of(url: str) -> str:
+        parts = urlsplit(url)
+        return f"{parts.scheme.lower()}://{parts.netloc.lower()}"
+
+    def _fresh(self, site: str) -> Optional[RobotsPolicy]:
+        """The cached policy of site if it has not expired. Holds _lock."""
+        policy = self._policies.get(site)
+        if policy is None:
+            return None
+        ttl = self.error_ttl if policy.unreachable else self.ttl
+        if time.monotonic() - policy.fetched_at > ttl:
+            return None
+        self._policies.move_to_end(site)
+        return policy
+
+    def get(self, url: str, session: requests.Session) -> RobotsPolicy:
+        """The robots.txt policy of url's site, fetched with session if not cached."""
+        site = self.site_of(url)
+        with self._lock:
+            policy = self._fresh(site)
+            if policy is not None:
+                return policy
+            fetch_lock = self._fetch_locks.setdefault(site, threading.Lock())
+        with fetch_lock:
+            with self._lock:
+                policy = self._fresh(site)  # Fetched while we waited
+                if policy is not None:
+                    return policy
+            policy = self._fetch(site, session)
+            with self._lock:
+                self._policies[site] = policy
+                self._policies.move_to_end(site)
+                while len(self._policies) > self.max_sites:
+                    evicted, _ = self._policies.popitem(last=False)
+                    self._fetch_locks.pop(evicted, None)
+        return policy
+
+    def _fetch(self, site: str, session: requests.Session) -> RobotsPolicy:
+        robots_url = f"{site}/robots.txt"
+        try:
+            assert_safe_url(robots_url)
+            response = session.get(robots_url, timeout=10, stream=True)
+            try:
+                if response.status_code >= 500:
+                    logger.info(
+                        f"{robots_url} answered {response.status_code}; "
+                        f"not crawling {site} for now"
+                    )
+                    return RobotsPolicy(
+                        None, allow_all=False, error=f"answered {response.status_code}"
+                    )
+                if response.status_code >= 400:
+                    return RobotsPolicy(None, allow_all=True)
+                body = response.raw.read(MAX_ROBOTS_BYTES, decode_content=True)
+            finally:
+                response.close()
+        except (requests.RequestException, urllib3.exceptions.HTTPError, UnsafeURLError) as e:
+            logger.info(f"Could not fetch {robots_url}: {e}")
+            return RobotsPolicy(None, allow_all=False, error=str(e))
+        return RobotsPolicy.from_text(body.decode(response.encoding or "utf-8", "replace"))
+
+    def clear(self):
+        with self._lock:
+            self._policies.clear()
+            self._fetch_locks.clear()
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return {"sites": len(self._policies)}
+
+
+# Shared by all crawls.
+_robots_cache = RobotsCache()
+
+
+def get_robots_cache() -> RobotsCache:
+    """Get the global robots.txt cache."""
+    return _robots_cache
@@ -0,0 +1,139 @@
+import gzip
+import io
+import logging
+from collections import deque
+from typing import Iterable, Iterator
+
+import requests
+import urllib3
+from lxml import etree
+
+from http_session_manager import UnsafeURLError, assert_safe_url
+
+logger = logging.getLogger(__name__)
+
+# The sitemaps protocol caps a sitemap at 50,000 URLs and 50 MB
+# uncompressed; reading stops there, which also bounds gzip bombs.
+MAX_SITEMAP_BYTES = 50 * 1024 * 1024
+
+# Sitemaps (index files included) fetched per crawl at most.
+MAX_SITEMAPS = 100
+
+_GZIP_MAGIC = b"\x1f\x8b"
+
+
+class _LimitedReader(io.RawIOBase):
+    """
+    File-like wrapper that reads at most limit bytes from fileobj, after
+    the already-read bytes in prefix.
+    """
+
+    def __init__(self, fileobj, limit: int, prefix: bytes = b""):
+        self._fileobj = fileobj
+        self._prefix = prefix
+        self._remaining = limit
+
+    def readable(self) -> bool:
+        return True
+
+    def read(self, size: int = -1) -> bytes:
+        if self._remaining <= 0:
+            return b""
+        if size < 0 or size > self._remaining:
+            size = self._remaining
+        if self._prefix:
+            data, self._prefix = self._prefix[:size], self._prefix[size:]
+        else:
+            data = self._fileobj.read(size)
+        self._remaining -= len(data)
+        return data
+
+
+def _open_stream(response: requests.Response):
+    """
+    A file-like object with the sitemap XML of a streamed response:
+    Content-Encoding is undone by urllib3, and .xml.gz files (gzip data
+    served as is) are decompressed on the fly.
+    """
+    response.raw.decode_content = True
+    magic = response.raw.read(len(_GZIP_MAGIC))
+    if magic == _GZIP_MAGIC:
+        compressed = _LimitedReader(response.raw, MAX_SITEMAP_BYTES, magic)
+        return _LimitedReader(gzip.GzipFile(fileobj=compressed), MAX_SITEMAP_BYTES)
+    return _LimitedReader(response.raw, MAX_SITEMAP_BYTES, magic)
+
+
+def _local_name(tag) -> str:
+    # Sitemaps normally use the sitemaps.org namespace, but not always.
+    return etree.QName(tag).localname if isinstance(tag, str) else ""
+
+
+def _parse_sitemap(response: requests.Response, sitemaps: deque) -> Iterator[str]:
+    """
+    Stream-parse one sitemap, yielding its page URLs as they are read.
+    For a sitemap index, the sitemaps it lists are appended to sitemaps.
+    Elements are freed as soon as they are read, so memory stays flat
+    however large the file is.
+    """
+    for _, element in etree.iterparse(
+        _open_stream(response),
+        events=("end",),
+        resolve_entities=False,
+        no_network=True,
+    ):
+        name = _local_name(element.tag)
+        if name == "loc":
+            loc = (element.text or "").strip()
+            parent = element.getparent()
+            kind = _local_name(parent.tag) if parent is not None else ""
+            if loc and kind == "url":
+                yield loc
+            elif loc and kind == "sitemap":
+                sitemaps.append(loc)
+        elif name in ("url", "sitemap"):
+            element.clear()
+            while element.getprevious() is not None:
+                del element.getparent()[0]
+
+
+def iter_sitemap_urls(
+    sitemap_urls: Iterable[str],
+    session: requests.Session,
+    max_sitemaps: int = MAX_SITEMAPS,
+) -> Iterator[str]:
+    """
+    Yield the page URLs listed in sitemap_urls, in order, following
+    sitemap indexes (breadth first) up to max_sitemaps files. Plain and
+    gzipped sitemaps are streamed. Sitemaps that cannot be fetched or
+    parsed are skipped, keeping the URLs read before the error.
+    """
+    sitemaps = deque(sitemap_urls)
+    seen = set()
+    fetched = 0
+    while sitemaps and fetched < max_sitemaps:
+        sitemap_url = sitemaps.popleft()
+        if sitemap_url in seen:
+            continue
+        seen.add(sitemap_url)
+        fetched += 1
+        try:
+            assert_safe_url(sitemap_url)
+            response = session.get(sitemap_url, timeout=30, stream=True)
+        except (requests.RequestException, UnsafeURLError) as e:
+            logger.info(f"Could not fetch sitemap {sitemap_url}: {e}")
+            continue
+        try:
+            if response.status_code != 200:
+                logger.info(f"Sitemap {sitemap_url} answered {response.status_code}")
+                continue
+            yield from _parse_sitemap(response, sitemaps)
+        except (
+            etree.XMLSyntaxError,
+            OSError,
+            EOFError,
+            requests.RequestException,
+            urllib3.exceptions.HTTPError,
+        ) as e:
+            logger.info(f"Could not read sitemap {sitemap_url}: {e}")
+        finally:
+            response.close()
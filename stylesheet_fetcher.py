@@ -0,0 +1,171 @@
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+import requests
+
+from http_session_manager import fetch_with_session, UnsafeURLError
+
+
+class StylesheetCache:
+    """
+    Thread-safe LRU cache of sanitized stylesheets keyed by URL.
+    Bounded by both entry count and total size. Each entry keeps the
+    ETag/Last-Modified validators it was served with so it can be
+    revalidated with a conditional GET instead of downloaded again.
+    """
+
+    def __init__(self, max_entries: int = 256, max_bytes: int = 32 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, Dict[str, Optional[str]]]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, url: str) -> Optional[Dict[str, Optional[str]]]:
+        """Return the cached entry for url (marking it recently used), or None."""
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is not None:
+                self._entries.move_to_end(url)
+            return entry
+
+    def put(
+        self,
+        url: str,
+        css: str,
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None,
+    ):
+        """Store sanitized css for url, evicting least recently used entries."""
+        size = len(css)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(url, None)
+            if old is not None:
+                self._size -= len(old["css"])
+            self._entries[url] = {
+                "css": css,
+                "etag": etag,
+                "last_modified": last_modified,
+            }
+            self._size += size
+            while self._entries and (
+                len(self._entries) > self.max_entries or self._size > self.max_bytes
+            ):
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted["css"])
+
+    def discard(self, url: str):
+        with self._lock:
+            old = self._entries.pop(url, None)
+            if old is not None:
+                self._size -= len(old["css"])
+
+    def record(self, hit: bool):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._size,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+# Process-wide cache shared by every comparison, so framework CSS that many
+# pages link to is downloaded once and afterwards costs at most a 304.
+_stylesheet_cache = StylesheetCache()
+
+# Bounded pool shared by all stylesheet fetches. Kept separate from the
+# comparison pipeline's executors, whose tasks wait on these futures.
+MAX_STYLESHEET_WORKERS = 8
+_stylesheet_executor = ThreadPoolExecutor(
+    max_workers=MAX_STYLESHEET_WORKERS, thread_name_prefix="css-fetch"
+)
+
+
+def get_stylesheet_cache() -> StylesheetCache:
+    """Get the global stylesheet cache."""
+    return _stylesheet_cache
+
+
+def fetch_stylesheet(
+    url: str,
+    sanitize: Callable[[str], str],
+    cache: Optional[StylesheetCache] = None,
+) -> str:
+    """
+    Fetch one stylesheet and return its sanitized text.
+    A cached copy is revalidated with If-None-Match/If-Modified-Since and
+    reused on 304. Raises requests.RequestException or UnsafeURLError.
+    """
+    cache = cache if cache is not None else _stylesheet_cache
+    entry = cache.get(url)
+
+    headers = {}
+    if entry is not None:
+        if entry["etag"]:
+            headers["If-None-Match"] = entry["etag"]
+        if entry["last_modified"]:
+            headers["If-Modified-Since"] = entry["last_modified"]
+
+    response = fetch_with_session(url, method="GET", headers=headers)
+    if response.status_code == 304 and entry is not None:
+        cache.record(hit=True)
+        return entry["css"]
+
+    cache.record(hit=False)
+    css = sanitize(response.text)
+    etag = response.headers.get("ETag")
+    last_modified = response.headers.get("Last-Modified")
+    if etag or last_modified:
+        cache.put(url, css, etag, last_modified)
+    else:
+        # Without validators we could never confirm the copy is current.
+        cache.discard(url)
+    return css
+
+
+def fetch_stylesheets(
+    hrefs: List[str],
+    sanitize: Callable[[str], str],
+    cache: Optional[StylesheetCache] = None,
+) -> Tuple[List[str], List[str]]:
+    """
+    Fetch stylesheets concurrently on the shared bounded pool.
+    Returns (css_texts, broken_hrefs), both in the order of hrefs. A
+    stylesheet linked more than once is only fetched once.
+    """
+    unique_hrefs = list(dict.fromkeys(hrefs))
+    futures = {
+        href: _stylesheet_executor.submit(fetch_stylesheet, href, sanitize, cache)
+        for href in unique_hrefs
+    }
+
+    fetched = {}
+    broken = set()
+    for href, future in futures.items():
+        try:
+            fetched[href] = future.result()
+        except (requests.RequestException, UnsafeURLError):
+            broken.add(href)
+
+    css_links = [fetched[href] for href in hrefs if href in fetched]
+    broken_links = [href for href in hrefs if href in broken]
+    return css_links, broken_links
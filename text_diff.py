@@ -0,0 +1,267 @@
+import difflib
+import time
+from typing import Dict, List, Optional, Tuple
+
+# Whole-comparison time budget in seconds. When it runs out, the remaining
+# differing regions are reported as coarse replace blocks and no further
+# character-level refinement is done, so one huge page cannot stall a worker.
+DEFAULT_TIMEOUT = 2.0
+# Above this many lines in total, skip the line diff and only trim the common
+# prefix and suffix.
+MAX_DIFF_LINES = 200_000
+# Line pairs are only refined character by character when both lines are at
+# most this long and at least this similar; otherwise the whole line is
+# highlighted.
+MAX_REFINE_LINE_LENGTH = 2000
+MIN_REFINE_RATIO = 0.5
+
+Opcode = Tuple[str, int, int, int, int]
+
+
+def _intern_lines(text1: List[str], text2: List[str]) -> Tuple[List[int], List[int]]:
+    """Map each distinct line to a small integer so comparisons are cheap."""
+    ids: Dict[str, int] = {}
+    a = [ids.setdefault(line, len(ids)) for line in text1]
+    b = [ids.setdefault(line, len(ids)) for line in text2]
+    return a, b
+
+
+def _bisect(
+    a: List[int],
+    b: List[int],
+    a_lo: int,
+    a_hi: int,
+    b_lo: int,
+    b_hi: int,
+    deadline: float,
+) -> Optional[Tuple[int, int]]:
+    """
+    Find the middle snake of a[a_lo:a_hi] vs b[b_lo:b_hi] (Myers 1986,
+    linear-space variant) and return the split point (x, y) in absolute
+    indexes. Returns None if the deadline passes first.
+    """
+    n = a_hi - a_lo
+    m = b_hi - b_lo
+    max_d = (n + m + 1) // 2
+    v_offset = max_d
+    v_length = 2 * max_d + 2
+    v1 = [-1] * v_length
+    v2 = [-1] * v_length
+    v1[v_offset + 1] = 0
+    v2[v_offset + 1] = 0
+    delta = n - m
+    # If the total number of lines is odd, the front path collides with the
+    # reverse path; otherwise the reverse path collides with the front one.
+    front = delta % 2 != 0
+    # Offsets for the start and end of the k loops, to skip diagonals that
+    # already ran off the grid.
+    k1start = k1end = k2start = k2end = 0
+
+    for d in range(max_d):
+        if time.monotonic() > deadline:
+            return None
+
+        # Walk the front path one step.
+        for k1 in range(-d + k1start, d + 1 - k1end, 2):
+            k1_offset = v_offset + k1
+            if k1 == -d or (k1 != d and v1[k1_offset - 1] < v1[k1_offset + 1]):
+                x1 = v1[k1_offset + 1]
+            else:
+                x1 = v1[k1_offset - 1] + 1
+            y1 = x1 - k1
+            while x1 < n and y1 < m and a[a_lo + x1] == b[b_lo + y1]:
+                x1 += 1
+                y1 += 1
+            v1[k1_offset] = x1
+            if x1 > n:
+                k1end += 2  # Ran off the right of the grid
+            elif y1 > m:
+                k1start += 2  # Ran off the bottom of the grid
+            elif front:
+                k2_offset = v_offset + delta - k1
+                if 0 <= k2_offset < v_length and v2[k2_offset] != -1:
+                    # Mirror x2 onto the top-left coordinate system.
+                    if x1 >= n - v2[k2_offset]:
+                        return a_lo + x1, b_lo + y1
+
+        # Walk the reverse path one step.
+        for k2 in range(-d + k2start, d + 1 - k2end, 2):
+            k2_offset = v_offset + k2
+            if k2 == -d or (k2 != d and v2[k2_offset - 1] < v2[k2_offset + 1]):
+                x2 = v2[k2_offset + 1]
+            else:
+                x2 = v2[k2_offset - 1] + 1
+            y2 = x2 - k2
+            while x2 < n and y2 < m and a[a_hi - x2 - 1] == b[b_hi - y2 - 1]:
+                x2 += 1
+                y2 += 1
+            v2[k2_offset] = x2
+            if x2 > n:
+                k2end += 2  # Ran off the left of the grid
+            elif y2 > m:
+                k2start += 2  # Ran off the top of the grid
+            elif not front:
+                k1_offset = v_offset + delta - k2
+                if 0 <= k1_offset < v_length and v1[k1_offset] != -1:
+                    x1 = v1[k1_offset]
+                    y1 = v_offset + x1 - k1_offset
+                    if x1 >= n - x2:
+                        return a_lo + x1, b_lo + y1
+
+    # Only reachable when nothing matches at all.
+    return None
+
+
+def _diff_range(
+    a: List[int],
+    b: List[int],
+    a_lo: int,
+    a_hi: int,
+    b_lo: int,
+    b_hi: int,
+    deadline: float,
+    ops: List[Opcode],
+    use_bisect: bool = True,
+):
+    """Append equal/delete/insert opcodes for a[a_lo:a_hi] vs b[b_lo:b_hi]."""
+    # Trim the common prefix.
+    start_a, start_b = a_lo, b_lo
+    while a_lo < a_hi and b_lo < b_hi and a[a_lo] == b[b_lo]:
+        a_lo += 1
+        b_lo += 1
+    if a_lo > start_a:
+        ops.append(("equal", start_a, a_lo, start_b, b_lo))
+
+    # Trim the common suffix; emitted after the middle is done.
+    end_a, end_b = a_hi, b_hi
+    while a_lo < a_hi and b_lo < b_hi and a[a_hi - 1] == b[b_hi - 1]:
+        a_hi -= 1
+        b_hi -= 1
+
+    if a_lo == a_hi and b_lo < b_hi:
+        ops.append(("insert", a_lo, a_lo, b_lo, b_hi))
+    elif b_lo == b_hi and a_lo < a_hi:
+        ops.append(("delete", a_lo, a_hi, b_lo, b_lo))
+    elif a_lo < a_hi:
+        split = None
+        # With no line in common there is no snake to find, and bisecting
+        # would walk every diagonal until the deadline.
+        if use_bisect and not set(a[a_lo:a_hi]).isdisjoint(b[b_lo:b_hi]):
+            split = _bisect(a, b, a_lo, a_hi, b_lo, b_hi, deadline)
+        if split is None:
+            # Out of budget or nothing in common: report the region coarsely.
+            ops.append(("delete", a_lo, a_hi, b_lo, b_lo))
+            ops.append(("insert", a_hi, a_hi, b_lo, b_hi))
+        else:
+            x, y = split
+            _diff_range(a, b, a_lo, x, b_lo, y, deadline, ops)
+            _diff_range(a, b, x, a_hi, y, b_hi, deadline, ops)
+
+    if a_hi < end_a:
+        ops.append(("equal", a_hi, end_a, b_hi, end_b))
+
+
+def diff_lines(
+    text1: List[str], text2: List[str], timeout: float = DEFAULT_TIMEOUT
+) -> List[Opcode]:
+    """
+    Line diff of text1 vs text2 as difflib-style opcodes
+    (tag, i1, i2, j1, j2) with tags equal/replace/delete/insert.
+    Uses Myers' O(ND) algorithm in linear space over interned line IDs.
+    """
+    deadline = time.monotonic() + timeout
+    a, b = _intern_lines(text1, text2)
+    raw: List[Opcode] = []
+    _diff_range(
+        a,
+        b,
+        0,
+        len(a),
+        0,
+        len(b),
+        deadline,
+        raw,
+        use_bisect=len(a) + len(b) <= MAX_DIFF_LINES,
+    )
+
+    # Merge adjacent opcodes: runs of the same tag, and delete/insert
+    # neighbours into a single replace.
+    merged: List[List] = []
+    for tag, i1, i2, j1, j2 in raw:
+        if merged:
+            last = merged[-1]
+            if last[0] == tag == "equal" or (
+                last[0] != "equal" and tag != "equal"
+            ):
+                if last[0] != tag:
+                    last[0] = "replace"
+                last[2], last[4] = i2, j2
+                continue
+        merged.append([tag, i1, i2, j1, j2])
+    return [tuple(op) for op in merged]
+
+
+def _refine(line1: str, line2: str, deadline: float):
+    """
+    Character-level changed ranges for a modified line pair. Dissimilar or
+    very long pairs, and anything past the deadline, get whole-line ranges.
+    """
+    whole = [(0, len(line1))], [(0, len(line2))]
+    if (
+        time.monotonic() > deadline
+        or len(line1) > MAX_REFINE_LINE_LENGTH
+        or len(line2) > MAX_REFINE_LINE_LENGTH
+    ):
+        return whole
+
+    s = difflib.SequenceMatcher(None, line1, line2)
+    if s.real_quick_ratio() < MIN_REFINE_RATIO or s.quick_ratio() < MIN_REFINE_RATIO:
+        return whole
+
+    left_changes = []
+    right_changes = []
+    for subtag, left_start, left_end, right_start, right_end in s.get_opcodes():
+        if subtag != "equal":
+            left_changes.append((left_start, left_end))
+            right_changes.append((right_start, right_end))
+    return left_changes, right_changes
+
+
+def compare_lines(
+    text1: List[str], text2: List[str], timeout: float = DEFAULT_TIMEOUT
+) -> list:
+    """
+    Compare two lists of text lines for the text tab. Returns rows of
+    ("both", line, None), ("left", line, None), ("right", None, line) and
+    ("modified", line1, line2, left_changes, right_changes).
+    """
+    deadline = time.monotonic() + timeout
+    comparison = []
+
+    for tag, i1, i2, j1, j2 in diff_lines(text1, text2, timeout):
+        if tag == "equal":
+            # Text is the same in both versions
+            for line in text1[i1:i2]:
+                comparison.append(("both", line, None))
+        elif tag == "replace":
+            # Pair lines up in order; unpaired lines are one-sided.
+            paired = min(i2 - i1, j2 - j1)
+            for line1, line2 in zip(text1[i1 : i1 + paired], text2[j1 : j1 + paired]):
+                left_changes, right_changes = _refine(line1, line2, deadline)
+                comparison.append(
+                    ("modified", line1, line2, left_changes, right_changes)
+                )
+            for line in text1[i1 + paired : i2]:
+                comparison.append(("left", line, None))
+            for line in text2[j1 + paired : j2]:
+                comparison.append(("right", None, line))
+        elif tag == "delete":
+            # Text only in first sequence
+            for line in text1[i1:i2]:
+                comparison.append(("left", line, None))
+        elif tag == "insert":
+            # Text only in second sequence
+            for line in text2[j1:j2]:
+                comparison.append(("right", None, line))
+
+    return comparison
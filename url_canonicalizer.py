@@ -0,0 +1,176 @@
+import os
+import re
+from typing import Dict, Iterable, Optional
+from urllib.parse import unquote_plus, urlsplit, urlunsplit
+
+# Query parameters that only track where a visitor came from; they never
+# change the page and are dropped from canonical URLs.
+DEFAULT_IGNORED_PARAMS = (
+    "utm_source",
+    "utm_medium",
+    "utm_campaign",
+    "utm_term",
+    "utm_content",
+    "utm_id",
+    "gclid",
+    "dclid",
+    "fbclid",
+    "msclkid",
+    "mc_cid",
+    "mc_eid",
+    "_ga",
+    "_gl",
+)
+
+# More parameters to ignore, comma separated.
+EXTRA_IGNORED_PARAMS = tuple(
+    param.strip().lower()
+    for param in os.environ.get("COMPARE_WEB_IGNORED_QUERY_PARAMS", "").split(",")
+    if param.strip()
+)
+
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+
+# Characters that never need percent-encoding (RFC 3986 "unreserved")
+_UNRESERVED = frozenset(
+    "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-._~"
+)
+_PERCENT_ESCAPE = re.compile(r"%[0-9A-Fa-f]{2}")
+
+
+def _normalize_escape(match: "re.Match") -> str:
+    """Decode escaped unreserved characters; upper-case the other escapes."""
+    char = chr(int(match.group(0)[1:], 16))
+    return char if char in _UNRESERVED else match.group(0).upper()
+
+
+def _remove_dot_segments(path: str) -> str:
+    """Resolve "." and ".." segments (RFC 3986, section 5.2.4)."""
+    if "." not in path:
+        return path
+    output = []
+    for segment in path.split("/"):
+        if segment == "..":
+            if len(output) > 1:
+                output.pop()
+        elif segment != ".":
+            output.append(segment)
+    if path.endswith(("/.", "/..")):
+        output.append("")
+    return "/".join(output)
+
+
+class URLCanonicalizer:
+    """
+    Maps the many spellings of a URL to one canonical form, so the crawler,
+    the link comparison and the link validators treat them as one link:
+
+    - scheme and host are lower-cased and the default port is dropped
+    - the fragment is dropped (it is never sent to the server)
+    - percent-escapes are normalized and "." / ".." segments resolved
+    - a trailing slash is removed from the path (except for "/")
+    - query parameters are sorted by name (repeated names keep their
+      order) and tracking parameters are removed
+
+    Each step can be turned off. Only http(s) URLs are changed; anything
+    else is returned as is. Results are memoized (up to cache_size URLs),
+    as crawled sites repeat the same navigation links on every page.
+    """
+
+    def __init__(
+        self,
+        drop_fragment: bool = True,
+        strip_trailing_slash: bool = True,
+        sort_query: bool = True,
+        ignored_params: Iterable[str] = DEFAULT_IGNORED_PARAMS + EXTRA_IGNORED_PARAMS,
+        ignored_param_prefixes: Iterable[str] = ("utm_",),
+        cache_size: int = 65536,
+    ):
+        self.drop_fragment = drop_fragment
+        self.strip_trailing_slash = strip_trailing_slash
+        self.sort_query = sort_query
+        self.ignored_params = frozenset(param.lower() for param in ignored_params)
+        self.ignored_param_prefixes = tuple(p.lower() for p in ignored_param_prefixes)
+        self.cache_size = cache_size
+        self._cache: Dict[str, str] = {}
+
+    def _ignored(self, name: str) -> bool:
+        name = name.lower()
+        return name in self.ignored_params or name.startswith(self.ignored_param_prefixes)
+
+    def canonical_path(self, path: str) -> str:
+        path = _remove_dot_segments(_PERCENT_ESCAPE.sub(_normalize_escape, path)) or "/"
+        if self.strip_trailing_slash and len(path) > 1:
+            path = path.rstrip("/") or "/"
+        return path
+
+    def canonical_query(self, query: str) -> str:
+        pairs = [
+            (unquote_plus(pair.split("=", 1)[0]), _PERCENT_ESCAPE.sub(_normalize_escape, pair))
+            for pair in query.split("&")
+            if pair
+        ]
+        pairs = [(name, pair) for name, pair in pairs if not self._ignored(name)]
+        if self.sort_query:
+            pairs.sort(key=lambda item: item[0])  # Stable: repeated names keep order
+        return "&".join(pair for _, pair in pairs)
+
+    def canonicalize(self, url: str) -> str:
+        """The canonical form of url."""
+        canonical = self._cache.get(url)
+        if canonical is None:
+            canonical = self._canonicalize(url)
+            if len(self._cache) >= self.cache_size:
+                self._cache.clear()  # Cheaper than LRU bookkeeping on every hit
+            self._cache[url] = canonical
+        return canonical
+
+    def _canonicalize(self, url: str) -> str:
+        try:
+            parts = urlsplit(url.strip())
+            port = parts.port
+        except ValueError:
+            return url  # Not a URL we can take apart; leave it alone
+        scheme = parts.scheme.lower()
+        if scheme not in _DEFAULT_PORTS or not parts.hostname:
+            return url
+
+        host = parts.hostname.lower()
+        if ":" in host:
+            host = f"[{host}]"  # IPv6 literal
+        if port is not None and port != _DEFAULT_PORTS[scheme]:
+            host = f"{host}:{port}"
+        userinfo = parts.netloc.rpartition("@")[0]
+        netloc = f"{userinfo}@{host}" if userinfo else host
+
+        fragment = "" if self.drop_fragment else parts.fragment
+        return urlunsplit(
+            (
+                scheme,
+                netloc,
+                self.canonical_path(parts.path),
+                self.canonical_query(parts.query),
+                fragment,
+            )
+        )
+
+    __call__ = canonicalize
+
+    def path_key(self, url: str) -> str:
+        """The canonical path and query of url, without scheme and host."""
+        parts = urlsplit(self.canonicalize(url))
+        return f"{parts.path}?{parts.query}" if parts.query else parts.path
+
+
+# Shared default, configured from the environment.
+_url_canonicalizer = URLCanonicalizer()
+
+
+def get_url_canonicalizer() -> URLCanonicalizer:
+    """Get the global URL canonicalizer."""
+    return _url_canonicalizer
+
+
+def canonicalize_url(url: str, canonicalizer: Optional[URLCanonicalizer] = None) -> str:
+    """Canonicalize url with canonicalizer, or the global one."""
+    return (canonicalizer or _url_canonicalizer).canonicalize(url)